@@ -26,7 +26,7 @@ from langchain_core.prompts import (
 from langchain_core.messages import SystemMessage, BaseMessage
 
 import helpers.log as Log
-from helpers.dirty_json import DirtyJson
+from helpers.dirty_json import DirtyJson, DirtyJsonStream
 from helpers.defer import DeferredTask
 from typing import Callable
 from helpers.localization import Localization
@@ -98,7 +98,15 @@ class AgentContext:
     @staticmethod
     def get(id: str):
         with AgentContext._contexts_lock:
-            return AgentContext._contexts.get(id, None)
+            context = AgentContext._contexts.get(id, None)
+        if context is None and id:
+            # persisted chats are only deserialized once they are used
+            from helpers import persist_chat
+
+            persist_chat.load_indexed_chat(id)
+            with AgentContext._contexts_lock:
+                context = AgentContext._contexts.get(id, None)
+        return context
 
     @staticmethod
     def use(id: str):
@@ -123,9 +131,14 @@ class AgentContext:
     @staticmethod
     def first():
         with AgentContext._contexts_lock:
-            if not AgentContext._contexts:
-                return None
-            return list(AgentContext._contexts.values())[0]
+            if AgentContext._contexts:
+                return list(AgentContext._contexts.values())[0]
+        from helpers import persist_chat
+
+        for id in persist_chat.get_indexed_chat_ids():
+            if context := AgentContext.get(id):
+                return context
+        return None
 
     @staticmethod
     def all():
@@ -137,8 +150,12 @@ class AgentContext:
         def generate_short_id():
             return "".join(random.choices(string.ascii_letters + string.digits, k=8))
 
+        from helpers import persist_chat
+
         while True:
             short_id = generate_short_id()
+            if persist_chat.is_chat_indexed(short_id):
+                continue
             with AgentContext._contexts_lock:
                 if short_id not in AgentContext._contexts:
                     return short_id
@@ -363,6 +380,7 @@ class Agent:
         self.agent_name = f"A{self.number}"
 
         self.history = history.History(self)  # type: ignore[abstract]
+        self.token_ledger = tokens.TokenLedger()
         self.last_user_message: history.Message | None = None
         self.intervention: UserMessage | None = None
         self.data: dict[str, Any] = {}  # free data object all the tools can use
@@ -389,6 +407,7 @@ class Agent:
                     self.loop_data.iteration += 1
                     self.loop_data.params_temporary = {}  # clear temporary params
                     last_response_stream_full = ""
+                    json_stream = DirtyJsonStream()
 
                     # call message_loop_start extensions
                     await extension.call_extensions_async(
@@ -426,7 +445,7 @@ class Agent:
                             await self.handle_reasoning_stream(stream_data["full"])
 
                         async def stream_callback(chunk: str, full: str):
-                            nonlocal last_response_stream_full
+                            nonlocal last_response_stream_full, json_stream
                             await self.handle_intervention()
                             # output the agent response stream
                             if chunk == full:
@@ -435,9 +454,18 @@ class Agent:
                             stream_data = {"chunk": chunk, "full": full}
                             stop_response: str | None = None
 
-                            snapshot = extract_tools.extract_json_root_string(full)
+                            # parse only the new part of the response, restart if it was rewritten
+                            if len(json_stream.text) + len(chunk) == len(full):
+                                json_stream.feed(chunk)
+                            else:
+                                json_stream = DirtyJsonStream()
+                                json_stream.feed(full)
+
+                            snapshot = None
+                            if not json_stream.array_first:
+                                snapshot = json_stream.root_string()
                             if snapshot:
-                                parsed_snapshot = extract_tools.json_parse_dirty(snapshot)
+                                parsed_snapshot = json_stream.snapshot()
                                 if parsed_snapshot is not None:
                                     try:
                                         await self.validate_tool_request(parsed_snapshot)
@@ -462,7 +490,9 @@ class Agent:
                             if stream_data.get("chunk"):
                                 printer.stream(stream_data["chunk"])
                             # Use the potentially modified full text for downstream processing
-                            await self.handle_response_stream(stream_data["full"])
+                            await self.handle_response_stream(
+                                stream_data["full"], json_stream
+                            )
                             last_response_stream_full = stream_data["full"]
                             if stop_response is not None:
                                 return stop_response
@@ -545,7 +575,9 @@ class Agent:
 
         # set system prompt and message history
         loop_data.system = await self.get_system_prompt(self.loop_data)
-        loop_data.history_output = self.history.output()
+        history_output = self.history.output()
+        history_length = len(history_output)
+        loop_data.history_output = history_output
 
         # and allow extensions to edit them
         await extension.call_extensions_async(
@@ -556,7 +588,7 @@ class Agent:
         system_text = "\n\n".join(loop_data.system)
 
         # join extras
-        extras = history.Message(  # type: ignore[abstract]
+        extras_message = history.Message(  # type: ignore[abstract]
             False,
             content=self.read_prompt(
                 "agent.context.extras.md",
@@ -564,7 +596,8 @@ class Agent:
                     {**loop_data.extras_persistent, **loop_data.extras_temporary}
                 ),
             ),
-        ).output()
+        )
+        extras = extras_message.output()
         loop_data.extras_temporary.clear()
 
         # convert history + extras to LLM format
@@ -584,12 +617,43 @@ class Agent:
             Agent.DATA_NAME_CTX_WINDOW,
             {
                 "text": full_text,
-                "tokens": tokens.approximate_tokens(full_text),
+                "tokens": self._count_prompt_tokens(
+                    loop_data, history_output, history_length, extras_message
+                ),
             },
         )
 
         return full_prompt
 
+    def _count_prompt_tokens(
+        self,
+        loop_data: LoopData,
+        history_output: list[history.OutputMessage],
+        history_length: int,
+        extras_message: history.Message,
+    ) -> int:
+        # sum cached per-segment counts instead of tokenizing the whole window
+        ledger = self.token_ledger
+        keys: list[str] = []
+        for i, part in enumerate(loop_data.system):
+            key = f"system.{i}"
+            ledger.count(key, part)
+            keys.append(key)
+
+        # history records cache their own token counts, unless extensions replaced the output
+        if (
+            loop_data.history_output is history_output
+            and len(history_output) == history_length
+        ):
+            ledger.set("history", self.history.get_tokens())
+        else:
+            ledger.count("history", history.output_text(loop_data.history_output))
+        ledger.set("extras", extras_message.get_tokens())
+        keys += ["history", "extras"]
+
+        ledger.retain(keys)
+        return ledger.total()
+
     @extension.extensible
     async def handle_exception(self, location: str, exception: Exception):
         if exception:
@@ -992,12 +1056,20 @@ class Agent:
             text=stream,
         )
 
-    async def handle_response_stream(self, stream: str):
+    async def handle_response_stream(
+        self, stream: str, json_stream: DirtyJsonStream | None = None
+    ):
         await self.handle_intervention()
         try:
             if len(stream) < 25:
                 return  # no reason to try
-            response = DirtyJson.parse_string(stream)
+            # reuse the incremental parse when extensions left the text untouched
+            if json_stream is not None and (
+                stream == json_stream.text or stream == json_stream.root_string()
+            ):
+                response = json_stream.snapshot()
+            else:
+                response = DirtyJson.parse_string(stream)
             if isinstance(response, dict):
                 await extension.call_extensions_async(
                     "response_stream",
@@ -1021,21 +1093,10 @@ class Agent:
         **kwargs,
     ):
         from tools.unknown import Unknown
-        from helpers.tool import Tool
-
-        classes = []
-
-        # search for tools in agent's folder hierarchy
-        paths = subagents.get_paths(self, "tools", name + ".py")
-
-        for path in paths:
-            try:
-                classes = extract_tools.load_classes_from_file(path, Tool)  # type: ignore[arg-type]
-                break
-            except Exception:
-                continue
+        from helpers.tool import get_tool_class
 
-        tool_class = classes[0] if classes else Unknown
+        # resolve from the tool registry, files are imported once until they change
+        tool_class = get_tool_class(self, name) or Unknown
         return tool_class(
             agent=self,
             name=name,
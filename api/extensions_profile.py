@@ -0,0 +1,21 @@
+from helpers.api import ApiHandler, Request, Response
+from helpers import extension
+
+
+class ExtensionsProfile(ApiHandler):
+    """Read or control extension call profiling.
+    Actions: get (default), enable, disable, reset."""
+
+    async def process(self, input: dict, request: Request) -> dict | Response:
+        action = input.get("action", "get")
+
+        if action == "enable":
+            extension.toggle_profiling(True)
+        elif action == "disable":
+            extension.toggle_profiling(False)
+        elif action == "reset":
+            extension.reset_profile()
+        elif action != "get":
+            raise Exception(f"Unknown action: {action}")
+
+        return {"ok": True, **extension.get_profile()}
@@ -196,6 +196,7 @@ class Plugins(ApiHandler):
             os.remove(path)
         except Exception as e:
             return Response(status=500, response=f"Failed to delete config: {str(e)}")
+        plugins.clear_plugin_config_cache()  # the watchdog may fire after the next read
 
         return {"ok": True}
 
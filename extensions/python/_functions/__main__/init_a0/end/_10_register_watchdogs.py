@@ -6,6 +6,12 @@ class RegisterWatchDogs(Extension):
     def execute(self, **kwargs):
         from helpers.plugins import register_watchdogs as register_plugins_watchdogs
         from helpers.api import register_watchdogs as register_api_watchdogs
+        from helpers.extension import register_extensions_watchdogs
+        from helpers.settings import register_watchdogs as register_settings_watchdogs
+        from helpers.files import register_watchdogs as register_prompts_watchdogs
 
         register_plugins_watchdogs()
-        register_api_watchdogs()
\ No newline at end of file
+        register_api_watchdogs()
+        register_extensions_watchdogs()
+        register_settings_watchdogs()
+        register_prompts_watchdogs()
\ No newline at end of file
@@ -20,14 +20,25 @@ class MCPToolsPrompt(Extension):
             system_prompt.append(prompt)
 
 
+# (tools version, prompt) of the last build, reused until a tool list changes
+_last_prompt: tuple[int, str] = (-1, "")
+
+
 @extensible
 async def build_prompt(agent: Agent) -> str:
+    global _last_prompt
+
     mcp_config = MCPConfig.get_instance()
     if not mcp_config.servers:
         return ""
 
+    version = mcp_config.get_tools_version()
+    if _last_prompt[0] == version:
+        return _last_prompt[1]
+
     pre_progress = agent.context.log.progress
     agent.context.log.set_progress("Collecting MCP tools")
     tools = mcp_config.get_tools_prompt()
     agent.context.log.set_progress(pre_progress)
+    _last_prompt = (version, tools)
     return tools
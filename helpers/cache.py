@@ -6,6 +6,7 @@ from typing import Any
 
 _lock = threading.RLock()
 _cache: dict[str, dict[str, "CacheEntry"]] = {}
+_stats: dict[str, "CacheStats"] = {}
 
 _enabled_global: bool = True
 _enabled_areas: dict[str, bool] = {}
@@ -17,6 +18,17 @@ class CacheEntry:
     timestamp: float
 
 
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
 def toggle_global(enabled: bool) -> None:
     global _enabled_global
     _enabled_global = enabled
@@ -31,6 +43,7 @@ def has(area: str, key: Any) -> bool:
         return False
     with _lock:
         entry = _cache.get(area, {}).get(key)
+        _count(area, entry is not None)
         if entry is None:
             return False
         _touch_entry(entry)
@@ -51,6 +64,7 @@ def get(area: str, key: Any, default: Any = None) -> Any:
         return default
     with _lock:
         entry = _cache.get(area, {}).get(key)
+        _count(area, entry is not None)
         if entry is None:
             return default
         _touch_entry(entry)
@@ -97,6 +111,32 @@ def clear_all() -> None:
         _cache.clear()
 
 
+def get_stats(area: str = "*") -> dict[str, dict[str, float]]:
+    """Lookup counters per area, areas may be given as a pattern."""
+    with _lock:
+        return {
+            name: {"hits": stats.hits, "misses": stats.misses, "hit_rate": stats.hit_rate}
+            for name, stats in _stats.items()
+            if fnmatch.fnmatch(name, area)
+        }
+
+
+def reset_stats(area: str = "*") -> None:
+    with _lock:
+        for name in [name for name in _stats if fnmatch.fnmatch(name, area)]:
+            _stats.pop(name, None)
+
+
+def _count(area: str, hit: bool) -> None:
+    stats = _stats.get(area)
+    if stats is None:
+        stats = _stats[area] = CacheStats()
+    if hit:
+        stats.hits += 1
+    else:
+        stats.misses += 1
+
+
 def _is_enabled(area: str) -> bool:
     if not _enabled_global:
         return False
@@ -1,4 +1,5 @@
 import json
+from typing import Any
 
 def try_parse(json_string: str):
     try:
@@ -351,3 +352,401 @@ class DirtyJson:
         chars = ["{", "[", '"']
         indices = [input_str.find(char) for char in chars if input_str.find(char) != -1]
         return min(indices) if indices else 0
+
+
+_ESCAPES = {
+    '"': '"',
+    "'": "'",
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+_LITERALS = {"true": True, "false": False, "null": None, "undefined": None}
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+
+class DirtyJsonStream:
+    """Incremental parse session for a streamed response.
+
+    Unlike DirtyJson.feed, the session keeps its container stack and position
+    between feeds and only consumes newly added characters. The root is the
+    first "{" in the text; containers are attached to their parents as soon
+    as they open, so ``root`` always holds the partial object; the value of
+    the token in progress is only put in place when ``root`` is read, so a
+    feed costs time proportional to the new characters. ``completed``
+    turns True on the feed that closes the root object, ``root_string()`` then
+    returns its exact source text. Accepts the same relaxed syntax as
+    DirtyJson (comments, single/backtick/triple quotes, unquoted keys and
+    values, trailing commas, {{ }} wrappers).
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.index = 0
+        self.started = False
+        self.completed = False
+        self.array_first = False  # a "[" appeared before the root object
+        self._root: dict | None = None
+        self.root_start = -1
+        self.root_end = -1
+        self._wrapped = False
+        # frames are [container, phase, key]
+        self._stack: list[list] = []
+        # token in progress: "string", "number", "unquoted", "line_comment", "block_comment"
+        self._token: str | None = None
+        self._token_key = False
+        self._parts: list[str] = []
+        self._quote = ""
+        self._triple = False
+        self._preview: tuple[dict | list, Any] | None = None
+        self._preview_pending = False
+        self._quote_pending = False
+
+    @property
+    def root(self) -> dict | None:
+        if self._preview_pending:
+            self._preview_pending = False
+            self._apply_preview()
+        return self._root
+
+    def feed(self, chunk: str):
+        if chunk:
+            # extend in place, += on the attribute would copy the whole text
+            text, self.text = self.text, ""
+            text += chunk
+            self.text = text
+        self._parse(final=False)
+
+    def finish(self):
+        """Parse remaining input treating the end of text as end of input."""
+        self._parse(final=True)
+        return self.root
+
+    def root_string(self) -> str | None:
+        if not self.completed:
+            return None
+        return self.text[self.root_start : self.root_end]
+
+    def snapshot(self):
+        """Structural copy of the partial root, safe to hand out and mutate."""
+        return _copy_structure(self.root)
+
+    def _parse(self, final: bool):
+        self._clear_preview()
+        self._preview_pending = False
+        self._quote_pending = False
+        text = self.text
+        length = len(text)
+        while not self.completed and self.index < length:
+            if not self.started:
+                if not self._find_root(final):
+                    break
+                continue
+            if self._token is not None:
+                if not self._continue_token(final):
+                    break
+                continue
+            char = text[self.index]
+            if char.isspace():
+                self.index += 1
+                continue
+            if char == "/":
+                if self.index + 1 >= length and not final:
+                    break
+                following = text[self.index + 1 : self.index + 2]
+                if following == "/":
+                    self._token = "line_comment"
+                    self.index += 2
+                    continue
+                if following == "*":
+                    self._token = "block_comment"
+                    self.index += 2
+                    continue
+            if not self._structure(char, final):
+                break
+        if final and self._token is not None and not self.completed:
+            self._complete_token(self._token_value())
+        if not final:
+            self._preview_pending = True
+
+    def _find_root(self, final: bool) -> bool:
+        text = self.text
+        brace = text.find("{", self.index)
+        end = brace if brace != -1 else len(text)
+        if not self.array_first and text.find("[", self.index, end) != -1:
+            self.array_first = True
+        if brace == -1:
+            self.index = len(text)
+            return False
+        if brace + 1 >= len(text) and not final:
+            self.index = brace  # need one more char to detect a {{ wrapper
+            return False
+        self._wrapped = text.startswith("{", brace + 1)
+        self._root = {}
+        self.root_start = brace
+        self.index = brace + (2 if self._wrapped else 1)
+        self._stack.append([self._root, "key", None])
+        self.started = True
+        return True
+
+    def _structure(self, char: str, final: bool) -> bool:
+        frame = self._stack[-1]
+        container, phase = frame[0], frame[1]
+
+        if char in "}]" and phase in ("key", "after") or (
+            isinstance(container, list) and char in "}]"
+        ):
+            return self._close(char, final)
+
+        if phase == "after":
+            if char == ",":
+                self.index += 1
+            frame[1] = "key" if isinstance(container, dict) else "value"
+            return True
+
+        if phase == "key":
+            if char == ",":
+                self.index += 1
+            elif char in "\"'":
+                self._start_string(char, key=True, triple=False)
+            else:
+                self._token = "unquoted"
+                self._token_key = True
+                self._parts = []
+            return True
+
+        if phase == "colon":
+            if char == ":":
+                self.index += 1
+            frame[1] = "value"
+            return True
+
+        # value
+        if char == "{":
+            self._attach({}, "key")
+            return True
+        if char == "[":
+            self._attach([], "value")
+            return True
+        if char in "\"'`":
+            ahead = self.text[self.index + 1 : self.index + 3]
+            if len(ahead) < 2 and ahead in ("", char) and not final:
+                self._quote_pending = True  # need two more chars to detect triple quotes
+                return False
+            self._start_string(char, key=False, triple=ahead == char * 2)
+            return True
+        self._token = "number" if char.isdigit() or char in "-+" else "unquoted"
+        self._token_key = False
+        self._parts = []
+        return True
+
+    def _close(self, char: str, final: bool) -> bool:
+        if len(self._stack) == 1 and self._wrapped and char == "}":
+            if self.index + 1 >= len(self.text) and not final:
+                return False  # need one more char to detect a }} wrapper
+            self.index += 2 if self.text.startswith("}", self.index + 1) else 1
+        else:
+            self.index += 1
+        self._stack.pop()
+        if not self._stack:
+            self.completed = True
+            self.root_end = self.index
+        return True
+
+    def _attach(self, value, phase: str):
+        # containers are attached right away so the snapshot shows them
+        frame = self._stack[-1]
+        if isinstance(frame[0], dict):
+            frame[0][frame[2]] = value
+        else:
+            frame[0].append(value)
+        frame[1] = "after"
+        self.index += 1
+        self._stack.append([value, phase, None])
+
+    def _start_string(self, quote: str, key: bool, triple: bool):
+        self._token = "string"
+        self._token_key = key
+        self._quote = quote
+        self._triple = triple
+        self._parts = []
+        self.index += 3 if triple else 1
+
+    def _continue_token(self, final: bool) -> bool:
+        token = self._token
+        if token == "string":
+            return self._continue_string(final)
+        if token == "line_comment":
+            end = self.text.find("\n", self.index)
+            self.index = len(self.text) if end == -1 else end + 1
+            if end != -1:
+                self._token = None
+            return end != -1
+        if token == "block_comment":
+            end = self.text.find("*/", self.index)
+            if end == -1:
+                self.index = max(self.index, len(self.text) - 1)
+                return False
+            self.index = end + 2
+            self._token = None
+            return True
+        return self._continue_bare(final)
+
+    def _continue_string(self, final: bool) -> bool:
+        text = self.text
+        length = len(text)
+        quote = self._quote
+        while self.index < length:
+            start = self.index
+            if self._triple:
+                end = text.find(quote * 3, start)
+                if end == -1:
+                    # keep trailing quotes, they may start the closing triple
+                    safe = length
+                    while safe > start and length - safe < 2 and text[safe - 1] == quote:
+                        safe -= 1
+                    self._parts.append(text[start:safe])
+                    self.index = safe
+                    return False
+                self._parts.append(text[start:end])
+                self.index = end + 3
+                self._complete_token("".join(self._parts).strip())
+                return True
+
+            end = text.find(quote, start)
+            escape = text.find("\\", start, end if end != -1 else length)
+            if escape != -1:
+                self._parts.append(text[start:escape])
+                if escape + 1 >= length:
+                    self.index = escape
+                    return False
+                code = text[escape + 1]
+                if code == "u":
+                    digits = text[escape + 2 : escape + 6]
+                    if len(digits) < 4 and not final:
+                        self.index = escape
+                        return False
+                    try:
+                        self._parts.append(chr(int(digits, 16)))
+                    except ValueError:
+                        self._parts.append("\\u" + digits)
+                    self.index = escape + 2 + len(digits)
+                else:
+                    self._parts.append(_ESCAPES.get(code, ""))
+                    self.index = escape + 2
+                continue
+            if end == -1:
+                self._parts.append(text[start:])
+                self.index = length
+                return False
+            self._parts.append(text[start:end])
+            self.index = end + 1
+            self._complete_token("".join(self._parts))
+            return True
+        return False
+
+    def _continue_bare(self, final: bool) -> bool:
+        text = self.text
+        length = len(text)
+        index = self.index
+        if self._token == "number":
+            while index < length and text[index] in _NUMBER_CHARS:
+                index += 1
+        elif self._token_key:
+            while index < length and not text[index].isspace() and text[index] not in ":,}]":
+                index += 1
+        else:
+            while index < length and text[index] not in ":,}]":
+                index += 1
+        self._parts.append(text[self.index : index])
+        self.index = index
+        if index >= length:
+            return False
+        self._complete_token(self._token_value())
+        return True
+
+    def _token_value(self):
+        raw = "".join(self._parts)
+        if self._token == "string":
+            return raw.strip() if self._triple else raw
+        if self._token_key:
+            return raw
+        if self._token == "number":
+            try:
+                return int(raw)
+            except ValueError:
+                try:
+                    return float(raw)
+                except ValueError:
+                    return raw
+        stripped = raw.strip()
+        lowered = stripped.lower()
+        if lowered in _LITERALS:
+            return _LITERALS[lowered]
+        return stripped
+
+    def _complete_token(self, value):
+        token = self._token
+        self._token = None
+        self._parts = []
+        if token in ("line_comment", "block_comment"):
+            return
+        frame = self._stack[-1]
+        if self._token_key:
+            frame[2] = value
+            frame[1] = "colon"
+            self._token_key = False
+            return
+        if isinstance(frame[0], dict):
+            frame[0][frame[2]] = value
+        else:
+            frame[0].append(value)
+        frame[1] = "after"
+
+    def _apply_preview(self):
+        # show the token in progress (or a pending key) in the partial root
+        if not self._stack or self.completed:
+            return
+        container, phase, key = self._stack[-1]
+        token = self._token if self._token in ("string", "number", "unquoted") else None
+        if isinstance(container, dict):
+            if token and self._token_key:
+                key = self._token_value()
+                value = None
+            elif token:
+                value = self._token_value()
+            elif self._quote_pending:
+                value = ""
+            elif phase in ("colon", "value"):
+                value = None
+            else:
+                return
+            if key in container and (token is None or self._token_key):
+                return
+            container[key] = value
+            self._preview = (container, key)
+        elif token or self._quote_pending:
+            container.append(self._token_value() if token else "")
+            self._preview = (container, len(container) - 1)
+
+    def _clear_preview(self):
+        if self._preview is None:
+            return
+        container, key = self._preview
+        self._preview = None
+        if isinstance(container, dict):
+            container.pop(key, None)
+        elif container and key == len(container) - 1:
+            container.pop()
+
+
+def _copy_structure(value):
+    if isinstance(value, dict):
+        return {k: _copy_structure(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_structure(v) for v in value]
+    return value
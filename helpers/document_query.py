@@ -9,21 +9,20 @@ from helpers.vector_db import VectorDB
 os.environ["USER_AGENT"] = "@mixedbread-ai/unstructured"  # noqa E402
 from langchain_unstructured import UnstructuredLoader  # noqa E402
 
+from contextlib import aclosing
 from urllib.parse import urlparse
 from typing import Callable, Sequence, List, Optional, Tuple
 from datetime import datetime
 
 from langchain_community.document_loaders import AsyncHtmlLoader
 from langchain_community.document_loaders.text import TextLoader
-from langchain_community.document_loaders.pdf import PyMuPDFLoader
 from langchain_community.document_transformers import MarkdownifyTransformer
-from langchain_community.document_loaders.parsers.images import TesseractBlobParser
 
 from langchain_core.documents import Document
 from langchain.schema import SystemMessage, HumanMessage
 
 from helpers.print_style import PrintStyle
-from helpers import files, errors
+from helpers import files, errors, document_query_cache, pdf_extract
 from agent import Agent
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -97,8 +96,19 @@ class DocumentQueryStore:
     def init_vector_db(self):
         return VectorDB(self.agent, cache=True)
 
+    def _merge_vector_db(self, vector_db: VectorDB):
+        if not self.vector_db:
+            self.vector_db = vector_db
+        else:
+            self.vector_db.merge(vector_db)
+
     async def add_document(
-        self, text: str, document_uri: str, metadata: dict | None = None
+        self,
+        text: str,
+        document_uri: str,
+        metadata: dict | None = None,
+        cache_key: str | None = None,
+        sections: list[str] | None = None,
     ) -> tuple[bool, list[str]]:
         """
         Add a document to the store with the given URI.
@@ -107,6 +117,8 @@ class DocumentQueryStore:
             text: The document text content
             document_uri: The URI that uniquely identifies this document
             metadata: Optional metadata for the document
+            cache_key: Document cache key to persist the indexed chunks under
+            sections: Parts of the text chunked separately, like PDF pages
 
         Returns:
             True if successful, False otherwise
@@ -123,10 +135,10 @@ class DocumentQueryStore:
         doc_metadata["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         # Split text into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.DEFAULT_CHUNK_SIZE, chunk_overlap=self.DEFAULT_CHUNK_OVERLAP
-        )
-        chunks = text_splitter.split_text(text)
+        if sections is not None:
+            chunks = [chunk for section in sections for chunk in self.split_text(section)]
+        else:
+            chunks = self.split_text(text)
 
         # Create documents
         docs = []
@@ -141,11 +153,17 @@ class DocumentQueryStore:
             return False, []
 
         try:
-            # Initialize vector db if not already initialized
-            if not self.vector_db:
-                self.vector_db = self.init_vector_db()
-
-            ids = await self.vector_db.insert_documents(docs)
+            if cache_key:
+                # index the document on its own so it can be persisted
+                doc_db = self.init_vector_db()
+                ids = await doc_db.insert_documents(docs)
+                self._save_cached_document(doc_db, cache_key)
+                self._merge_vector_db(doc_db)
+            else:
+                # Initialize vector db if not already initialized
+                if not self.vector_db:
+                    self.vector_db = self.init_vector_db()
+                ids = await self.vector_db.insert_documents(docs)
             PrintStyle.standard(
                 f"Added document '{document_uri}' with {len(docs)} chunks"
             )
@@ -155,6 +173,67 @@ class DocumentQueryStore:
             PrintStyle.error(f"Error adding document '{document_uri}': {err_text}")
             return False, []
 
+    def split_text(self, text: str) -> list[str]:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.DEFAULT_CHUNK_SIZE, chunk_overlap=self.DEFAULT_CHUNK_OVERLAP
+        )
+        return text_splitter.split_text(text)
+
+    async def prefetch_embeddings(self, texts: list[str]):
+        """
+        Embed chunk texts ahead of add_document.
+
+        The embeddings land in the embeddings cache, so adding a document
+        while its later parts are still being extracted saves the wait.
+        """
+        if texts:
+            await VectorDB.embed_documents(self.agent, texts)
+
+    def _save_cached_document(self, doc_db: VectorDB, cache_key: str):
+        try:
+            embeddings_id = VectorDB.get_embeddings_id(self.agent)
+            doc_db.save_local(
+                document_query_cache.new_index_dir(cache_key, embeddings_id)
+            )
+            document_query_cache.index_saved(cache_key)
+        except Exception as e:
+            err_text = errors.format_error(e)
+            PrintStyle.error(f"Error caching document index: {err_text}")
+
+    async def load_cached_document(self, document_uri: str, cache_key: str) -> int:
+        """
+        Add chunks of a document indexed earlier from the document cache.
+
+        Args:
+            document_uri: The URI of the document
+            cache_key: Document cache key of the document version
+
+        Returns:
+            Number of chunks loaded, 0 if the document is not cached
+        """
+        embeddings_id = VectorDB.get_embeddings_id(self.agent)
+        folder = document_query_cache.get_index_dir(cache_key, embeddings_id)
+        if not folder:
+            return 0
+
+        try:
+            doc_db = VectorDB.load_local(self.agent, folder)
+        except Exception as e:
+            err_text = errors.format_error(e)
+            PrintStyle.error(f"Error loading cached document index: {err_text}")
+            return 0
+
+        # Delete existing document if it exists to avoid duplicates
+        document_uri = self.normalize_uri(document_uri)
+        await self.delete_document(document_uri)
+
+        count = len(doc_db.db.get_all_docs())
+        self._merge_vector_db(doc_db)
+        PrintStyle.standard(
+            f"Loaded document '{document_uri}' with {count} chunks from cache"
+        )
+        return count
+
     async def get_document(self, document_uri: str) -> Optional[Document]:
         """
         Retrieve a document by its URI.
@@ -450,38 +529,20 @@ class DocumentQueryHelper:
         scheme = url.scheme or "file"
         mimetype, encoding = mimetypes.guess_type(document_uri)
         mimetype = mimetype or "application/octet-stream"
+        headers = None
 
         if mimetype == "application/octet-stream":
             if url.scheme in ["http", "https"]:
-                response: aiohttp.ClientResponse | None = None
-                retries = 0
-                last_error = ""
-                while not response and retries < 3:
-                    try:
-                        async with aiohttp.ClientSession() as session:
-                            response = await session.head(
-                                document_uri,
-                                timeout=aiohttp.ClientTimeout(total=2.0),
-                                allow_redirects=True,
-                            )
-                            if response.status > 399:
-                                raise Exception(response.status)
-                            break
-                    except Exception as e:
-                        await asyncio.sleep(1)
-                        last_error = str(e)
-                    retries += 1
-                    await self.agent.handle_intervention()
-
-                if not response:
+                headers, last_error = await self._fetch_headers(document_uri)
+                if headers is None:
                     raise ValueError(
                         f"DocumentQueryHelper::document_get_content: Document fetch error: {document_uri} ({last_error})"
                     )
 
-                mimetype = response.headers["content-type"]
-                if "content-length" in response.headers:
+                mimetype = headers["content-type"]
+                if "content-length" in headers:
                     content_length = (
-                        float(response.headers["content-length"]) / 1024 / 1024
+                        float(headers["content-length"]) / 1024 / 1024
                     )  # MB
                     if content_length > 50.0:
                         raise ValueError(
@@ -512,33 +573,71 @@ class DocumentQueryHelper:
         await self.agent.handle_intervention()
         exists = await self.store.document_exists(document_uri_norm)
         document_content = ""
+        sections: list[str] | None = None
         if not exists:
             await self.agent.handle_intervention()
-            if mimetype.startswith("image/"):
-                document_content = self.handle_image_document(document_uri, scheme)
-            elif mimetype == "text/html":
-                document_content = self.handle_html_document(document_uri, scheme)
-            elif mimetype.startswith("text/") or mimetype == "application/json":
-                document_content = self.handle_text_document(document_uri, scheme)
-            elif mimetype == "application/pdf":
-                document_content = self.handle_pdf_document(document_uri, scheme)
+            fingerprint = await self.get_document_fingerprint(
+                document_uri, scheme, headers
+            )
+            cache_key = (
+                document_query_cache.make_key(document_uri_norm, fingerprint)
+                if fingerprint
+                else None
+            )
+
+            cached_content = (
+                document_query_cache.get_content(cache_key) if cache_key else None
+            )
+            if cached_content is not None:
+                document_content = cached_content
+                self.progress_callback(f"Loaded document content from cache")
             else:
-                document_content = self.handle_unstructured_document(
-                    document_uri, scheme
-                )
+                if mimetype.startswith("image/"):
+                    document_content = self.handle_image_document(document_uri, scheme)
+                elif mimetype == "text/html":
+                    document_content = self.handle_html_document(document_uri, scheme)
+                elif mimetype.startswith("text/") or mimetype == "application/json":
+                    document_content = self.handle_text_document(document_uri, scheme)
+                elif mimetype == "application/pdf":
+                    sections = await self.handle_pdf_document(
+                        document_uri, scheme, prefetch_embeddings=add_to_db
+                    )
+                    document_content = "\n".join(sections)
+                else:
+                    document_content = self.handle_unstructured_document(
+                        document_uri, scheme
+                    )
+                if cache_key and document_content:
+                    document_query_cache.add_content(
+                        cache_key, document_uri_norm, document_content
+                    )
+
             if add_to_db:
-                self.progress_callback(f"Indexing document")
                 await self.agent.handle_intervention()
                 async with self.store_lock:
-                    success, ids = await self.store.add_document(
-                        document_content, document_uri_norm
-                    )
-                if not success:
-                    self.progress_callback(f"Failed to index document")
-                    raise ValueError(
-                        f"DocumentQueryHelper::document_get_content: Failed to index document: {document_uri_norm}"
-                    )
-                self.progress_callback(f"Indexed {len(ids)} chunks")
+                    loaded = 0
+                    if cache_key and cached_content is not None:
+                        loaded = await self.store.load_cached_document(
+                            document_uri_norm, cache_key
+                        )
+                    if loaded:
+                        self.progress_callback(
+                            f"Loaded {loaded} indexed chunks from cache"
+                        )
+                    else:
+                        self.progress_callback(f"Indexing document")
+                        success, ids = await self.store.add_document(
+                            document_content,
+                            document_uri_norm,
+                            cache_key=cache_key,
+                            sections=sections,
+                        )
+                        if not success:
+                            self.progress_callback(f"Failed to index document")
+                            raise ValueError(
+                                f"DocumentQueryHelper::document_get_content: Failed to index document: {document_uri_norm}"
+                            )
+                        self.progress_callback(f"Indexed {len(ids)} chunks")
         else:
             await self.agent.handle_intervention()
             doc = await self.store.get_document(document_uri_norm)
@@ -550,6 +649,60 @@ class DocumentQueryHelper:
                 )
         return document_content
 
+    async def _fetch_headers(self, document_uri: str, attempts: int = 3):
+        """HEAD request for a remote document, returns (headers, last_error)."""
+        response: aiohttp.ClientResponse | None = None
+        retries = 0
+        last_error = ""
+        while not response and retries < attempts:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    response = await session.head(
+                        document_uri,
+                        timeout=aiohttp.ClientTimeout(total=2.0),
+                        allow_redirects=True,
+                    )
+                    if response.status > 399:
+                        raise Exception(response.status)
+                    break
+            except Exception as e:
+                response = None
+                await asyncio.sleep(1)
+                last_error = str(e)
+            retries += 1
+            await self.agent.handle_intervention()
+
+        return (response.headers if response else None), last_error
+
+    async def get_document_fingerprint(
+        self, document: str, scheme: str, headers=None
+    ) -> str | None:
+        """
+        Identify the version of a document for the document cache.
+
+        Local files are identified by size and mtime, remote ones by their
+        ETag or Last-Modified header. None if the version can't be told,
+        such documents are not cached.
+        """
+        if scheme == "file":
+            try:
+                stat = os.stat(document)
+            except OSError:
+                return None
+            return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+        if scheme in ["http", "https"]:
+            if headers is None:
+                headers, _ = await self._fetch_headers(document, attempts=1)
+            if headers is None:
+                return None
+            if headers.get("etag"):
+                return f"etag:{headers['etag']}"
+            if headers.get("last-modified"):
+                return f"modified:{headers['last-modified']}:{headers.get('content-length', '')}"
+
+        return None
+
     def handle_image_document(self, document: str, scheme: str) -> str:
         return self.handle_unstructured_document(document, scheme)
 
@@ -590,72 +743,92 @@ class DocumentQueryHelper:
 
         return "\n".join([element.page_content for element in elements])
 
-    def handle_pdf_document(self, document: str, scheme: str) -> str:
-        temp_file_path = ""
+    async def handle_pdf_document(
+        self, document: str, scheme: str, prefetch_embeddings: bool = False
+    ) -> list[str]:
+        """Extract the text of a PDF, page by page in parallel, returns the pages."""
         if scheme == "file":
             # Use RFC file operations to read the PDF file as binary
             file_content_bytes = files.read_file_bin(document)
-            # Create a temporary file for PyMuPDFLoader since it needs a file path
-            import tempfile
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                temp_file.write(file_content_bytes)
-                temp_file_path = temp_file.name
         elif scheme in ["http", "https"]:
-            # download the file from the web url to a temporary file using python libraries for downloading
+            # download the file from the web url using python libraries for downloading
             import requests
-            import tempfile
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                response = requests.get(document, timeout=10.0)
-                if response.status_code != 200:
-                    raise ValueError(
-                        f"DocumentQueryHelper::handle_pdf_document: Failed to download PDF from {document}: {response.status_code}"
-                    )
-                temp_file.write(response.content)
-                temp_file_path = temp_file.name
+            response = requests.get(document, timeout=10.0)
+            if response.status_code != 200:
+                raise ValueError(
+                    f"DocumentQueryHelper::handle_pdf_document: Failed to download PDF from {document}: {response.status_code}"
+                )
+            file_content_bytes = response.content
         else:
             raise ValueError(f"Unsupported scheme: {scheme}")
 
-        if not os.path.exists(temp_file_path):
-            raise ValueError(
-                f"DocumentQueryHelper::handle_pdf_document: Temporary file not found: {temp_file_path}"
-            )
+        # pages are cached by content, an interrupted extraction resumes
+        pages_key = document_query_cache.make_content_key(file_content_bytes)
+        pages = document_query_cache.get_pages(pages_key)
 
-        try:
-            try:
-                loader = PyMuPDFLoader(
-                    temp_file_path,
-                    mode="single",
-                    extract_tables="markdown",
-                    extract_images=True,
-                    images_inner_format="text",
-                    images_parser=TesseractBlobParser(),
-                    pages_delimiter="\n",
-                )
-                elements: list[Document] = loader.load()
-                contents = "\n".join([element.page_content for element in elements])
-            except Exception as e:
-                PrintStyle.error(
-                    f"DocumentQueryHelper::handle_pdf_document: Error loading with PyMuPDF: {e}"
-                )
-                contents = ""
+        # Create a temporary file for the workers since they need a file path
+        import tempfile
 
-            if not contents:
-                import pdf2image
-                import pytesseract
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+            temp_file.write(file_content_bytes)
+            temp_file_path = temp_file.name
 
-                PrintStyle.debug(
-                    f"DocumentQueryHelper::handle_pdf_document: FALLBACK Converting PDF to images: {temp_file_path}"
-                )
+        prefetches: list[asyncio.Task] = []
+
+        async def embed(previous: asyncio.Task | None, chunks: list[str]):
+            # one batch at a time, not a burst of requests to the embeddings model
+            if previous:
+                await asyncio.gather(previous, return_exceptions=True)
+            await self.store.prefetch_embeddings(chunks)
 
-                # Convert PDF to images
-                pages = pdf2image.convert_from_path(temp_file_path)  # type: ignore
-                for page in pages:
-                    contents += pytesseract.image_to_string(page) + "\n\n"
+        def prefetch(batch: dict[int, str]):
+            if prefetch_embeddings and batch:
+                chunks = [
+                    chunk
+                    for number in sorted(batch)
+                    for chunk in self.store.split_text(batch[number])
+                ]
+                previous = prefetches[-1] if prefetches else None
+                prefetches.append(asyncio.create_task(embed(previous, chunks)))
+
+        try:
+            loop = asyncio.get_running_loop()
+            page_count = await loop.run_in_executor(
+                None, pdf_extract.count_pages, temp_file_path
+            )
+            pages = {n: text for n, text in pages.items() if n < page_count}
+            prefetch(pages)
+            missing = [n for n in range(page_count) if n not in pages]
+            if missing:
+                self.progress_callback(
+                    f"Extracting {len(missing)} of {page_count} PDF pages"
+                )
+                async with aclosing(
+                    pdf_extract.iter_pages(temp_file_path, missing)
+                ) as batches:
+                    async for batch in batches:
+                        pages.update(batch)
+                        document_query_cache.add_pages(pages_key, batch)
+                        prefetch(batch)
+                        self.progress_callback(
+                            f"Extracted {len(pages)} of {page_count} PDF pages"
+                        )
+                        await self.agent.handle_intervention()
+
+            # embeddings are prefetched best effort, add_document embeds the rest
+            results = await asyncio.gather(*prefetches, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    PrintStyle.error(
+                        f"DocumentQueryHelper::handle_pdf_document: Error prefetching embeddings: {result}"
+                    )
+                    break
 
-            return contents
+            return [pages[n] for n in range(page_count)]
         finally:
+            for task in prefetches:
+                task.cancel()
             os.unlink(temp_file_path)
 
     def handle_unstructured_document(self, document: str, scheme: str) -> str:
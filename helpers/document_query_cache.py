@@ -0,0 +1,228 @@
+"""Persistent cache of documents processed by the document_query tool.
+
+Entries are keyed by the normalized document URI and a fingerprint of its
+version (mtime and size of a local file, ETag or Last-Modified of a remote
+one), so repeated questions about an unchanged document reuse the extracted
+text and the embedded chunks instead of parsing and embedding it again.
+Each entry is a folder under tmp/document_query holding the text and one
+FAISS index per embeddings model. PDF pages are cached in entries of their
+own, keyed by the file content, as soon as each page is extracted. The
+least recently used entries are pruned once the cache grows past
+MAX_ENTRIES or MAX_BYTES.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from helpers import files
+
+DOCUMENT_CACHE_DIR = "tmp/document_query"
+CONTENT_FILE = "content.txt"
+META_FILE = "meta.json"
+INDEX_DIR = "index"
+PAGES_DIR = "pages"
+MAX_ENTRIES = 200
+MAX_BYTES = 2 * 1024 * 1024 * 1024
+PRUNE_TO_RATIO = 0.9  # prune a little below the bounds, not on every add
+
+_lock = threading.Lock()
+_index: dict[str, tuple[float, int]] | None = None  # key -> (last use, bytes)
+
+
+def make_key(document_uri: str, fingerprint: str) -> str:
+    payload = json.dumps([document_uri, fingerprint], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_content_key(content: bytes) -> str:
+    return hashlib.sha256(b"pages:" + content).hexdigest()
+
+
+def get_content(key: str) -> str | None:
+    path = os.path.join(_entry_dir(key), CONTENT_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except OSError:
+        return None
+    _touch(key)
+    return content
+
+
+def add_content(key: str, document_uri: str, content: str) -> None:
+    entry = _entry_dir(key)
+    os.makedirs(entry, exist_ok=True)
+    _write_atomic(os.path.join(entry, CONTENT_FILE), content)
+    _write_atomic(
+        os.path.join(entry, META_FILE),
+        json.dumps({"document_uri": document_uri, "created": time.time()}),
+    )
+    _register(key)
+
+
+def get_index_dir(key: str, embeddings_id: str) -> str | None:
+    """Folder of the document's chunks indexed with the embeddings model, if saved."""
+    folder = _index_dir(key, embeddings_id)
+    if not os.path.isfile(os.path.join(folder, "index.faiss")):
+        return None
+    _touch(key)
+    return folder
+
+
+def new_index_dir(key: str, embeddings_id: str) -> str:
+    """Folder to save the document's index to, call index_saved when done."""
+    folder = _index_dir(key, embeddings_id)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def index_saved(key: str) -> None:
+    _register(key)
+
+
+def get_pages(key: str) -> dict[int, str]:
+    """Pages extracted earlier, by 0-based page number."""
+    folder = os.path.join(_entry_dir(key), PAGES_DIR)
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return {}
+    pages: dict[int, str] = {}
+    for name in names:
+        if not name.endswith(".txt"):
+            continue
+        try:
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                pages[int(name[:-4])] = f.read()
+        except (OSError, ValueError):
+            pass
+    if pages:
+        _touch(key)
+    return pages
+
+
+def add_pages(key: str, pages: dict[int, str]) -> None:
+    entry = _entry_dir(key)
+    meta = os.path.join(entry, META_FILE)
+    if not os.path.exists(meta):
+        os.makedirs(entry, exist_ok=True)
+        _write_atomic(meta, json.dumps({"created": time.time()}))
+    folder = os.path.join(entry, PAGES_DIR)
+    os.makedirs(folder, exist_ok=True)
+    written = 0
+    for number, text in pages.items():
+        written += _write_atomic(os.path.join(folder, f"{number}.txt"), text)
+    # pages arrive in small batches, track the size instead of walking the entry each time
+    _register(key, added=written)
+
+
+def clear() -> None:
+    global _index
+    with _lock:
+        files.delete_dir(DOCUMENT_CACHE_DIR)
+        _index = None
+
+
+def _entry_dir(key: str) -> str:
+    return files.get_abs_path(DOCUMENT_CACHE_DIR, key[:2], key)
+
+
+def _index_dir(key: str, embeddings_id: str) -> str:
+    return os.path.join(
+        _entry_dir(key), INDEX_DIR, files.safe_file_name(embeddings_id)
+    )
+
+
+def _write_atomic(path: str, content: str) -> int:
+    """Write the file in place of the previous one, returns the change in bytes."""
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(content)
+    try:
+        previous = os.path.getsize(path)
+    except OSError:
+        previous = 0
+    size = os.path.getsize(tmp)
+    os.replace(tmp, path)
+    return size - previous
+
+
+def _touch(key: str) -> None:
+    now = time.time()
+    try:
+        os.utime(os.path.join(_entry_dir(key), META_FILE), (now, now))
+    except OSError:
+        pass
+    with _lock:
+        if _index is not None and key in _index:
+            _index[key] = (now, _index[key][1])
+
+
+def _register(key: str, added: int | None = None) -> None:
+    # added: bytes written since the last registration, the entry is walked if unknown
+    size = _dir_size(_entry_dir(key)) if added is None else None
+    with _lock:
+        loaded = _index is not None
+        index = _load_index()
+        if size is None:
+            if key not in index:
+                size = _dir_size(_entry_dir(key))
+            elif not loaded:
+                size = index[key][1]  # just measured while loading the index
+            else:
+                size = index[key][1] + added  # type: ignore[operator]
+        index[key] = (time.time(), size)
+        total = sum(entry[1] for entry in index.values())
+        if len(index) > MAX_ENTRIES or total > MAX_BYTES:
+            _prune(
+                index,
+                int(MAX_ENTRIES * PRUNE_TO_RATIO),
+                int(MAX_BYTES * PRUNE_TO_RATIO),
+                keep=key,
+            )
+
+
+def _load_index() -> dict[str, tuple[float, int]]:
+    global _index
+    if _index is None:
+        _index = {}
+        root = files.get_abs_path(DOCUMENT_CACHE_DIR)
+        if os.path.isdir(root):
+            for folder in os.scandir(root):
+                if not folder.is_dir():
+                    continue
+                for entry in os.scandir(folder.path):
+                    meta = os.path.join(entry.path, META_FILE)
+                    try:
+                        used = os.stat(meta).st_mtime
+                    except OSError:
+                        continue  # unfinished entry, overwritten on next add
+                    _index[entry.name] = (used, _dir_size(entry.path))
+    return _index
+
+
+def _prune(
+    index: dict[str, tuple[float, int]], max_entries: int, max_bytes: int, keep: str
+) -> None:
+    total = sum(entry[1] for entry in index.values())
+    for key in sorted(index, key=lambda k: index[k][0]):
+        if len(index) <= max_entries and total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        total -= index.pop(key)[1]
+        files.delete_dir(_entry_dir(key))
+
+
+def _dir_size(path: str) -> int:
+    size = 0
+    for root, _dirs, names in os.walk(path):
+        for name in names:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return size
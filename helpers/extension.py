@@ -1,4 +1,6 @@
 from abc import abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
 from typing import Any, Awaitable, Type, cast
 from helpers import modules, files
 from helpers import cache
@@ -6,6 +8,9 @@ from typing import TYPE_CHECKING
 from functools import wraps
 import inspect
 import os
+import threading
+import time
+import weakref
 
 from helpers.print_style import PrintStyle
 
@@ -18,6 +23,8 @@ USER_EXTENSIONS_FOLDER = "usr/extensions"
 
 _EXTENSIONS_CACHE_AREA = "extension_folder_classes(extensions)"
 _CLASSES_CACHE_AREA = "extension_classes(extensions)"
+_PLANS_CACHE_AREA = "extension_plans(extensions)"
+TOOLS_CACHE_AREA = "tool_classes(extensions)"
 # cache.toggle_area(_EXTENSIONS_CACHE_AREA, False)
 # cache.toggle_area(_CLASSES_CACHE_AREA, False)
 
@@ -27,25 +34,73 @@ class _Unset:
 
 
 _UNSET = _Unset()
-_EXTENSIONS_LOG_COUNTS: dict[str, int] = {}
 
+_PROFILE_SAMPLES = 1000  # recent durations kept per extension for percentiles
+_profile_enabled = os.getenv("EXTENSIONS_PROFILE", "").lower() in ("1", "true", "yes")
+_profile_lock = threading.Lock()
+_profile_points: dict[str, "_ProfileStats"] = {}
+_profile_extensions: dict[str, "_ProfileStats"] = {}
 
-# debug - extensions call counter
-def _log_extension_call(name: str):
-    try:
-        every = int(os.getenv("EXTENSIONS_LOG", "0"))
-    except ValueError:
-        return
 
-    if every <= 0:
-        return
+@dataclass(slots=True)
+class _ProfileStats:
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    samples: deque[float] = field(
+        default_factory=lambda: deque(maxlen=_PROFILE_SAMPLES)
+    )
+
+    def add(self, duration: float):
+        self.calls += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.samples.append(duration)
+
+    def output(self, name: str) -> dict[str, Any]:
+        samples = sorted(self.samples)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+        return {
+            "name": name,
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total * 1000 / self.calls, 3) if self.calls else 0.0,
+            "p95_ms": round(p95 * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+def toggle_profiling(enabled: bool) -> None:
+    global _profile_enabled
+    _profile_enabled = enabled
+
+
+def is_profiling() -> bool:
+    return _profile_enabled
+
+
+def reset_profile() -> None:
+    with _profile_lock:
+        _profile_points.clear()
+        _profile_extensions.clear()
 
-    _EXTENSIONS_LOG_COUNTS[name] = _EXTENSIONS_LOG_COUNTS.get(name, 0) + 1
-    _EXTENSIONS_LOG_COUNTS["_total"] = _EXTENSIONS_LOG_COUNTS.get("_total", 0) + 1
 
-    if _EXTENSIONS_LOG_COUNTS["_total"] % every == 0:
-        for key, count in _EXTENSIONS_LOG_COUNTS.items():
-            print(f"{str(count):<6} {key}")
+def get_profile() -> dict[str, Any]:
+    """Call counts and wall times per extension point and extension, slowest first."""
+    with _profile_lock:
+        points = [stats.output(name) for name, stats in _profile_points.items()]
+        exts = [stats.output(name) for name, stats in _profile_extensions.items()]
+    points.sort(key=lambda item: item["total_ms"], reverse=True)
+    exts.sort(key=lambda item: item["total_ms"], reverse=True)
+    return {"enabled": _profile_enabled, "points": points, "extensions": exts}
+
+
+def _profile_record(table: dict[str, _ProfileStats], name: str, duration: float):
+    with _profile_lock:
+        stats = table.get(name)
+        if stats is None:
+            stats = table[name] = _ProfileStats()
+        stats.add(duration)
 
 
 # decorator to enable implicit extension points in existing functions
@@ -211,6 +266,9 @@ def extensible(func):
 
 class Extension:
 
+    # instances are reused for the same agent unless the extension keeps state on self
+    reusable: bool = True
+
     def __init__(self, agent: "Agent|None", **kwargs):
         self.agent: "Agent|None" = agent
         self.kwargs = kwargs
@@ -220,34 +278,94 @@ class Extension:
         pass
 
 
+@dataclass(frozen=True, slots=True)
+class _DispatchPlan:
+    extension_point: str
+    classes: tuple[Type[Extension], ...]
+    profile_names: tuple[str, ...]
+
+
+_instances_lock = threading.Lock()
+_agent_instances: "weakref.WeakKeyDictionary[Any, dict[Type[Extension], Extension]]" = (
+    weakref.WeakKeyDictionary()
+)
+_agentless_instances: dict[Type[Extension], Extension] = {}
+_stateful_classes: "weakref.WeakSet[Type[Extension]]" = weakref.WeakSet()
+_BASE_ATTRIBUTES = frozenset(("agent", "kwargs"))
+
+
+def _get_instance(cls: Type[Extension], agent: "Agent|None") -> Extension:
+    if not cls.reusable or cls in _stateful_classes:
+        return cls(agent=agent)
+    with _instances_lock:
+        if agent is None:
+            pool = _agentless_instances
+        else:
+            try:
+                pool = _agent_instances.setdefault(agent, {})
+            except TypeError:  # agent can't be weakly referenced
+                return cls(agent=agent)
+        instance = pool.get(cls)
+        if instance is None:
+            instance = pool[cls] = cls(agent=agent)
+        return instance
+
+
+def _check_instance(cls: Type[Extension], instance: Extension, agent: "Agent|None"):
+    # an extension that stored extra attributes on itself is never shared again
+    if instance.__dict__.keys() <= _BASE_ATTRIBUTES or cls in _stateful_classes:
+        return
+    with _instances_lock:
+        _stateful_classes.add(cls)
+        pool = _agentless_instances if agent is None else _agent_instances.get(agent)
+        if pool is not None and pool.get(cls) is instance:
+            del pool[cls]
+
+
 async def call_extensions_async(
     extension_point: str, agent: "Agent|None" = None, **kwargs
 ):
-    _log_extension_call(extension_point)
-
-    # fetch classes for this extension point and agent
-    classes = _get_extension_classes(extension_point, agent=agent, **kwargs)
+    # fetch compiled plan for this extension point and agent
+    plan = _get_dispatch_plan(extension_point, agent=agent)
+    profiling = _profile_enabled
+    point_start = time.perf_counter() if profiling else 0.0
 
     # execute unique extensions
-    for cls in classes:
-        result = cls(agent=agent).execute(**kwargs)
+    for cls, name in zip(plan.classes, plan.profile_names):
+        instance = _get_instance(cls, agent)
+        start = time.perf_counter() if profiling else 0.0
+        result = instance.execute(**kwargs)
         if isinstance(result, Awaitable):
             await result
+        if profiling:
+            _profile_record(_profile_extensions, name, time.perf_counter() - start)
+        _check_instance(cls, instance, agent)
 
+    if profiling:
+        _profile_record(_profile_points, extension_point, time.perf_counter() - point_start)
 
-def call_extensions_sync(extension_point: str, agent: "Agent|None" = None, **kwargs):
-    _log_extension_call(extension_point)
 
-    # fetch classes for this extension point and agent
-    classes = _get_extension_classes(extension_point, agent=agent, **kwargs)
+def call_extensions_sync(extension_point: str, agent: "Agent|None" = None, **kwargs):
+    # fetch compiled plan for this extension point and agent
+    plan = _get_dispatch_plan(extension_point, agent=agent)
+    profiling = _profile_enabled
+    point_start = time.perf_counter() if profiling else 0.0
 
     # execute unique extensions
-    for cls in classes:
-        result = cls(agent=agent).execute(**kwargs)
+    for cls, name in zip(plan.classes, plan.profile_names):
+        instance = _get_instance(cls, agent)
+        start = time.perf_counter() if profiling else 0.0
+        result = instance.execute(**kwargs)
         if isinstance(result, Awaitable):
             raise ValueError(
                 f"Extension {cls.__name__} returned awaitable in sync mode"
             )
+        if profiling:
+            _profile_record(_profile_extensions, name, time.perf_counter() - start)
+        _check_instance(cls, instance, agent)
+
+    if profiling:
+        _profile_record(_profile_points, extension_point, time.perf_counter() - point_start)
 
 
 def get_webui_extensions(
@@ -279,6 +397,27 @@ def get_webui_extensions(
     return entries
 
 
+def _get_dispatch_plan(
+    extension_point: str, agent: "Agent|None" = None
+) -> _DispatchPlan:
+    cache_key = cache.determine_cache_key(agent, extension_point)
+    cached = cache.get(_PLANS_CACHE_AREA, cache_key)
+    if cached is not None:
+        return cached
+
+    classes = tuple(_get_extension_classes(extension_point, agent=agent))
+    plan = _DispatchPlan(
+        extension_point=extension_point,
+        classes=classes,
+        profile_names=tuple(
+            f"{extension_point}/{_get_file_from_module(cls.__module__)}"
+            for cls in classes
+        ),
+    )
+    cache.add(_PLANS_CACHE_AREA, cache_key, plan)
+    return plan
+
+
 def _get_extension_classes(
     extension_point: str, agent: "Agent|None" = None, **kwargs
 ) -> list[Type[Extension]]:
@@ -331,8 +470,13 @@ def register_extensions_watchdogs():
     def extensions_changed(items: list[watchdog.WatchItem]):
         cache.clear(_EXTENSIONS_CACHE_AREA)
         cache.clear(_CLASSES_CACHE_AREA)
+        cache.clear(_PLANS_CACHE_AREA)
         PrintStyle.debug("Extensions watchdog triggered:", items)
 
+    def tools_changed(items: list[watchdog.WatchItem]):
+        cache.clear(TOOLS_CACHE_AREA)
+        PrintStyle.debug("Tools watchdog triggered:", items)
+
     # extensions and usr/extensions
     watchdog.add_watchdog(
         id="extensions_base",
@@ -361,3 +505,23 @@ def register_extensions_watchdogs():
         patterns=[f"*/{files.EXTENSIONS_DIR}/**/*"],
         handler=extensions_changed,
     )
+
+    # tools
+    watchdog.add_watchdog(
+        id="extensions_tools_base",
+        roots=[files.get_abs_path("tools")],
+        patterns=["*.py"],
+        handler=tools_changed,
+    )
+
+    # usr/**/tools, agents/**/tools and plugins/**/tools
+    watchdog.add_watchdog(
+        id="extensions_tools",
+        roots=[
+            files.get_abs_path(files.USER_DIR),
+            files.get_abs_path(files.AGENTS_DIR),
+            files.get_abs_path(files.PLUGINS_DIR),
+        ],
+        patterns=["tools/*.py"],
+        handler=tools_changed,
+    )
@@ -0,0 +1,558 @@
+"""FAISS vector store with a choice of index type and metadata pre-filtering.
+
+A flat index compares the query with every vector, which is exact but
+scales linearly. HNSW and IVF indexes are approximate and search large
+stores in a fraction of the time:
+
+- flat: IndexFlatIP, labels are positions like in the plain FAISS store.
+- hnsw: IndexHNSWFlat with explicit labels. HNSW cannot remove vectors,
+  deleted ones are excluded from searches and the graph is rebuilt once
+  they make up REBUILD_DELETED_RATIO of it.
+- ivf: an exact index with explicit labels until IVF_MIN_TRAIN vectors,
+  then IndexIVFFlat trained on the stored vectors, retrained whenever the
+  store grows IVF_RETRAIN_GROWTH times past the size it was trained on.
+
+Those rebuilds take seconds on large stores, so they run in the background
+from a copy of the vectors. The current index keeps serving searches and
+taking changes meanwhile; the changes are replayed onto the new index when
+the store switches to it. Only adds and deletes switch, searches may run on
+executor threads concurrently with them and just use the current index.
+
+Filters like "area == 'main' or area == 'fragments'" on one of the store's
+prefilter_keys are applied inside FAISS with an ID selector built from
+label sets per metadata value, instead of post-filtering candidates in
+Python. Small selections on approximate indexes are searched exactly, for
+larger ones the search effort grows with the share of vectors filtered out,
+so a selective filter still finds enough candidates.
+"""
+
+import ast
+import math
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
+from helpers import faiss_monkey_patch
+import faiss
+
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+from helpers.print_style import PrintStyle
+
+INDEX_FLAT = "flat"
+INDEX_HNSW = "hnsw"
+INDEX_IVF = "ivf"
+INDEX_TYPES = (INDEX_FLAT, INDEX_HNSW, INDEX_IVF)
+
+HNSW_M = 32  # graph neighbours per vector
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = 64
+HNSW_MAX_EF_SEARCH = 1024
+IVF_MIN_TRAIN = 10_000  # below this many vectors the exact search is fast enough
+IVF_LISTS_FACTOR = 4  # lists = factor * sqrt(vectors)
+IVF_TRAIN_POINTS_PER_LIST = 64  # training sample size per list
+IVF_RETRAIN_GROWTH = 4
+IVF_MIN_NPROBE = 16
+IVF_NPROBE_RATIO = 1 / 16  # share of lists scanned per search
+REBUILD_DELETED_RATIO = 0.2
+EXACT_SEARCH_MAX = 4096  # selections up to this size skip the approximate index
+
+_rebuild_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="FaissRebuild")
+
+
+def create_index(index_type: str, dim: int) -> faiss.Index:
+    """Empty inner product index of the given type."""
+    if index_type == INDEX_FLAT:
+        return faiss.IndexFlatIP(dim)
+    if index_type == INDEX_HNSW:
+        hnsw = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return faiss.IndexIDMap2(hnsw)
+    if index_type == INDEX_IVF:
+        # exact until there are enough vectors to train on
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    raise ValueError(
+        f"Unknown index type '{index_type}', expected one of {', '.join(INDEX_TYPES)}"
+    )
+
+
+def get_index_type(index: faiss.Index) -> str:
+    if isinstance(index, faiss.IndexIVF):
+        return INDEX_IVF
+    if isinstance(index, faiss.IndexIDMap2):
+        if isinstance(faiss.downcast_index(index.index), faiss.IndexHNSW):
+            return INDEX_HNSW
+        return INDEX_IVF
+    return INDEX_FLAT
+
+
+def parse_prefilter(condition: str) -> tuple[str, frozenset] | None:
+    """Key and values of a filter that only matches a metadata key to constants.
+
+    Accepts "key == 'a'", "key == 'a' or key == 'b'" and "key in ['a', 'b']",
+    returns None for anything else.
+    """
+    try:
+        tree = ast.parse(condition.strip(), mode="eval").body
+    except SyntaxError:
+        return None
+    if isinstance(tree, ast.BoolOp) and isinstance(tree.op, ast.Or):
+        terms = tree.values
+    else:
+        terms = [tree]
+
+    key = None
+    values = set()
+    for term in terms:
+        parsed = _parse_term(term)
+        if not parsed or (key is not None and parsed[0] != key):
+            return None
+        key = parsed[0]
+        try:
+            values.update(parsed[1])
+        except TypeError:
+            return None  # unhashable constant
+    return (key, frozenset(values)) if key else None
+
+
+def _parse_term(term: ast.expr) -> tuple[str, list] | None:
+    if not isinstance(term, ast.Compare) or len(term.ops) != 1:
+        return None
+    left, op, right = term.left, term.ops[0], term.comparators[0]
+    if isinstance(op, ast.Eq):
+        if isinstance(right, ast.Name):
+            left, right = right, left
+        if isinstance(left, ast.Name) and isinstance(right, ast.Constant):
+            return left.id, [right.value]
+    elif (
+        isinstance(op, ast.In)
+        and isinstance(left, ast.Name)
+        and isinstance(right, (ast.List, ast.Tuple, ast.Set))
+        and all(isinstance(item, ast.Constant) for item in right.elts)
+    ):
+        return left.id, [item.value for item in right.elts]  # type: ignore
+    return None
+
+
+class _Selection:
+    def __init__(self, labels: np.ndarray, vectors: np.ndarray | None):
+        self.labels = labels
+        self.selector = faiss.IDSelectorBatch(labels)
+        self.vectors = vectors  # set for an exact search of small selections
+
+
+class _Rebuild:
+    def __init__(self, future: Future, next_label: int):
+        self.future = future
+        self.next_label = next_label  # labels from here on were added meanwhile
+        self.added: list[tuple[np.ndarray, np.ndarray]] = []  # labels, vectors
+        self.deleted: set[int] = set()
+
+
+class IndexedFaiss(FAISS):
+    """FAISS store supporting flat, HNSW and IVF inner product indexes.
+
+    Searches accept a prefilter=(key, values) argument, parse_prefilter
+    creates it from a filter condition. Keys must be in prefilter_keys.
+    """
+
+    prefilter_keys: tuple[str, ...] = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index_type = get_index_type(self.index)
+        self._labels_by_value: dict[str, dict[Any, set[int]]] | None = None
+        self._selections: dict[tuple[str, frozenset], _Selection | None] = {}
+        self._deleted: set[int] = set()
+        self._pending_rebuild: _Rebuild | None = None
+        if self.index_type == INDEX_HNSW and self.index.ntotal > len(
+            self.index_to_docstore_id
+        ):
+            # vectors deleted before the index was saved are still in the graph
+            labels = faiss.vector_to_array(self.index.id_map)
+            self._deleted = set(labels.tolist()) - set(self.index_to_docstore_id)
+        self._next_label = (
+            0
+            if self.index_type == INDEX_FLAT
+            else max([*self.index_to_docstore_id, *self._deleted], default=-1) + 1
+        )
+
+    def set_index_type(self, index_type: str) -> bool:
+        """Rebuild the index as another type, returns False if it already is one."""
+        if index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index type '{index_type}', expected one of {', '.join(INDEX_TYPES)}"
+            )
+        if index_type == self.index_type:
+            return False
+        self._pending_rebuild = None  # superseded
+        self._rebuild(index_type)
+        return True
+
+    def wait_rebuild(self):
+        """Wait for a background rebuild and switch to the rebuilt index.
+
+        Must not run concurrently with adds or deletes, like those.
+        """
+        if self._pending_rebuild:
+            wait([self._pending_rebuild.future])
+            self._finish_rebuild()
+
+    def _FAISS__add(
+        self,
+        texts: Iterable[str],
+        embeddings: Iterable[List[float]],
+        metadatas: Optional[Iterable[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        if self.index_type == INDEX_FLAT:
+            start = len(self.index_to_docstore_id)
+            ids = super()._FAISS__add(texts, embeddings, metadatas=metadatas, ids=ids)  # type: ignore
+            self._on_added(range(start, start + len(ids)))
+            return ids
+
+        self._finish_rebuild()
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        if not len(texts) == len(ids) == len(metadatas):
+            raise ValueError("texts, metadatas and ids must have the same length")
+        if len(ids) != len(set(ids)):
+            raise ValueError("Duplicate ids found in the ids list.")
+        vectors = np.array(embeddings, dtype=np.float32)
+        if len(vectors) != len(texts):
+            raise ValueError("texts and embeddings must have the same length")
+        if self._normalize_L2:
+            faiss.normalize_L2(vectors)
+
+        labels = np.arange(self._next_label, self._next_label + len(ids), dtype=np.int64)
+        self._next_label += len(ids)
+        self.index.add_with_ids(vectors, labels)
+        if self._pending_rebuild:
+            self._pending_rebuild.added.append((labels, vectors))
+        self.docstore.add(  # type: ignore
+            {
+                id: Document(id=id, page_content=text, metadata=metadata)
+                for id, text, metadata in zip(ids, texts, metadatas)
+            }
+        )
+        self.index_to_docstore_id.update(zip(labels.tolist(), ids))
+        self._on_added(labels.tolist())
+        self._maybe_rebuild()
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if self.index_type == INDEX_FLAT:
+            result = super().delete(ids, **kwargs)
+            # labels are positions and shift on delete, index them again when needed
+            self._labels_by_value = None
+            self._selections.clear()
+            return result
+
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        self._finish_rebuild()
+        reversed_index = {id: label for label, id in self.index_to_docstore_id.items()}
+        missing_ids = set(ids).difference(reversed_index)
+        if missing_ids:
+            raise ValueError(
+                f"Some specified ids do not exist in the current store. Ids not found: "
+                f"{missing_ids}"
+            )
+
+        labels = np.array([reversed_index[id] for id in ids], dtype=np.int64)
+        if self.index_type == INDEX_HNSW:
+            self._deleted.update(labels.tolist())
+        else:
+            self.index.remove_ids(faiss.IDSelectorArray(labels))
+        if self._pending_rebuild:
+            self._pending_rebuild.deleted.update(labels.tolist())
+        self.docstore.delete(ids)
+        for label in labels.tolist():
+            del self.index_to_docstore_id[label]
+        if self._labels_by_value is not None:
+            for by_value in self._labels_by_value.values():
+                for value_labels in by_value.values():
+                    value_labels.difference_update(labels.tolist())
+        self._selections.clear()
+        self._maybe_rebuild()
+        return True
+
+    def merge_from(self, target: FAISS) -> None:
+        if self.index_type == INDEX_FLAT and get_index_type(target.index) == INDEX_FLAT:
+            start = len(self.index_to_docstore_id)
+            super().merge_from(target)
+            self._on_added(range(start, len(self.index_to_docstore_id)))
+            return
+
+        labels, vectors = _live_vectors(target)
+        ids = [target.index_to_docstore_id[label] for label in labels]
+        docs = [target.docstore.search(id) for id in ids]
+        if not ids:
+            return
+        self._FAISS__add(
+            [doc.page_content for doc in docs],  # type: ignore
+            vectors,  # type: ignore
+            metadatas=[doc.metadata for doc in docs],  # type: ignore
+            ids=ids,
+        )
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Callable | dict[str, Any]] = None,
+        fetch_k: int = 20,
+        prefilter: tuple[str, frozenset] | None = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vector)
+
+        selection = None
+        if prefilter and prefilter[0] in self.prefilter_keys:
+            selection = self._get_selection(*prefilter)
+            if selection is None:
+                return []  # no document matches
+            count = k  # the filter below only confirms what the selector matched
+        else:
+            count = k if filter is None else max(k, fetch_k)
+
+        if selection is not None and selection.vectors is not None:
+            scores, indices = _exact_search(vector, selection, count)
+        else:
+            params = self._search_parameters(selection, count)
+            scores, indices = self.index.search(vector, count, params=params)
+
+        filter_func = self._create_filter_func(filter) if filter is not None else None
+        docs = []
+        for score, label in zip(scores[0], indices[0]):
+            _id = self.index_to_docstore_id.get(int(label))
+            if _id is None:
+                continue  # not enough results (-1) or a deleted vector
+            doc = self.docstore.search(_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"Could not find document for id {_id}, got {doc}")
+            if filter_func is None or filter_func(doc.metadata):
+                docs.append((doc, score))
+
+        score_threshold = kwargs.get("score_threshold")
+        if score_threshold is not None:
+            if self.distance_strategy in (
+                DistanceStrategy.MAX_INNER_PRODUCT,
+                DistanceStrategy.JACCARD,
+            ):
+                docs = [(doc, s) for doc, s in docs if s >= score_threshold]
+            else:
+                docs = [(doc, s) for doc, s in docs if s <= score_threshold]
+        return docs[:k]
+
+    def _search_parameters(self, selection: _Selection | None, count: int):
+        selector = selection.selector if selection else None
+        # matches are spread over the index, search wider the fewer there are
+        spread = self.index.ntotal / len(selection.labels) if selection else 1
+        if self.index_type == INDEX_HNSW:
+            if selector is None and self._deleted:
+                selector = self._get_live_selector()
+            params = faiss.SearchParametersHNSW()
+            params.efSearch = max(
+                count, min(HNSW_MAX_EF_SEARCH, math.ceil(HNSW_EF_SEARCH * spread))
+            )
+        elif isinstance(self.index, faiss.IndexIVF):
+            params = faiss.SearchParametersIVF()
+            nprobe = max(IVF_MIN_NPROBE, math.ceil(self.index.nlist * IVF_NPROBE_RATIO))
+            params.nprobe = min(self.index.nlist, math.ceil(nprobe * spread))
+        elif selector is not None:
+            params = faiss.SearchParameters()
+        else:
+            return None
+        if selector is not None:
+            params.sel = selector
+        return params
+
+    def _get_live_selector(self):
+        key = ("", frozenset())
+        if key not in self._selections:
+            labels = np.fromiter(self.index_to_docstore_id, dtype=np.int64)
+            self._selections[key] = _Selection(labels, None)
+        return self._selections[key].selector  # type: ignore
+
+    def _get_selection(self, key: str, values: frozenset) -> _Selection | None:
+        cache_key = (key, values)
+        if cache_key in self._selections:
+            return self._selections[cache_key]
+
+        by_value = self._get_labels_by_value()[key]
+        labels_set: set[int] = set()
+        for value in values:
+            labels_set.update(by_value.get(value, ()))
+        selection = None
+        if labels_set:
+            labels = np.fromiter(labels_set, dtype=np.int64, count=len(labels_set))
+            vectors = None
+            if self.index_type != INDEX_FLAT and len(labels) <= EXACT_SEARCH_MAX:
+                vectors = self.index.reconstruct_batch(labels)
+            selection = _Selection(labels, vectors)
+        self._selections[cache_key] = selection
+        return selection
+
+    def _get_labels_by_value(self) -> dict[str, dict[Any, set[int]]]:
+        if self._labels_by_value is None:
+            self._labels_by_value = {key: {} for key in self.prefilter_keys}
+            self._index_labels(self.index_to_docstore_id)
+        return self._labels_by_value
+
+    def _index_labels(self, labels: Iterable[int]):
+        assert self._labels_by_value is not None
+        docs = self.docstore._dict  # type: ignore
+        for label in labels:
+            doc = docs.get(self.index_to_docstore_id[label])
+            if doc is None:
+                continue
+            for key, by_value in self._labels_by_value.items():
+                value = doc.metadata.get(key)
+                try:
+                    by_value.setdefault(value, set()).add(label)
+                except TypeError:
+                    pass  # unhashable values are only matched by the filter
+
+    def _on_added(self, labels: Iterable[int]):
+        if self._labels_by_value is not None:
+            self._index_labels(labels)
+        self._selections.clear()
+
+    def _maybe_rebuild(self):
+        if self._pending_rebuild:
+            return
+        if self.index_type == INDEX_HNSW:
+            if len(self._deleted) > REBUILD_DELETED_RATIO * self.index.ntotal:
+                self._start_rebuild()
+        elif self.index_type == INDEX_IVF:
+            count = len(self.index_to_docstore_id)
+            if isinstance(self.index, faiss.IndexIVF):
+                trained = (self.index.nlist / IVF_LISTS_FACTOR) ** 2
+                if count > IVF_RETRAIN_GROWTH * trained:
+                    self._start_rebuild()
+            elif count >= IVF_MIN_TRAIN:
+                self._start_rebuild()
+
+    def _start_rebuild(self):
+        # the copy is cheap next to building the graph or training the lists
+        labels, vectors = _live_vectors(self)
+        future = _rebuild_executor.submit(_build_index, self.index_type, labels, vectors)
+        self._pending_rebuild = _Rebuild(future, self._next_label)
+
+    def _finish_rebuild(self):
+        # only adds and deletes switch, the owner serializes them, so no change
+        # can slip in between replaying the changes and switching
+        rebuild = self._pending_rebuild
+        if not rebuild or not rebuild.future.done():
+            return
+        self._pending_rebuild = None
+        try:
+            index = rebuild.future.result()
+        except Exception as e:
+            # the current index stays, the next change tries again
+            PrintStyle.error(f"Error rebuilding {self.index_type} index: {e}")
+            return
+
+        # replay what changed while the copy was indexed, labels are kept
+        for labels, vectors in rebuild.added:
+            live = np.array(
+                [label in self.index_to_docstore_id for label in labels.tolist()],
+                dtype=bool,
+            )
+            if live.any():
+                index.add_with_ids(vectors[live], labels[live])
+        stale = [label for label in rebuild.deleted if label < rebuild.next_label]
+        if self.index_type == INDEX_HNSW:
+            self._deleted = set(stale)
+        elif stale:
+            index.remove_ids(faiss.IDSelectorArray(np.array(stale, dtype=np.int64)))
+        self.index = index
+        self._selections.clear()
+        self._maybe_rebuild()
+
+    def _rebuild(self, index_type: str):
+        labels, vectors = _live_vectors(self)
+        if index_type == INDEX_FLAT:
+            index = create_index(INDEX_FLAT, self.index.d)
+            index.add(vectors)
+            self.index_to_docstore_id = {
+                i: self.index_to_docstore_id[label] for i, label in enumerate(labels)
+            }
+            self._labels_by_value = None
+        else:
+            # labels are kept, flat positions become labels when converting from flat
+            index = _build_index(index_type, labels, vectors)
+            self._next_label = max(labels, default=-1) + 1
+        self.index = index
+        self.index_type = index_type
+        self._deleted = set()
+        self._selections.clear()
+
+
+def _live_vectors(db: FAISS) -> tuple[list[int], np.ndarray]:
+    """Labels of the stored documents and their vectors."""
+    index = db.index
+    mapping = db.index_to_docstore_id
+    if isinstance(index, faiss.IndexIVF):
+        labels = sorted(mapping)
+        if not labels:
+            return [], np.zeros((0, index.d), dtype=np.float32)
+        return labels, index.reconstruct_batch(np.array(labels, dtype=np.int64))
+    if isinstance(index, faiss.IndexIDMap2):
+        all_labels = faiss.vector_to_array(index.id_map).tolist()
+        index = faiss.downcast_index(index.index)  # vectors in the order of id_map
+    else:
+        all_labels = list(range(index.ntotal))
+    if index.ntotal:
+        vectors = index.reconstruct_n(0, index.ntotal)
+    else:
+        vectors = np.zeros((0, index.d), dtype=np.float32)
+    live = [i for i, label in enumerate(all_labels) if label in mapping]
+    return [all_labels[i] for i in live], vectors[live]
+
+
+def _build_index(index_type: str, labels: list[int], vectors: np.ndarray) -> faiss.Index:
+    """Labelled HNSW or IVF index holding the given vectors."""
+    if index_type == INDEX_IVF and len(labels) >= IVF_MIN_TRAIN:
+        index = _train_ivf(vectors)
+    else:
+        index = create_index(index_type, vectors.shape[1])
+    index.add_with_ids(vectors, np.array(labels, dtype=np.int64))
+    return index
+
+
+def _train_ivf(vectors: np.ndarray) -> faiss.IndexIVFFlat:
+    dim = vectors.shape[1]
+    nlist = max(1, int(IVF_LISTS_FACTOR * math.sqrt(len(vectors))))
+    index = faiss.IndexIVFFlat(
+        faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT
+    )
+    sample = vectors
+    if len(vectors) > nlist * IVF_TRAIN_POINTS_PER_LIST:
+        rng = np.random.default_rng(0)
+        sample = vectors[
+            rng.choice(len(vectors), nlist * IVF_TRAIN_POINTS_PER_LIST, replace=False)
+        ]
+    index.train(sample)
+    # a hashtable direct map supports reconstructing and removing by label
+    index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    return index
+
+
+def _exact_search(
+    vector: np.ndarray, selection: _Selection, count: int
+) -> tuple[np.ndarray, np.ndarray]:
+    scores = selection.vectors @ vector[0]  # type: ignore
+    count = min(count, len(scores))
+    top = np.argpartition(-scores, count - 1)[:count]
+    top = top[np.argsort(-scores[top])]
+    return scores[top][None, :], selection.labels[top][None, :]
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from fnmatch import fnmatch
 import json
 import os
@@ -11,7 +12,7 @@ import zipfile
 import glob
 import mimetypes
 from simpleeval import simple_eval
-from helpers import yaml
+from helpers import yaml, cache
 
 AGENTS_DIR = "agents"
 PLUGINS_DIR = "plugins"
@@ -20,6 +21,18 @@ EXTENSIONS_DIR = "extensions"
 USER_DIR = "usr"
 TEMP_DIR = "tmp"
 API_DIR = "api"
+PROMPTS_DIR = "prompts"
+
+# prompt files are parsed once, rendering only evaluates conditions and substitutes values
+PROMPT_TEMPLATES_CACHE_AREA = "prompt_templates(prompts)"
+PROMPT_PATHS_CACHE_AREA = "prompt_paths(prompts)"
+PROMPT_VARIABLES_CACHE_AREA = "prompt_variables(prompts)"
+
+_IF_PATTERN = re.compile(r"{{\s*if\s+(.*?)}}", flags=re.DOTALL)
+_CONDITION_TOKEN_PATTERN = re.compile(r"{{\s*(if\b.*?|endif)\s*}}", flags=re.DOTALL)
+_INCLUDE_ORIGINAL_PATTERN = re.compile(r"{{\s*include\s+original\s*}}")
+_INCLUDE_PATTERN = re.compile(r"{{\s*include\s*['\"](.*?)['\"]\s*}}")
+
 _base_dir = os.path.dirname(os.path.abspath(os.path.join(__file__, "../")))
 
 class VariablesPlugin(ABC):
@@ -37,6 +50,19 @@ def load_plugin_variables(
     if backup_dirs is None:
         backup_dirs = []
 
+    # the plugin module is loaded once, until the prompts watchdog clears the cache
+    cache_key = (file, tuple(backup_dirs))
+    classes = cache.get(PROMPT_VARIABLES_CACHE_AREA, cache_key)
+    if classes is None:
+        classes = _load_variables_plugins(file, backup_dirs)
+        cache.add(PROMPT_VARIABLES_CACHE_AREA, cache_key, classes)
+
+    for cls in classes:
+        return cls().get_variables(file, backup_dirs, **kwargs)  # type: ignore < abstract class here is ok, it is always a subclass
+    return {}
+
+
+def _load_variables_plugins(file: str, backup_dirs: list[str]) -> tuple[type[VariablesPlugin], ...]:
     try:
         # Create filename and directories list
         plugin_filename = basename(file, ".md") + ".py"
@@ -49,11 +75,11 @@ def load_plugin_variables(
 
         from helpers import modules
 
-        classes = modules.load_classes_from_file(
-            plugin_file, VariablesPlugin, one_per_file=False
+        return tuple(
+            modules.load_classes_from_file(
+                plugin_file, VariablesPlugin, one_per_file=False
+            )
         )
-        for cls in classes:
-            return cls().get_variables(file, backup_dirs, **kwargs)  # type: ignore < abstract class here is ok, it is always a subclass
 
         # load python code and extract variables variables from it
         # module = None
@@ -79,7 +105,7 @@ def load_plugin_variables(
         # for cls in reversed(class_list):
         #     if cls[1] is not VariablesPlugin and issubclass(cls[1], VariablesPlugin):
         #         return cls[1]().get_variables()  # type: ignore
-    return {}
+    return ()
 
 
 from helpers.strings import sanitize_string
@@ -91,16 +117,10 @@ def parse_file(
     if _directories is None:
         _directories = []
 
-    # Find the file in the directories
-    absolute_path = find_file_in_dirs(_filename, _directories)
-
-    # Read the file content
-    with open(absolute_path, "r", encoding=_encoding) as f:
-        # content = remove_code_fences(f.read())
-        content = f.read()
-
-    is_json = is_full_json_template(content)
-    content = remove_code_fences(content)
+    # Find the file in the directories and read the parsed template
+    absolute_path, template = _get_prompt_template(_filename, _directories, _encoding)
+    is_json = template.is_json
+    content = template.unfenced
     variables = load_plugin_variables(absolute_path, _directories, **kwargs) or {}  # type: ignore
     variables.update(kwargs)
     if is_json:
@@ -132,19 +152,15 @@ def read_prompt_file(
         _file = os.path.basename(_file)
         _directories = [folder_path] + _directories
 
-    # Find the file in the directories
-    absolute_path = find_file_in_dirs(_file, _directories)
+    # Find the file in the directories and read the parsed template
+    absolute_path, template = _get_prompt_template(_file, _directories, _encoding)
     source_dir = os.path.dirname(absolute_path)
 
-    # Read the file content
-    with open(absolute_path, "r", encoding=_encoding) as f:
-        content = f.read()
-
     variables = load_plugin_variables(_file, _directories, **kwargs) or {}  # type: ignore
     variables.update(kwargs)
 
     # evaluate conditions
-    content = evaluate_text_conditions(content, **variables)
+    content = _render_conditions(template.conditions, variables)
 
     # Replace placeholders with values from kwargs
     content = replace_placeholders_text(content, **variables)
@@ -164,49 +180,144 @@ def read_prompt_file(
 
 def evaluate_text_conditions(_content: str, **kwargs):
     # search for {{if ...}} ... {{endif}} blocks and evaluate conditions with nesting support
-    if_pattern = re.compile(r"{{\s*if\s+(.*?)}}", flags=re.DOTALL)
-    token_pattern = re.compile(r"{{\s*(if\b.*?|endif)\s*}}", flags=re.DOTALL)
+    return _render_conditions(_compile_conditions(_content), kwargs)
+
+
+@dataclass(slots=True)
+class _Condition:
+    condition: str
+    body: list["str | _Condition"]
+    source: str  # this block and the rest of its level, kept as is when the condition fails to evaluate
+
 
-    def _process(text: str) -> str:
-        m_if = if_pattern.search(text)
+@dataclass(slots=True)
+class _PromptTemplate:
+    mtime: int
+    conditions: list["str | _Condition"]
+    is_json: bool
+    unfenced: str
+
+
+def _compile_conditions(text: str) -> list["str | _Condition"]:
+    nodes: list[str | _Condition] = []
+    while True:
+        m_if = _IF_PATTERN.search(text)
         if not m_if:
-            return text
+            break
 
         depth = 1
         pos = m_if.end()
         while True:
-            m = token_pattern.search(text, pos)
+            m = _CONDITION_TOKEN_PATTERN.search(text, pos)
             if not m:
                 # Unterminated if-block, do not modify text
-                return text
+                nodes.append(text)
+                return nodes
             token = m.group(1)
             depth += 1 if token.startswith("if ") else -1
             if depth == 0:
                 break
             pos = m.end()
 
-        before = text[: m_if.start()]
-        condition = m_if.group(1).strip()
-        inner = text[m_if.end() : m.start()]
-        after = text[m.end() :]
+        nodes.append(text[: m_if.start()])
+        nodes.append(
+            _Condition(
+                condition=m_if.group(1).strip(),
+                body=_compile_conditions(text[m_if.end() : m.start()]),
+                source=text[m_if.start() :],
+            )
+        )
+        # Continue with the remaining text after this block
+        text = text[m.end() :]
+
+    nodes.append(text)
+    return nodes
 
+
+def _render_conditions(nodes: list["str | _Condition"], names: dict[str, Any]) -> str:
+    parts: list[str] = []
+    for node in nodes:
+        if isinstance(node, str):
+            parts.append(node)
+            continue
         try:
-            result = simple_eval(condition, names=kwargs)
+            result = simple_eval(node.condition, names=names)
         except Exception:
-            # On evaluation error, do not modify this block
-            return text
-
+            # On evaluation error, do not modify this block and the rest of the text
+            parts.append(node.source)
+            break
         if result:
-            # Keep inner content (processed recursively), remove if/endif markers
-            kept = before + _process(inner)
-        else:
-            # Skip entire block, including inner content and markers
-            kept = before
+            # Keep inner content, skip it otherwise
+            parts.append(_render_conditions(node.body, names))
+    return "".join(parts)
+
+
+def _get_prompt_template(
+    _filename: str, _directories: list[str], _encoding: str = "utf-8"
+) -> tuple[str, _PromptTemplate]:
+    cache_key = (_filename, tuple(_directories))
+    absolute_path = cache.get(PROMPT_PATHS_CACHE_AREA, cache_key)
+    if absolute_path:
+        try:
+            return absolute_path, _read_prompt_template(absolute_path, _encoding)
+        except FileNotFoundError:
+            pass  # removed since, resolve again
+
+    absolute_path = find_file_in_dirs(_filename, _directories)
+    template = _read_prompt_template(absolute_path, _encoding)
+    cache.add(PROMPT_PATHS_CACHE_AREA, cache_key, absolute_path)
+    return absolute_path, template
+
+
+def _read_prompt_template(absolute_path: str, _encoding: str) -> _PromptTemplate:
+    mtime = os.stat(absolute_path).st_mtime_ns
+    template = cache.get(PROMPT_TEMPLATES_CACHE_AREA, (absolute_path, _encoding))
+    if template and template.mtime == mtime:
+        return template
+
+    with open(absolute_path, "r", encoding=_encoding) as f:
+        content = f.read()
+
+    template = _PromptTemplate(
+        mtime=mtime,
+        conditions=_compile_conditions(content),
+        is_json=is_full_json_template(content),
+        unfenced=remove_code_fences(content),
+    )
+    cache.add(PROMPT_TEMPLATES_CACHE_AREA, (absolute_path, _encoding), template)
+    return template
 
-        # Continue processing the remaining text after this block
-        return kept + _process(after)
 
-    return _process(_content)
+def clear_prompt_cache():
+    cache.clear("*(prompts)")
+
+
+def register_watchdogs():
+    from helpers import watchdog
+
+    def on_prompts_change(items: list[watchdog.WatchItem]):
+        clear_prompt_cache()
+
+    prompt_patterns = ["*.md", "*.py"]
+
+    watchdog.add_watchdog(
+        "prompts_base",
+        roots=[get_abs_path(PROMPTS_DIR)],
+        patterns=prompt_patterns,
+        handler=on_prompts_change,
+    )
+
+    # agents/*/prompts, usr/**/prompts and plugins/*/prompts
+    watchdog.add_watchdog(
+        "prompts",
+        roots=[
+            get_abs_path(AGENTS_DIR),
+            get_abs_path(USER_DIR),
+            get_abs_path(PLUGINS_DIR),
+        ],
+        patterns=[f"{PROMPTS_DIR}/{pattern}" for pattern in prompt_patterns],
+        handler=on_prompts_change,
+    )
 
 
 def read_file(relative_path: str, encoding="utf-8"):
@@ -285,8 +396,9 @@ def replace_placeholders_text(_content: str, **kwargs):
     # Replace placeholders with values from kwargs
     for key, value in kwargs.items():
         placeholder = "{{" + key + "}}"
-        strval = str(value)
-        _content = _content.replace(placeholder, strval)
+        if placeholder in _content:
+            strval = str(value)
+            _content = _content.replace(placeholder, strval)
     return _content
 
 
@@ -336,9 +448,10 @@ def process_includes(
     _source_dir: str = "",
     **kwargs,
 ):
-    # {{include original}} — include same file from lower-priority directory
-    original_pattern = re.compile(r"{{\s*include\s+original\s*}}")
+    if "include" not in _content:
+        return _content
 
+    # {{include original}} — include same file from lower-priority directory
     def replace_original(match):
         if not _source_file or not _source_dir:
             return match.group(0)
@@ -350,11 +463,9 @@ def process_includes(
         except FileNotFoundError:
             return ""
 
-    _content = re.sub(original_pattern, replace_original, _content)
+    _content = _INCLUDE_ORIGINAL_PATTERN.sub(replace_original, _content)
 
     # {{ include 'path' }} — include a named file
-    include_pattern = re.compile(r"{{\s*include\s*['\"](.*?)['\"]\s*}}")
-
     def replace_include(match):
         include_path = match.group(1)
         if os.path.isabs(include_path):
@@ -364,7 +475,7 @@ def process_includes(
         except FileNotFoundError:
             return match.group(0)
 
-    return re.sub(include_pattern, replace_include, _content)
+    return _INCLUDE_PATTERN.sub(replace_include, _content)
 
 
 def _get_dirs_after(_directories: list[str], _source_dir: str) -> list[str]:
@@ -6,10 +6,10 @@ import json
 import math
 import uuid
 from typing import Coroutine, Literal, TypedDict, cast, Union, Dict, List, Any
-from helpers import messages, tokens, settings, call_llm
+from helpers import messages, tokens, settings, call_llm, summary_cache
 from enum import Enum
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage
-from plugins._model_config.helpers.model_config import get_chat_model_config
+from plugins._model_config.helpers.model_config import get_chat_model_config, get_utility_model_config
 
 
 BULK_MERGE_COUNT = 3
@@ -23,6 +23,8 @@ LARGE_MESSAGE_TO_CURRENT_TOPIC_RATIO = 0.5
 LARGE_MESSAGE_TO_HISTORY_TOPIC_RATIO = 0.2
 RAW_MESSAGE_OUTPUT_TEXT_TRIM = 100
 COMPRESSION_TARGET_RATIO = 0.8
+COMPRESSION_SOFT_LIMIT_RATIO = 0.9 # background compression starts at 90% of the history size limit
+COMPRESSION_CONCURRENCY = 3 # max utility model summarizations running at once
 
 
 class RawMessage(TypedDict):
@@ -80,6 +82,15 @@ class Record:
     def output_text(self, human_label="user", ai_label="ai"):
         return output_text(self.output(), ai_label, human_label)
 
+    def get_summary_tokens(self) -> int:
+        # summary tokens are cached until the summary text changes
+        summary: str = getattr(self, "summary", "")
+        cached = getattr(self, "_summary_tokens", ("", 0))
+        if cached[0] != summary:
+            cached = (summary, tokens.approximate_tokens(summary))
+            self._summary_tokens = cached
+        return cached[1]
+
 
 class Message(Record):
     def __init__(self, ai: bool, content: MessageContent, tokens: int = 0, id: str = ""):
@@ -138,10 +149,11 @@ class Topic(Record):
         self.history = history
         self.summary: str = ""
         self.messages: list[Message] = []
+        self._summary_tokens: tuple[str, int] = ("", 0)
 
     def get_tokens(self):
         if self.summary:
-            return tokens.approximate_tokens(self.summary)
+            return self.get_summary_tokens()
         else:
             return sum(msg.get_tokens() for msg in self.messages)
 
@@ -210,6 +222,10 @@ class Topic(Record):
             compress = await self.compress_attention()
         return compress
 
+    def can_compress_attention(self, ratio: float = HISTORY_TOPIC_ATTENTION_COMPRESSION) -> bool:
+        middle = len(self.messages) - 2
+        return middle >= 2 and middle - math.floor(middle * ratio) >= 1
+
     async def compress_attention(self, ratio: float = CURRENT_TOPIC_ATTENTION_COMPRESSION) -> bool:
 
         middle = len(self.messages) - 2
@@ -224,12 +240,17 @@ class Topic(Record):
             "fw.msg_summary.md", summary=summary
         )
         sum_msg = Message(False, sum_msg_content)
+        # swap in only if the summarized messages are still in place, messages
+        # may have been appended meanwhile
+        if not _same_records(self.messages[1 : cnt_to_sum + 1], msg_to_sum):
+            return False
         self.messages[1 : cnt_to_sum + 1] = [sum_msg]
         return True
 
     async def summarize_messages(self, messages: list[Message]):
         msg_txt = [m.output_text() for m in messages]
-        summary = await self.history.agent.call_utility_model(
+        summary = await _call_summary_model(
+            self.history.agent,
             system=self.history.agent.read_prompt("fw.topic_summary.sys.md"),
             message=self.history.agent.read_prompt(
                 "fw.topic_summary.msg.md", content=msg_txt
@@ -259,10 +280,11 @@ class Bulk(Record):
         self.history = history
         self.summary: str = ""
         self.records: list[Record] = []
+        self._summary_tokens: tuple[str, int] = ("", 0)
 
     def get_tokens(self):
         if self.summary:
-            return tokens.approximate_tokens(self.summary)
+            return self.get_summary_tokens()
         else:
             return sum([r.get_tokens() for r in self.records])
 
@@ -279,7 +301,8 @@ class Bulk(Record):
         return False
 
     async def summarize(self):
-        self.summary = await self.history.agent.call_utility_model(
+        self.summary = await _call_summary_model(
+            self.history.agent,
             system=self.history.agent.read_prompt("fw.topic_summary.sys.md"),
             message=self.history.agent.read_prompt(
                 "fw.topic_summary.msg.md", content=self.output_text()
@@ -320,11 +343,14 @@ class History(Record):
             + self.get_current_topic_tokens()
         )
 
-    def is_over_limit(self):
-        limit = self._get_ctx_size_for_history()
+    def is_over_limit(self, ratio: float = 1.0):
+        limit = self._get_ctx_size_for_history() * ratio
         total = self.get_tokens()
         return total > limit
 
+    def is_over_soft_limit(self):
+        return self.is_over_limit(COMPRESSION_SOFT_LIMIT_RATIO)
+
     def get_bulks_tokens(self) -> int:
         return sum(record.get_tokens() for record in self.bulks)
 
@@ -432,6 +458,8 @@ class History(Record):
         return _json_dumps(data)
 
     async def compress(self):
+        # compression runs in the background from the soft limit on, so the
+        # message loop only has to wait for it once the hard limit is crossed
         compressed = False
         total = self._get_ctx_size_for_history()
         curr, hist, bulk = (
@@ -439,7 +467,7 @@ class History(Record):
             self.get_topics_tokens(),
             self.get_bulks_tokens(),
         )
-        if (curr + hist + bulk) <= total:
+        if (curr + hist + bulk) <= total * COMPRESSION_SOFT_LIMIT_RATIO:
             return False
 
         target = total * COMPRESSION_TARGET_RATIO
@@ -489,9 +517,18 @@ class History(Record):
             if topic.compress_large_messages(HISTORY_TOPIC_RATIO*LARGE_MESSAGE_TO_HISTORY_TOPIC_RATIO):
                 return True
 
-        # 2. summarize topics attention window one by one
-        for topic in self.topics:
-            if await topic.compress_attention(HISTORY_TOPIC_ATTENTION_COMPRESSION):
+        # 2. summarize attention windows of the oldest topics, several in parallel
+        candidates = [
+            topic for topic in self.topics if topic.can_compress_attention()
+        ][:COMPRESSION_CONCURRENCY]
+        if candidates:
+            results = await _gather_limited(
+                [
+                    topic.compress_attention(HISTORY_TOPIC_ATTENTION_COMPRESSION)
+                    for topic in candidates
+                ]
+            )
+            if any(results):
                 return True
 
         # 3. move oldest topics to bulks in chunks
@@ -501,6 +538,9 @@ class History(Record):
             bulk = Bulk(history=self)
             bulk.records.extend(chunk)
             await bulk.summarize()
+            # topics are only appended meanwhile, but make sure before swapping
+            if not _same_records(self.topics[:count], chunk):
+                return False
             self.bulks.append(bulk)
             self.topics[:count] = []
             return True
@@ -520,13 +560,17 @@ class History(Record):
         if len(self.bulks) == 0:
             return False
         # merge bulks in groups of count, even if there are fewer than count
-        bulks = await asyncio.gather(
-            *[
-                self.merge_bulks(self.bulks[i : i + count])
-                for i in range(0, len(self.bulks), count)
+        merged = list(self.bulks)
+        bulks = await _gather_limited(
+            [
+                self.merge_bulks(merged[i : i + count])
+                for i in range(0, len(merged), count)
             ]
         )
-        self.bulks = bulks
+        if not _same_records(self.bulks[: len(merged)], merged):
+            # bulks changed meanwhile, the next pass re-evaluates
+            return True
+        self.bulks = bulks + self.bulks[len(merged) :]
         return True
 
     async def merge_bulks(self, bulks: list[Bulk]) -> Bulk:
@@ -553,6 +597,37 @@ class History(Record):
 
 
 
+def _summary_model_id(agent) -> str:
+    cfg = get_utility_model_config(agent)
+    return f"{cfg.get('provider', '')}/{cfg.get('name', '')}"
+
+
+async def _call_summary_model(agent, system: str, message: str) -> str:
+    # identical records summarized again (branched or reloaded chats) reuse the result
+    key = summary_cache.make_key(_summary_model_id(agent), system, message)
+    return await summary_cache.get_or_create(
+        key, lambda: agent.call_utility_model(system=system, message=message)
+    )
+
+
+async def _gather_limited(
+    coros: list[Coroutine[Any, Any, Any]], limit: int = COMPRESSION_CONCURRENCY
+) -> list[Any]:
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro: Coroutine[Any, Any, Any]):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*[run(coro) for coro in coros])
+
+
+def _same_records(current: list, expected: list) -> bool:
+    return len(current) == len(expected) and all(
+        a is b for a, b in zip(current, expected)
+    )
+
+
 def deserialize_history(json_data: str, agent) -> History:
     history = History(agent=agent)
     if json_data:
@@ -1,4 +1,3 @@
-import copy
 import json
 import threading
 import time
@@ -7,7 +6,7 @@ from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Any, Literal, Optional, TYPE_CHECKING, TypeVar, cast
 
-from helpers.secrets import get_secrets_manager
+from helpers.secrets import SecretsMatcher, get_secrets_manager
 from helpers.strings import truncate_text_by_ratio
 
 
@@ -87,18 +86,12 @@ def _truncate_key(text: str) -> str:
 
 
 def _truncate_value(val: T) -> T:
-    # If dict, recursively truncate each value
+    # If dict, recursively truncate each value (into a new dict, stored kvps stay intact)
     if isinstance(val, dict):
-        for k in list(val.keys()):
-            v = val[k]
-            del val[k]
-            val[_truncate_key(k)] = _truncate_value(v)
-        return cast(T, val)
+        return cast(T, {_truncate_key(k): _truncate_value(v) for k, v in val.items()})
     # If list or tuple, recursively truncate each item
     if isinstance(val, list):
-        for i in range(len(val)):
-            val[i] = _truncate_value(val[i])
-        return cast(T, val)
+        return cast(T, [_truncate_value(x) for x in val])
     if isinstance(val, tuple):
         return cast(T, tuple(_truncate_value(x) for x in val))
 
@@ -121,6 +114,18 @@ def _truncate_value(val: T) -> T:
     return cast(T, truncated)
 
 
+def _mask_with(matcher: SecretsMatcher | None, obj: T) -> T:
+    # rebuilds containers, so the result never shares them with the caller
+    if isinstance(obj, str):
+        return cast(Any, matcher.mask(obj)) if matcher else obj
+    elif isinstance(obj, dict):
+        return {k: _mask_with(matcher, v) for k, v in obj.items()}  # type: ignore
+    elif isinstance(obj, list):
+        return [_mask_with(matcher, item) for item in obj]  # type: ignore
+    else:
+        return obj
+
+
 def _truncate_content(text: str | None, type: Type) -> str:
 
     max_len = CONTENT_MAX_LEN if type != "response" else RESPONSE_CONTENT_MAX_LEN
@@ -143,6 +148,61 @@ def _truncate_content(text: str | None, type: Type) -> str:
     return truncated
 
 
+class _StreamText:
+    """Append-only text of a log item field, masked one appended suffix at a time.
+
+    Only the new suffix plus a tail as long as the longest secret is scanned per
+    update. While no secret was found the caller's string is returned as is.
+    """
+
+    __slots__ = ("matcher", "raw", "done", "parts", "out")
+
+    def __init__(self, matcher: SecretsMatcher | None):
+        self.matcher = matcher
+        self.raw = ""  # last full value
+        self.out = ""  # last masked value
+        self.done = 0  # length of raw masked for good
+        self.parts: list[str] | None = None  # masked chunks of raw[:done], None while clean
+
+    def extend(self, value: str) -> str | None:
+        """Masked value, None if value does not extend the previous one."""
+        if not value.startswith(self.raw):
+            return None
+        matcher = self.matcher
+        self.raw = value
+        if not matcher:
+            self.done = len(value)
+            self.out = value
+            return value
+
+        tail = value[self.done :]
+        # matches starting before cut are final, a longer secret would be visible already
+        cut = len(tail) - (matcher.max_len - 1)
+        aliases = matcher.aliases()
+        pos = 0
+        for match in matcher.pattern.finditer(tail):
+            if match.start() >= cut:
+                break
+            if self.parts is None:
+                self.parts = [value[: self.done]]
+            self.parts.append(tail[pos : match.start()])
+            self.parts.append(aliases[match.group(0)])
+            pos = match.end()
+        commit = max(pos, cut)
+        if self.parts is not None and commit > pos:
+            self.parts.append(tail[pos:commit])
+        self.done += commit
+
+        rest, replaced = matcher.mask_count(value[self.done :])
+        if self.parts is None:
+            self.out = value if not replaced else value[: self.done] + rest
+        else:
+            prefix = "".join(self.parts)
+            self.parts = [prefix]
+            self.out = prefix + rest
+        return self.out
+
+
 @dataclass
 class LogItem:
     log: "Log"
@@ -160,6 +220,10 @@ class LogItem:
     def __post_init__(self):
         self.guid = self.log.guid
         self.timestamp = self.timestamp or time.time()
+        # masking state of streamed fields, output cached per revision
+        self._streams: dict[str, _StreamText] = {}
+        self._rev = 0
+        self._output: tuple[int, dict[str, Any]] | None = None
 
     def update(
         self,
@@ -188,25 +252,89 @@ class LogItem:
         **kwargs,
     ):
         if heading is not None:
-            self.update(heading=self.heading + heading)
+            self.update(heading=self._stream_base("heading", self.heading) + heading)
         if content is not None:
-            self.update(content=self.content + content)
+            self.update(content=self._stream_base("content", self.content) + content)
 
         for k, v in kwargs.items():
             prev = self.kvps.get(k, "") if self.kvps else ""
-            self.update(**{k: prev + v})
+            self.update(**{k: self._stream_base(k, prev) + v})
+
+    def _stream_base(self, field: str, current: str) -> str:
+        # continue from the unmasked text while the field still holds its masked output
+        stream = self._streams.get(field)
+        if stream is not None and stream.out is current:
+            return stream.raw
+        return current
+
+    def _mask_text(self, field: str, value: Any, matcher: SecretsMatcher | None) -> str:
+        value = "" if value is None else str(value)
+        stream = self._streams.get(field)
+        masked = None
+        if stream is not None and stream.matcher is matcher:
+            masked = stream.extend(value)
+        if masked is None:
+            stream = _StreamText(matcher)
+            self._streams[field] = stream
+            masked = cast(str, stream.extend(value))
+        return masked
 
     def output(self):
-        return {
+        # truncation happens here, lazily, and only once per revision
+        rev = self._rev
+        cached = self._output
+        if cached is not None and cached[0] == rev:
+            return cached[1]
+        out = {
             "no": self.no,
             "id": self.id,  # Include id in output
             "type": self.type,
-            "heading": self.heading,
-            "content": self.content,
-            "kvps": self.kvps,
+            "heading": _truncate_heading(self.heading),
+            "content": _truncate_content(self.content, self.type),
+            "kvps": _truncate_value(self.kvps),
             "timestamp": self.timestamp,
             "agentno": self.agentno,
         }
+        self._output = (rev, out)
+        return out
+
+
+class LogUpdates:
+    """Compacted update journal of a Log.
+
+    Every update bumps a monotonic version (the log_version /poll clients send
+    back as log_from), but only the latest version of each item is kept, so the
+    journal never holds more entries than there are log items, however often
+    they stream.
+    """
+
+    def __init__(self):
+        self.version: int = 0
+        # item no -> version of its latest update, least recently updated first
+        self._latest: OrderedDict[int, int] = OrderedDict()
+
+    def __len__(self) -> int:
+        return self.version
+
+    def append(self, no: int) -> int:
+        self.version += 1
+        self._latest[no] = self.version
+        self._latest.move_to_end(no)
+        return self.version
+
+    def changed_since(self, start: int, end: int | None = None) -> list[int]:
+        """Numbers of items whose latest update falls after start (and up to end)."""
+        if end is None:
+            end = self.version
+        changed = []
+        for no, version in reversed(self._latest.items()):
+            if version <= start:
+                break
+            if version <= end:
+                changed.append(no)
+        # items new to the client must arrive in log order
+        changed.sort()
+        return changed
 
 
 @dataclass(frozen=True)
@@ -222,7 +350,7 @@ class Log:
         self._lock = threading.RLock()
         self.context: "AgentContext|None" = None  # set from outside
         self.guid: str = str(uuid.uuid4())
-        self.updates: list[int] = []
+        self.updates = LogUpdates()
         self.logs: list[LogItem] = []
         self.progress: str = ""
         self.progress_no: int = 0
@@ -284,35 +412,37 @@ class Log:
         notify_state_monitor: bool = True,
         **kwargs,
     ):
-        # Capture the effective type for truncation without holding the lock during
-        # masking/truncation work.
         with self._lock:
-            current_type = self.logs[no].type
-        type_for_truncation = type if type is not None else current_type
+            item = self.logs[no]
+
+        # Mask outside the lock; streamed fields only mask their new suffix, containers
+        # are rebuilt by masking instead of deep copied, truncation waits for output()
+        matcher = self._get_matcher()
 
         heading_out: str | None = None
         if heading is not None:
-            heading_out = _truncate_heading(self._mask_recursive(heading))
+            heading_out = item._mask_text("heading", heading, matcher)
 
         content_out: str | None = None
         if content is not None:
-            content_out = _truncate_content(self._mask_recursive(content), type_for_truncation)
+            content_out = item._mask_text("content", content, matcher)
 
         kvps_out: OrderedDict | None = None
         if kvps is not None:
-            kvps_out_tmp = OrderedDict(copy.deepcopy(kvps))
-            kvps_out_tmp = self._mask_recursive(kvps_out_tmp)
-            kvps_out_tmp = _truncate_value(kvps_out_tmp)
-            kvps_out = OrderedDict(kvps_out_tmp)
+            kvps_out = OrderedDict(_mask_with(matcher, kvps))
 
         kwargs_out: dict | None = None
         if kwargs:
-            kwargs_out = copy.deepcopy(kwargs)
-            kwargs_out = self._mask_recursive(kwargs_out)
+            kwargs_out = {
+                k: (
+                    item._mask_text(k, v, matcher)
+                    if isinstance(v, str)
+                    else _mask_with(matcher, v)
+                )
+                for k, v in kwargs.items()
+            }
 
         with self._lock:
-            item = self.logs[no]
-
             if id is not None:
                 item.id = id
 
@@ -338,11 +468,12 @@ class Log:
                     item.kvps = OrderedDict()
                 item.kvps.update(kwargs_out)
 
+            item._rev += 1
             self.updates.append(item.no)
 
             if item.heading and item.update_progress != "none":
                 if item.no >= self.progress_no:
-                    self.progress = item.heading
+                    self.progress = _truncate_heading(item.heading)
                     self.progress_no = (
                         item.no if item.update_progress == "persistent" else -1
                     )
@@ -397,27 +528,36 @@ class Log:
             if start is None:
                 start = 0
             if end is None:
-                end = len(self.updates)
-            updates = self.updates[start:end]
-            logs = list(self.logs)
-
-        out = []
-        seen = set()
-        for update in updates:
-            if update not in seen and update < len(logs):
-                out.append(logs[update].output())
-                seen.add(update)
+                end = self.updates.version
+            items = [
+                self.logs[no]
+                for no in self.updates.changed_since(start, end)
+                if no < len(self.logs)
+            ]
+
+        out = [item.output() for item in items]
         return LogOutput(items=out, start=start, end=end)
 
     def reset(self):
         with self._lock:
             self.guid = str(uuid.uuid4())
-            self.updates = []
+            self.updates = LogUpdates()
             self.logs = []
         self.set_initial_progress()
 
     def _mask_recursive(self, obj: T) -> T:
         """Recursively mask secrets in nested objects."""
+        # resolve the compiled matcher once for the whole structure
+        matcher = self._get_matcher()
+        if not matcher:
+            return obj
+        try:
+            return _mask_with(matcher, obj)
+        except Exception:
+            # If masking fails, return original object
+            return obj
+
+    def _get_matcher(self) -> SecretsMatcher | None:
         try:
             from agent import AgentContext
             secrets_mgr = get_secrets_manager(self.context or AgentContext.current())
@@ -429,14 +569,7 @@ class Log:
             # if self_id != current_id:
             #     print(f"Context ID mismatch: {self_id} != {current_id}")
 
-            if isinstance(obj, str):
-                return cast(Any, secrets_mgr.mask_values(obj))
-            elif isinstance(obj, dict):
-                return {k: self._mask_recursive(v) for k, v in obj.items()}  # type: ignore
-            elif isinstance(obj, list):
-                return [self._mask_recursive(item) for item in obj]  # type: ignore
-            else:
-                return obj
+            return secrets_mgr.get_matcher()
         except Exception:
-            # If masking fails, return original object
-            return obj
+            # If masking is unavailable, proceed without it
+            return None
@@ -24,6 +24,7 @@ import json
 from helpers import errors
 from helpers import settings
 from helpers.log import LogItem
+from helpers.mcp_session_pool import MCPSession
 
 import httpx
 
@@ -44,6 +45,28 @@ from helpers.print_style import PrintStyle
 from helpers.tool import Tool, Response
 
 
+# bumped whenever the servers or their tool lists change, see get_tools_version
+_tools_version = 0
+_tools_version_lock = threading.Lock()
+# "server.tool" -> server, rebuilt when the version changes
+_tool_index: tuple[int, dict[str, Any]] = (-1, {})
+# rendered prompt fragment per server, keyed by its description and tools version
+_server_prompts: dict[str, tuple[tuple[str, int], str]] = {}
+_tools_prompt: tuple[int, str] = (-1, "")
+
+
+def get_tools_version() -> int:
+    """Version stamp of the MCP tool catalog, changes when any tool list changes."""
+    return _tools_version
+
+
+def _bump_tools_version() -> int:
+    global _tools_version
+    with _tools_version_lock:
+        _tools_version += 1
+        return _tools_version
+
+
 def normalize_name(name: str) -> str:
     # Lowercase and strip whitespace
     name = name.strip().lower()
@@ -257,13 +280,19 @@ class MCPServerRemote(BaseModel):
         with self.__lock:
             return self.__client.has_tool(tool_name)  # type: ignore
 
+    def get_tools_version(self) -> int:
+        """Version of the tool list, changes when the list changes"""
+        with self.__lock:
+            return self.__client.tools_version  # type: ignore
+
     async def call_tool(
         self, tool_name: str, input_data: Dict[str, Any]
     ) -> CallToolResult:
         """Call a tool with the given input data"""
         with self.__lock:
-            # We already run in an event loop, dont believe Pylance
-            return await self.__client.call_tool(tool_name, input_data)  # type: ignore
+            client = self.__client
+        # the lock is not held while the call runs, calls are concurrent
+        return await client.call_tool(tool_name, input_data)  # type: ignore
 
     def update(self, config: dict[str, Any]) -> "MCPServerRemote":
         with self.__lock:
@@ -292,6 +321,10 @@ class MCPServerRemote(BaseModel):
         await self.__client.update_tools()  # type: ignore
         return self
 
+    def close(self):
+        """Close the pooled session with the server"""
+        self.__client.close()  # type: ignore
+
 
 class MCPServerLocal(BaseModel):
     name: str = Field(default_factory=str)
@@ -335,13 +368,19 @@ class MCPServerLocal(BaseModel):
         with self.__lock:
             return self.__client.has_tool(tool_name)  # type: ignore
 
+    def get_tools_version(self) -> int:
+        """Version of the tool list, changes when the list changes"""
+        with self.__lock:
+            return self.__client.tools_version  # type: ignore
+
     async def call_tool(
         self, tool_name: str, input_data: Dict[str, Any]
     ) -> CallToolResult:
         """Call a tool with the given input data"""
         with self.__lock:
-            # We already run in an event loop, dont believe Pylance
-            return await self.__client.call_tool(tool_name, input_data)  # type: ignore
+            client = self.__client
+        # the lock is not held while the call runs, calls are concurrent
+        return await client.call_tool(tool_name, input_data)  # type: ignore
 
     def update(self, config: dict[str, Any]) -> "MCPServerLocal":
         with self.__lock:
@@ -368,6 +407,10 @@ class MCPServerLocal(BaseModel):
         await self.__client.update_tools()  # type: ignore
         return self
 
+    def close(self):
+        """Close the pooled session with the server, stops a stdio server process"""
+        self.__client.close()  # type: ignore
+
 
 MCPServer = Annotated[
     Union[
@@ -518,6 +561,13 @@ class MCPConfig(BaseModel):
     def __init__(self, servers_list: List[Dict[str, Any]]):
         from collections.abc import Mapping, Iterable
 
+        # sessions of the previous configuration keep server processes running
+        for server in getattr(self, "servers", None) or []:
+            try:
+                server.close()
+            except Exception as e:
+                PrintStyle.error(f"Failed to close MCP server '{server.name}': {e}")
+
         # # DEBUG: Print the received servers_list
         # if servers_list:
         #     PrintStyle(background_color="blue", font_color="white", padding=True).print(
@@ -534,6 +584,8 @@ class MCPConfig(BaseModel):
         self.servers = []
         # initialize failed servers list
         self.disconnected_servers = []
+        _server_prompts.clear()  # servers are replaced, even those keeping their name
+        _bump_tools_version()
 
         if not isinstance(servers_list, Iterable):
             (
@@ -640,6 +692,7 @@ class MCPConfig(BaseModel):
                 await asyncio.gather(*[_init_server(s) for s in self.servers])
 
             asyncio.run(_init_all())
+        _bump_tools_version()
 
     def get_server_log(self, server_name: str) -> str:
         with self.__lock:
@@ -721,70 +774,96 @@ class MCPConfig(BaseModel):
                     tools.append({f"{server.name}.{tool['name']}": tool_copy})
             return tools
 
+    def get_tools_version(self) -> int:
+        """Version stamp of the tool catalog, the prompt only changes with it"""
+        return get_tools_version()
+
     def get_tools_prompt(self, server_name: str = "") -> str:
         """Get a prompt for all tools"""
+        global _tools_prompt
 
         # just to wait for pending initialization
         with self.__lock:
             pass
 
-        prompt = '## "Remote (MCP Server) Agent Tools" available:\n\n'
-        server_names = []
-        for server in self.servers:
-            if not server_name or server.name == server_name:
-                server_names.append(server.name)
+        version = get_tools_version()
+        if not server_name and _tools_prompt[0] == version:
+            return _tools_prompt[1]
 
-        if server_name and server_name not in server_names:
+        servers = [
+            server
+            for server in self.servers
+            if not server_name or server.name == server_name
+        ]
+        if server_name and not servers:
             raise ValueError(f"Server {server_name} not found")
 
-        for server in self.servers:
-            if server.name in server_names:
-                server_name = server.name
-                prompt += f"### {server_name}\n"
-                prompt += f"{server.description}\n"
-                tools = server.get_tools()
-
-                for tool in tools:
-                    prompt += (
-                        f"\n### {server_name}.{tool['name']}:\n"
-                        f"{tool['description']}\n\n"
-                        # f"#### Categories:\n"
-                        # f"* kind: MCP Server Tool\n"
-                        # f'* server: "{server_name}" ({server.description})\n\n'
-                        # f"#### Arguments:\n"
-                    )
+        prompt = '## "Remote (MCP Server) Agent Tools" available:\n\n'
+        prompt += "".join(self._get_server_prompt(server) for server in servers)
+        if not server_name:
+            _tools_prompt = (version, prompt)
+        return prompt
 
-                    input_schema = (
-                        json.dumps(tool["input_schema"]) if tool["input_schema"] else ""
-                    )
+    def _get_server_prompt(self, server: Any) -> str:
+        """Prompt fragment of one server, rendered again only when its tools change"""
+        key = (server.description or "", server.get_tools_version())
+        cached = _server_prompts.get(server.name)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        server_name = server.name
+        prompt = f"### {server_name}\n"
+        prompt += f"{server.description}\n"
+        tools = server.get_tools()
+
+        for tool in tools:
+            prompt += (
+                f"\n### {server_name}.{tool['name']}:\n"
+                f"{tool['description']}\n\n"
+                # f"#### Categories:\n"
+                # f"* kind: MCP Server Tool\n"
+                # f'* server: "{server_name}" ({server.description})\n\n'
+                # f"#### Arguments:\n"
+            )
 
-                    prompt += f"#### Input schema for tool_args:\n{input_schema}\n"
+            input_schema = (
+                json.dumps(tool["input_schema"]) if tool["input_schema"] else ""
+            )
 
-                    prompt += "\n"
+            prompt += f"#### Input schema for tool_args:\n{input_schema}\n"
 
-                    prompt += (
-                        f"#### Usage:\n"
-                        f"{{\n"
-                        # f'    "observations": ["..."],\n' # TODO: this should be a prompt file with placeholders
-                        f'    "thoughts": ["..."],\n'
-                        # f'    "reflection": ["..."],\n' # TODO: this should be a prompt file with placeholders
-                        f"    \"tool_name\": \"{server_name}.{tool['name']}\",\n"
-                        f'    "tool_args": !follow schema above\n'
-                        f"}}\n"
-                    )
+            prompt += "\n"
 
+            prompt += (
+                f"#### Usage:\n"
+                f"{{\n"
+                # f'    "observations": ["..."],\n' # TODO: this should be a prompt file with placeholders
+                f'    "thoughts": ["..."],\n'
+                # f'    "reflection": ["..."],\n' # TODO: this should be a prompt file with placeholders
+                f"    \"tool_name\": \"{server_name}.{tool['name']}\",\n"
+                f'    "tool_args": !follow schema above\n'
+                f"}}\n"
+            )
+
+        _server_prompts[server.name] = (key, prompt)
         return prompt
 
+    def _get_tool_index(self) -> dict[str, Any]:
+        """Servers by "server.tool" name, call with the lock held"""
+        global _tool_index
+        version = get_tools_version()
+        if _tool_index[0] != version:
+            index = {}
+            for server in self.servers:
+                for tool in server.get_tools():
+                    index.setdefault(f"{server.name}.{tool['name']}", server)
+            _tool_index = (version, index)
+        return _tool_index[1]
+
     def has_tool(self, tool_name: str) -> bool:
         """Check if a tool is available"""
-        if "." not in tool_name:
-            return False
-        server_name_part, tool_name_part = tool_name.split(".")
         with self.__lock:
-            for server in self.servers:
-                if server.name == server_name_part:
-                    return server.has_tool(tool_name_part)
-            return False
+            return tool_name in self._get_tool_index()
 
     def get_tool(self, agent: Any, tool_name: str) -> MCPTool | None:
         if not self.has_tool(tool_name):
@@ -795,14 +874,11 @@ class MCPConfig(BaseModel):
         self, tool_name: str, input_data: Dict[str, Any]
     ) -> CallToolResult:
         """Call a tool with the given input data"""
-        if "." not in tool_name:
-            raise ValueError(f"Tool {tool_name} not found")
-        server_name_part, tool_name_part = tool_name.split(".")
         with self.__lock:
-            for server in self.servers:
-                if server.name == server_name_part and server.has_tool(tool_name_part):
-                    return await server.call_tool(tool_name_part, input_data)
+            server = self._get_tool_index().get(tool_name)
+        if server is None:
             raise ValueError(f"Tool {tool_name} not found")
+        return await server.call_tool(tool_name[len(server.name) + 1 :], input_data)
 
 
 T = TypeVar("T")
@@ -811,16 +887,19 @@ T = TypeVar("T")
 class MCPClientBase(ABC):
     # server: Union[MCPServerLocal, MCPServerRemote] # Defined in __init__
     # tools: List[dict[str, Any]] # Defined in __init__
-    # No self.session, self.exit_stack, self.stdio, self.write as persistent instance fields
+    # The transport and ClientSession live in self.pooled_session, shared by all operations
 
     __lock: ClassVar[threading.Lock] = threading.Lock()
 
     def __init__(self, server: Union[MCPServerLocal, MCPServerRemote]):
         self.server = server
         self.tools: List[dict[str, Any]] = []  # Tools are cached on the client instance
+        self.tools_by_name: Dict[str, dict[str, Any]] = {}
+        self.tools_version = 0  # catalog version of the last tool list change, unique across clients
         self.error: str = ""
         self.log: List[str] = []
         self.log_file: Optional[TextIO] = None
+        self.pooled_session: Optional[MCPSession] = None  # created on first use
 
     # Protected method
     @abstractmethod
@@ -833,76 +912,57 @@ class MCPClientBase(ABC):
         """Create stdio/write streams using the provided exit_stack."""
         ...
 
+    async def _connect(self, current_exit_stack: AsyncExitStack) -> ClientSession:
+        """Open the transport and initialize a session on it, called by the session pool."""
+        stdio, write = await self._create_stdio_transport(current_exit_stack)
+        set = settings.get_settings()
+        session = await current_exit_stack.enter_async_context(
+            ClientSession(
+                stdio,  # type: ignore
+                write,  # type: ignore
+                read_timeout_seconds=timedelta(
+                    seconds=self.server.init_timeout or set["mcp_client_init_timeout"]
+                ),
+            )
+        )
+        await session.initialize()
+        return session
+
     async def _execute_with_session(
         self,
         coro_func: Callable[[ClientSession], Awaitable[T]],
-        read_timeout_seconds=60,
     ) -> T:
         """
-        Manages the lifecycle of an MCP session for a single operation.
-        Creates a temporary session, executes coro_func with it, and ensures cleanup.
+        Executes coro_func with the server's pooled session.
+        The session is connected on first use and reused by later operations.
         """
         operation_name = coro_func.__name__  # For logging
-        # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name}): Creating new session for operation '{operation_name}'...")
-        # Store the original exception outside the async block
-        original_exception = None
+        if self.pooled_session is None:
+            self.pooled_session = MCPSession(self.server.name, self._connect)
         try:
-            async with AsyncExitStack() as temp_stack:
-                try:
-
-                    stdio, write = await self._create_stdio_transport(temp_stack)
-                    # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name} - {operation_name}): Transport created. Initializing session...")
-                    session = await temp_stack.enter_async_context(
-                        ClientSession(
-                            stdio,  # type: ignore
-                            write,  # type: ignore
-                            read_timeout_seconds=timedelta(
-                                seconds=read_timeout_seconds
-                            ),
-                        )
-                    )
-                    await session.initialize()
-
-                    result = await coro_func(session)
-
-                    return result
-                except Exception as e:
-                    # Store the original exception and raise a dummy exception
-                    excs = getattr(e, "exceptions", None)  # Python 3.11+ ExceptionGroup
-                    if excs:
-                        original_exception = excs[0]
-                    else:
-                        original_exception = e
-                    # Create a dummy exception to break out of the async block
-                    raise RuntimeError("Dummy exception to break out of async block")
+            return await self.pooled_session.run(coro_func)
         except Exception as e:
-            # Check if this is our dummy exception
-            if original_exception is not None:
-                e = original_exception
-            # We have the original exception stored
+            excs = getattr(e, "exceptions", None)  # Python 3.11+ ExceptionGroup
+            if excs:
+                e = excs[0]
             PrintStyle(
                 background_color="#AA4455", font_color="white", padding=False
             ).print(
                 f"MCPClientBase ({self.server.name} - {operation_name}): Error during operation: {type(e).__name__}: {e}"
             )
             raise e  # Re-raise the original exception
-        # finally:
-        #     PrintStyle(font_color="cyan").print(
-        #         f"MCPClientBase ({self.server.name} - {operation_name}): Session and transport will be closed by AsyncExitStack."
-        #     )
-        # This line should ideally be unreachable if the try/except/finally logic within the 'async with' is exhaustive.
-        # Adding it to satisfy linters that might not fully trace the raise/return paths through async context managers.
-        raise RuntimeError(
-            f"MCPClientBase ({self.server.name} - {operation_name}): _execute_with_session exited 'async with' block unexpectedly."
-        )
+
+    def close(self):
+        if self.pooled_session is not None:
+            self.pooled_session.close()
 
     async def update_tools(self) -> "MCPClientBase":
         # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name}): Starting 'update_tools' operation...")
 
         async def list_tools_op(current_session: ClientSession):
             response: ListToolsResult = await current_session.list_tools()
-            with self.__lock:
-                self.tools = [
+            self._set_tools(
+                [
                     {
                         "name": tool.name,
                         "description": tool.description,
@@ -910,17 +970,13 @@ class MCPClientBase(ABC):
                     }
                     for tool in response.tools
                 ]
+            )
             PrintStyle(font_color="green").print(
                 f"MCPClientBase ({self.server.name}): Tools updated. Found {len(self.tools)} tools."
             )
 
         try:
-            set = settings.get_settings()
-            await self._execute_with_session(
-                list_tools_op,
-                read_timeout_seconds=self.server.init_timeout
-                or set["mcp_client_init_timeout"],
-            )
+            await self._execute_with_session(list_tools_op)
         except Exception as e:
             # e = eg.exceptions[0]
             error_text = errors.format_error(e, 0, 0)
@@ -930,18 +986,24 @@ class MCPClientBase(ABC):
             ).print(
                 f"MCPClientBase ({self.server.name}): 'update_tools' operation failed: {error_text}"
             )
+            self._set_tools([])  # Ensure tools are cleared on failure
             with self.__lock:
-                self.tools = []  # Ensure tools are cleared on failure
                 self.error = f"Failed to initialize. {error_text[:200]}{'...' if len(error_text) > 200 else ''}"  # store error from tools fetch
         return self
 
+    def _set_tools(self, tools: List[dict[str, Any]]):
+        with self.__lock:
+            if tools == self.tools:
+                return
+            self.tools = tools
+            self.tools_by_name = {tool["name"]: tool for tool in tools}
+            # the catalog prompt and tool index are rebuilt
+            self.tools_version = _bump_tools_version()
+
     def has_tool(self, tool_name: str) -> bool:
         """Check if a tool is available (uses cached tools)"""
         with self.__lock:
-            for tool in self.tools:
-                if tool["name"] == tool_name:
-                    return True
-        return False
+            return tool_name in self.tools_by_name
 
     def get_tools(self) -> List[dict[str, Any]]:
         """Get all tools from the server (uses cached tools)"""
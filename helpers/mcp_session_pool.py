@@ -0,0 +1,210 @@
+"""Long-lived sessions with MCP servers.
+
+Starting a stdio server or opening an HTTP/SSE connection and completing
+the MCP handshake takes seconds, so each configured server keeps one warm
+session that all tool calls share. Requests are pipelined over it (the
+protocol matches responses to request ids), at most MAX_CONCURRENT_REQUESTS
+at a time.
+
+Transports hold anyio task groups that must be entered and exited by the
+same task, so every session is owned by a task on a dedicated event loop
+thread and callers on other loops reach it through run(). The owner task
+pings the server when it has been idle for HEALTH_CHECK_INTERVAL, closes
+the session after IDLE_TIMEOUT without use, and ends when the transport
+fails; the next request connects again. A request timeout also closes the
+session: SSE transports stop reading after their read timeout without
+closing the session, and every later request would only time out. Failed connects are retried with
+exponential backoff, requests in between fail fast with the last error.
+"""
+
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from typing import Awaitable, Callable, TypeVar
+
+import anyio
+import httpx
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+from helpers.defer import EventLoopThread
+from helpers.print_style import PrintStyle
+
+T = TypeVar("T")
+
+POOL_THREAD = "MCPSessions"
+MAX_CONCURRENT_REQUESTS = 8
+IDLE_TIMEOUT = 600.0  # seconds without requests before the session is closed
+HEALTH_CHECK_INTERVAL = 60.0
+PING_TIMEOUT = 10.0
+RECONNECT_DELAY = 1.0  # first retry delay after a failed connect, doubles up to the max
+RECONNECT_MAX_DELAY = 60.0
+
+# raised when writing to a transport that is already closed, the request was not sent
+_NOT_SENT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError)
+
+
+class MCPSession:
+    """Warm session with one MCP server, connected on first use."""
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[AsyncExitStack], Awaitable[ClientSession]],
+    ):
+        self.name = name
+        # opens the transport on the stack and returns an initialized session
+        self.connect = connect
+        self.session: ClientSession | None = None
+        self.active = 0
+        self.last_used = 0.0
+        self.failures = 0
+        self.retry_at = 0.0
+        self.last_error: BaseException | None = None
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._owner: asyncio.Task | None = None
+        self._connecting: asyncio.Future | None = None
+        self._closed: asyncio.Event | None = None
+
+    async def run(self, operation: Callable[[ClientSession], Awaitable[T]]) -> T:
+        """Run operation with the session, from any event loop."""
+        future = EventLoopThread(POOL_THREAD).run_coroutine(self._run(operation))
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        """Close the session, the next request connects again."""
+        thread = EventLoopThread(POOL_THREAD)
+        if thread.loop:
+            thread.loop.call_soon_threadsafe(self._close)
+
+    @property
+    def connected(self) -> bool:
+        return self.session is not None and bool(self._owner and not self._owner.done())
+
+    async def _run(self, operation: Callable[[ClientSession], Awaitable[T]]) -> T:
+        for attempt in range(2):
+            session = await self._get_session()
+            async with self._semaphore:
+                self.active += 1
+                self.last_used = time.monotonic()
+                try:
+                    return await operation(session)
+                except _NOT_SENT_ERRORS:
+                    # the connection dropped while idle, retry once on a new one
+                    self._close(session)
+                    if attempt:
+                        raise
+                except Exception as e:
+                    if not _is_protocol_error(e):
+                        self._close(session)  # state of the connection is unknown
+                    raise
+                finally:
+                    self.active -= 1
+                    self.last_used = time.monotonic()
+        raise RuntimeError("unreachable")
+
+    async def _get_session(self) -> ClientSession:
+        if self.session is not None and _receive_loop_finished(self.session):
+            self._close(self.session)  # the transport stopped reading
+        if self.connected:
+            return self.session  # type: ignore
+        if self._connecting is None:
+            delay = self.retry_at - time.monotonic()
+            if delay > 0 and self.last_error is not None:
+                raise ConnectionError(
+                    f"MCP server '{self.name}' is unavailable, reconnecting in {delay:.0f}s. "
+                    f"Last error: {type(self.last_error).__name__}: {self.last_error}"
+                )
+            self._connecting = asyncio.get_running_loop().create_future()
+            self._closed = asyncio.Event()
+            self._owner = asyncio.create_task(
+                self._hold(self._connecting, self._closed),
+                name=f"mcp-session-{self.name}",
+            )
+        return await asyncio.shield(self._connecting)
+
+    async def _hold(self, ready: asyncio.Future, closed: asyncio.Event):
+        """Owner task of one connection, keeps the transport open until closed."""
+        session = None
+        try:
+            async with AsyncExitStack() as stack:
+                session = await self.connect(stack)
+                self.session = session
+                self.failures = 0
+                self.last_error = None
+                self.last_used = time.monotonic()
+                self._connecting = None
+                ready.set_result(session)
+                await self._watch(session, closed)
+        except BaseException as e:
+            error = _unwrap(e)
+            if not ready.done():
+                self.failures += 1
+                self.last_error = error
+                self.retry_at = time.monotonic() + min(
+                    RECONNECT_MAX_DELAY, RECONNECT_DELAY * 2 ** (self.failures - 1)
+                )
+                self._connecting = None
+                if isinstance(error, asyncio.CancelledError):
+                    ready.cancel()
+                else:
+                    ready.set_exception(error)
+            elif not isinstance(e, asyncio.CancelledError):
+                PrintStyle.warning(
+                    f"MCP session '{self.name}' closed: {type(error).__name__}: {error}"
+                )
+        finally:
+            if self.session is session:
+                self.session = None
+
+    async def _watch(self, session: ClientSession, closed: asyncio.Event):
+        while not closed.is_set():
+            try:
+                await asyncio.wait_for(closed.wait(), HEALTH_CHECK_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+            if _receive_loop_finished(session):
+                return
+            if self.active:
+                continue
+            idle = time.monotonic() - self.last_used
+            if idle >= IDLE_TIMEOUT:
+                return
+            if idle >= HEALTH_CHECK_INTERVAL:
+                try:
+                    await asyncio.wait_for(session.send_ping(), PING_TIMEOUT)
+                except Exception as e:
+                    PrintStyle.warning(
+                        f"MCP session '{self.name}' failed health check: {type(e).__name__}: {e}"
+                    )
+                    return
+
+    def _close(self, session: ClientSession | None = None):
+        if session is not None and session is not self.session:
+            return  # already replaced
+        self.session = None
+        if self._closed:
+            self._closed.set()
+
+
+def _is_protocol_error(e: Exception) -> bool:
+    # an error response from the server, the connection itself is fine
+    return isinstance(e, McpError) and e.error.code not in (
+        CONNECTION_CLOSED,
+        httpx.codes.REQUEST_TIMEOUT,  # raised by the session, the server may be gone
+    )
+
+
+def _receive_loop_finished(session: ClientSession) -> bool:
+    # the session closes its read stream when the receive loop ends, responses can not arrive anymore
+    stream = getattr(session, "_read_stream", None)
+    return bool(getattr(stream, "_closed", False))
+
+
+def _unwrap(e: BaseException) -> BaseException:
+    # transports raise exception groups from their task groups
+    while isinstance(e, BaseExceptionGroup) and e.exceptions:
+        e = e.exceptions[0]
+    return e
@@ -0,0 +1,101 @@
+"""Page level PDF text extraction in worker processes.
+
+Pages are extracted in batches on a process pool, so OCR of a scanned
+document uses all cores. A page's text layer is used when it has one, only
+pages without text are rendered and passed to Tesseract. Batches are
+yielded as they finish, callers can process pages while others are still
+being extracted.
+
+Worker functions import their dependencies lazily, this module must stay
+cheap to import in a fresh worker process.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator
+
+PAGE_BATCH = 4  # pages per worker task, small batches balance uneven OCR load
+MIN_TEXT_CHARS = 32  # pages with less text than this are OCRed
+OCR_DPI = 200
+MAX_WORKERS = os.cpu_count() or 1
+
+
+def count_pages(path: str) -> int:
+    import pymupdf
+
+    with pymupdf.open(path) as doc:
+        return doc.page_count
+
+
+def extract_pages(path: str, page_numbers: list[int]) -> dict[int, str]:
+    """Text of the given 0-based pages, runs in a worker process."""
+    import pymupdf
+
+    result: dict[int, str] = {}
+    with pymupdf.open(path) as doc:
+        for number in page_numbers:
+            result[number] = _extract_page(doc[number])
+    return result
+
+
+async def iter_pages(
+    path: str, page_numbers: list[int]
+) -> AsyncIterator[dict[int, str]]:
+    """Extract pages in parallel, yields batches of {page number: text} as they finish."""
+    batches = [
+        page_numbers[i : i + PAGE_BATCH]
+        for i in range(0, len(page_numbers), PAGE_BATCH)
+    ]
+    if not batches:
+        return
+
+    loop = asyncio.get_running_loop()
+    workers = min(MAX_WORKERS, len(batches))
+    if workers <= 1:
+        # not worth starting a process for a short document
+        for batch in batches:
+            yield await loop.run_in_executor(None, extract_pages, path, batch)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+    try:
+        futures = [
+            loop.run_in_executor(pool, extract_pages, path, batch)
+            for batch in batches
+        ]
+        for future in asyncio.as_completed(futures):
+            yield await future
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_page(page) -> str:
+    text = page.get_text()
+    if len(text.strip()) < MIN_TEXT_CHARS:
+        return _ocr_page(page)
+
+    try:
+        tables = [table.to_markdown() for table in page.find_tables().tables]
+    except Exception:
+        tables = []  # table detection is best effort, the text is still there
+    return "\n".join([text, *tables])
+
+
+def _ocr_page(page) -> str:
+    import pytesseract
+    from PIL import Image
+
+    pixmap = page.get_pixmap(dpi=OCR_DPI)
+    image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    return pytesseract.image_to_string(image)
+
+
+def _mp_context():
+    # forkserver forks workers from a clean process instead of the threaded
+    # server, and unlike spawn does not import the main module for each one
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
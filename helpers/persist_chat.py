@@ -1,17 +1,32 @@
 from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any
+from typing import Any, Callable
+import os
+import shutil
+import threading
+import time
 import uuid
 from agent import Agent, AgentConfig, AgentContext, AgentContextType
 from helpers import files, history
 import json
 from initialize import initialize_agent
 
+from helpers.localization import Localization
 from helpers.log import Log, LogItem
+from helpers.strings import sanitize_string
 
 CHATS_FOLDER = "usr/chats"
 LOG_SIZE = 1000
 CHAT_FILE_NAME = "chat.json"
+INDEX_FILE_NAME = "index.json"
+JOURNAL_FILE_NAME = "chat.journal"
+JOURNAL_ROTATED_FILE_NAME = "chat.journal.1"
+# the journal is compacted into chat.json once it outgrows the snapshot (or this floor)
+JOURNAL_COMPACT_MIN_BYTES = 1024 * 1024
+# appended records are fsynced at most this often, a flush syncs the rest
+JOURNAL_FSYNC_INTERVAL = 1.0
 
 
 def get_chat_folder_path(ctxid: str):
@@ -29,17 +44,29 @@ def get_chat_folder_path(ctxid: str):
 def get_chat_msg_files_folder(ctxid: str):
     return files.get_abs_path(get_chat_folder_path(ctxid), "messages")
 
-def save_tmp_chat(context: AgentContext):
-    """Save context to the chats folder"""
+def save_tmp_chat(context: AgentContext, compact: bool = False):
+    """Save context to the chats folder.
+
+    Only what changed since the previous save is appended to the chat journal;
+    the journal is compacted into chat.json in the background once it grows.
+    With compact=True the full snapshot is written before returning.
+    """
     # Skip saving BACKGROUND contexts as they should be ephemeral
     if context.type == AgentContextType.BACKGROUND:
         return
 
-    path = _get_chat_file_path(context.id)
-    files.make_dirs(path)
-    data = _serialize_context(context)
-    js = _safe_json_serialize(data, ensure_ascii=False)
-    files.write_file(path, js)
+    journal = _get_journal(context.id)
+    with journal.lock:
+        try:
+            if compact or journal.needs_compaction():
+                _compact_chat(context, journal, wait=compact)
+            else:
+                _append_chat_changes(context, journal)
+            _update_index_entry(context, journal)
+        except Exception:
+            # marks may no longer match the files, start over with a snapshot
+            journal.forget()
+            raise
 
 
 def save_tmp_chats():
@@ -48,33 +75,142 @@ def save_tmp_chats():
         # Skip BACKGROUND contexts as they should be ephemeral
         if context.type == AgentContextType.BACKGROUND:
             continue
-        save_tmp_chat(context)
+        save_tmp_chat(context, compact=True)
+
+
+def flush_tmp_chats():
+    """Wait for pending compactions and fsync journal records not yet synced."""
+    with _journals_lock:
+        journals = list(_journals.values())
+    for journal in journals:
+        with journal.lock:
+            journal.wait_compaction()
+            journal.sync()
 
 
 def load_tmp_chats():
-    """Load all contexts from the chats folder"""
+    """Index all contexts in the chats folder.
+
+    Only the small index entries are read; a chat is deserialized once it is
+    first used (see load_indexed_chat). Contexts that are already loaded, e.g.
+    when restoring a backup, are reloaded right away.
+    """
     _convert_v080_chats()
     folders = files.list_files(CHATS_FOLDER, "*")
-    json_files = []
-    for folder_name in folders:
-        json_files.append(_get_chat_file_path(folder_name))
+    loaded = {context.id for context in AgentContext.all()}
 
+    index: dict[str, dict[str, Any]] = {}
     ctxids = []
-    for file in json_files:
+    for folder_name in folders:
         try:
-            js = files.read_file(file)
-            data = json.loads(js)
-            ctx = _deserialize_context(data)
-            ctxids.append(ctx.id)
+            if folder_name in loaded:
+                data, seq = _read_chat_data(folder_name)
+                ctx = _deserialize_context(data)
+                _reset_journal(ctx.id, seq)
+                ctxids.append(ctx.id)
+                continue
+            entry = _read_index_entry(folder_name)
+            entry["no"] = AgentContext._counter = AgentContext._counter + 1
+            index[entry["id"]] = entry
+            ctxids.append(entry["id"])
         except Exception as e:
-            print(f"Error loading chat {file}: {e}")
+            print(f"Error loading chat {_get_chat_file_path(folder_name)}: {e}")
+
+    global _chat_index
+    with _index_lock:
+        _chat_index = index
+    return ctxids
+
+
+def load_indexed_chat(ctxid: str):
+    """Deserialize a chat known only from its index entry, on its first use."""
+    if ctxid not in _chat_index:
+        return
+    with _index_lock:
+        entry = _chat_index.get(ctxid)
+        # extensions of the context being created may look it up again
+        if entry is None or ctxid in _loading:
+            return
+        _loading.add(ctxid)
+        try:
+            data, seq = _read_chat_data(ctxid)
+            context = _deserialize_context(data)
+            context.no = entry["no"]
+            _reset_journal(context.id, seq)
+        except Exception as e:
+            print(f"Error loading chat {_get_chat_file_path(ctxid)}: {e}")
+        finally:
+            _loading.discard(ctxid)
+            _chat_index.pop(ctxid, None)
+
+
+def is_chat_indexed(ctxid: str) -> bool:
+    return ctxid in _chat_index
+
+
+def get_indexed_chat_ids() -> list[str]:
+    with _index_lock:
+        return list(_chat_index)
+
+
+def get_indexed_chats() -> list[dict[str, Any]]:
+    """Index entries of persisted chats that are not loaded yet."""
+    with _index_lock:
+        return list(_chat_index.values())
+
+
+def load_indexed_chats(match: Callable[[dict[str, Any]], bool]) -> list[str]:
+    """Load the indexed chats whose context data matches, returns their ids.
+
+    Lets lookups by context data, like the chat of a messaging contact, find
+    chats that were not used since startup.
+    """
+    ctxids = [
+        entry["id"]
+        for entry in get_indexed_chats()
+        if match(entry.get("data") or {})
+    ]
+    for ctxid in ctxids:
+        AgentContext.get(ctxid)
     return ctxids
 
 
+def output_indexed_chat(entry: dict[str, Any]) -> dict[str, Any]:
+    """Same shape as AgentContext.output() for a chat that is not loaded yet."""
+    localization = Localization.get()
+    return {
+        "id": entry["id"],
+        "name": entry.get("name"),
+        "created_at": localization.serialize_datetime(
+            datetime.fromisoformat(entry["created_at"])
+        ),
+        "no": entry.get("no", 0),
+        "log_guid": entry.get("log_guid", ""),
+        "log_version": entry.get("log_version", 0),
+        "log_length": entry.get("log_version", 0),
+        "paused": False,
+        "last_message": localization.serialize_datetime(
+            datetime.fromisoformat(entry["last_message"])
+        ),
+        "type": entry.get("type", AgentContextType.USER.value),
+        "running": False,
+        **entry.get("output_data", {}),
+    }
+
+
 def _get_chat_file_path(ctxid: str):
     return files.get_abs_path(CHATS_FOLDER, ctxid, CHAT_FILE_NAME)
 
 
+def _get_index_file_path(ctxid: str):
+    return files.get_abs_path(CHATS_FOLDER, ctxid, INDEX_FILE_NAME)
+
+
+def _get_journal_file_path(ctxid: str, rotated: bool = False):
+    name = JOURNAL_ROTATED_FILE_NAME if rotated else JOURNAL_FILE_NAME
+    return files.get_abs_path(CHATS_FOLDER, ctxid, name)
+
+
 def _convert_v080_chats():
     json_files = files.list_files(CHATS_FOLDER, "*.json")
     for file in json_files:
@@ -105,6 +241,14 @@ def export_json_chat(context: AgentContext):
 
 def remove_chat(ctxid):
     """Remove a chat or task context"""
+    with _journals_lock:
+        journal = _journals.pop(ctxid, None)
+    if journal:
+        with journal.lock:
+            # a compaction still in flight would recreate the folder
+            journal.wait_compaction()
+    with _index_lock:
+        _chat_index.pop(ctxid, None)
     path = get_chat_folder_path(ctxid)
     files.delete_dir(path)
 
@@ -116,14 +260,24 @@ def remove_msg_files(ctxid):
 
 
 def _serialize_context(context: AgentContext):
-    # serialize agents
+    agents = [_serialize_agent(agent) for agent in _get_agents(context)]
+    return {
+        **_serialize_meta(context),
+        "agents": agents,
+        "log": _serialize_log(context.log),
+    }
+
+
+def _get_agents(context: AgentContext) -> list[Agent]:
     agents = []
     agent = context.agent0
     while agent:
-        agents.append(_serialize_agent(agent))
+        agents.append(agent)
         agent = agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
+    return agents
 
 
+def _serialize_meta(context: AgentContext):
     data = {k: v for k, v in context.data.items() if not k.startswith("_")}
     output_data = {k: v for k, v in context.output_data.items() if not k.startswith("_")}
 
@@ -141,18 +295,16 @@ def _serialize_context(context: AgentContext):
             if context.last_message
             else datetime.fromtimestamp(0).isoformat()
         ),
-        "agents": agents,
         "streaming_agent": (
             context.streaming_agent.number if context.streaming_agent else 0
         ),
-        "log": _serialize_log(context.log),
         "data": data,
         "output_data": output_data,
     }
 
 
 def _serialize_agent(agent: Agent):
-    data = {k: v for k, v in agent.data.items() if not k.startswith("_")}
+    data = _serialize_agent_data(agent)
 
     history = agent.history.serialize()
 
@@ -163,6 +315,10 @@ def _serialize_agent(agent: Agent):
     }
 
 
+def _serialize_agent_data(agent: Agent):
+    return {k: v for k, v in agent.data.items() if not k.startswith("_")}
+
+
 def _serialize_log(log: Log):
     # Guard against concurrent log mutations while serializing.
     with log._lock:
@@ -288,6 +444,535 @@ def _deserialize_log(data: dict[str, Any]) -> "Log":
     return log
 
 
+# Chat index
+#
+# Every chat folder holds a small index.json with what the chat lists need.
+# At startup only these are read, the full chat is deserialized on first use.
+
+_chat_index: dict[str, dict[str, Any]] = {}
+_index_lock = threading.RLock()
+_loading: set[str] = set()
+
+
+def _index_entry(context: AgentContext) -> dict[str, Any]:
+    from helpers.projects import CONTEXT_DATA_KEY_PROJECT
+
+    meta = _serialize_meta(context)
+    with context.log._lock:
+        log_guid = context.log.guid
+        # a restored log restarts its versions at the number of items kept
+        log_version = min(len(context.log.logs), LOG_SIZE)
+    return {
+        "id": meta["id"],
+        "name": meta["name"],
+        "created_at": meta["created_at"],
+        "last_message": meta["last_message"],
+        "type": meta["type"],
+        "project": context.get_data(CONTEXT_DATA_KEY_PROJECT),
+        "log_guid": log_guid,
+        "log_version": log_version,
+        # detached, so later changes of the context data compare unequal
+        "data": json.loads(_safe_json_serialize(meta["data"], ensure_ascii=False)),
+        "output_data": meta["output_data"],
+    }
+
+
+def _index_entry_from_data(data: dict[str, Any]) -> dict[str, Any]:
+    from helpers.projects import CONTEXT_DATA_KEY_PROJECT
+
+    epoch = datetime.fromtimestamp(0).isoformat()
+    log = data.get("log") or {}
+    return {
+        "id": data["id"],
+        "name": data.get("name"),
+        "created_at": data.get("created_at", epoch),
+        "last_message": data.get("last_message", epoch),
+        "type": data.get("type", AgentContextType.USER.value),
+        "project": (data.get("data") or {}).get(CONTEXT_DATA_KEY_PROJECT),
+        "log_guid": log.get("guid", ""),
+        "log_version": len(log.get("logs", [])),
+        "data": data.get("data", {}),
+        "output_data": data.get("output_data", {}),
+    }
+
+
+def _update_index_entry(context: AgentContext, journal: "_ChatJournal"):
+    entry = _index_entry(context)
+    if entry == journal.index_entry:
+        return
+    _write_index_entry(context.id, entry)
+    journal.index_entry = entry
+
+
+def _write_index_entry(ctxid: str, entry: dict[str, Any]):
+    path = _get_index_file_path(ctxid)
+    tmp = path + ".tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(sanitize_string(_safe_json_serialize(entry, ensure_ascii=False)))
+    os.replace(tmp, path)
+
+
+def _read_index_entry(ctxid: str) -> dict[str, Any]:
+    path = _get_index_file_path(ctxid)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("id") == ctxid and "data" in entry:
+                return entry
+        except (OSError, ValueError):
+            pass
+    # chats saved before the index (or its context data) existed
+    data, _seq = _read_chat_data(ctxid)
+    entry = _index_entry_from_data(data)
+    _write_index_entry(ctxid, entry)
+    return entry
+
+
+# Chat journal
+#
+# chat.json is a snapshot stamped with the sequence number of the last journal
+# record it contains. Every later save appends one JSON line to chat.journal
+# holding only what changed: context meta, updated log items, and per agent its
+# data and either the messages appended to the current topic or, when a new
+# topic or history compression restructured it, splices of just the changed
+# records. Compaction rotates the journal to chat.journal.1, encodes and writes
+# a fresh snapshot in the background and then drops the rotated file, so a crash
+# at any point leaves snapshot + journals that replay to the last saved state.
+
+_journals: dict[str, "_ChatJournal"] = {}
+_journals_lock = threading.Lock()
+_compaction_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="ChatCompaction"
+)
+
+
+@dataclass
+class _AgentMark:
+    agent: Agent
+    data_json: str
+    history: history.History
+    bulks: tuple  # marks of bulk records
+    topics: tuple  # marks of topic records
+    current: history.Topic
+    summary: str  # summary of the current topic
+    messages: tuple  # marks of current topic messages
+
+
+@dataclass
+class _ChatJournal:
+    ctxid: str
+    seq: int = 0  # last record written
+    lock: threading.RLock = field(default_factory=threading.RLock)
+    # marks of what the files hold, valid once the first snapshot is written
+    synced: bool = False
+    meta_json: str = ""
+    log_guid: str = ""
+    log_version: int = 0
+    log_progress: tuple = ()
+    agents: list[_AgentMark] = field(default_factory=list)
+    snapshot_bytes: int = 0
+    journal_bytes: int = 0
+    last_fsync: float = 0.0
+    unsynced: bool = False
+    compaction: Future | None = None
+    index_entry: dict[str, Any] | None = None
+
+    def needs_compaction(self) -> bool:
+        return not self.synced or self.journal_bytes > max(
+            JOURNAL_COMPACT_MIN_BYTES, self.snapshot_bytes
+        )
+
+    def forget(self):
+        self.synced = False
+        self.agents = []
+        self.index_entry = None
+
+    def wait_compaction(self):
+        compaction, self.compaction = self.compaction, None
+        if compaction:
+            try:
+                compaction.result()
+            except Exception as e:
+                # records stay in the rotated journal and replay over the old snapshot
+                print(f"Error compacting chat {self.ctxid}: {e}")
+
+    def append(self, record: dict[str, Any]):
+        self.seq += 1
+        line = _safe_json_serialize({"seq": self.seq, **record}, ensure_ascii=False)
+        line = sanitize_string(line) + "\n"
+        path = _get_journal_file_path(self.ctxid)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            now = time.monotonic()
+            if now - self.last_fsync >= JOURNAL_FSYNC_INTERVAL:
+                os.fsync(f.fileno())
+                self.last_fsync = now
+                self.unsynced = False
+            else:
+                self.unsynced = True
+        self.journal_bytes += len(line)
+
+    def sync(self):
+        if not self.unsynced:
+            return
+        path = _get_journal_file_path(self.ctxid)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                os.fsync(f.fileno())
+        self.last_fsync = time.monotonic()
+        self.unsynced = False
+
+
+def _get_journal(ctxid: str) -> _ChatJournal:
+    with _journals_lock:
+        journal = _journals.get(ctxid)
+        if not journal:
+            journal = _journals[ctxid] = _ChatJournal(ctxid)
+        return journal
+
+
+def _reset_journal(ctxid: str, seq: int):
+    with _journals_lock:
+        previous = _journals.get(ctxid)
+        _journals[ctxid] = _ChatJournal(ctxid, seq=seq)
+    if previous:
+        with previous.lock:
+            previous.wait_compaction()
+
+
+def _compact_chat(context: AgentContext, journal: _ChatJournal, wait: bool):
+    journal.wait_compaction()
+
+    # marks are taken before copying; anything changing meanwhile is
+    # simply journaled again by the next save
+    meta = _serialize_meta(context)
+    meta_json = _safe_json_serialize(meta, ensure_ascii=False)
+    log_marks = _mark_log(context.log)
+    agents = _get_agents(context)
+    agent_marks = [_mark_agent(agent) for agent in agents]
+
+    # detached copies only, the JSON encoding of the whole chat happens off the caller
+    agents_data = [
+        {
+            "number": mark.agent.number,
+            "data": json.loads(mark.data_json),
+            "history": mark.agent.history.to_dict(),
+        }
+        for mark in agent_marks
+    ]
+    log_data = _serialize_log(context.log)
+    seq = journal.seq
+
+    # records up to journal.seq move aside until the snapshot replaces them
+    journal.sync()
+    _rotate_journal(journal.ctxid)
+    journal.journal_bytes = 0
+    journal.meta_json = meta_json
+    journal.log_guid, journal.log_version, journal.log_progress = log_marks
+    journal.agents = agent_marks
+    journal.synced = True
+
+    args = (journal, json.loads(meta_json), agents_data, log_data, seq)
+    if wait or not os.path.exists(_get_chat_file_path(journal.ctxid)):
+        _write_compacted_chat(*args)
+    else:
+        journal.compaction = _compaction_executor.submit(_write_compacted_chat, *args)
+
+
+def _write_compacted_chat(
+    journal: _ChatJournal,
+    meta: dict[str, Any],
+    agents: list[dict[str, Any]],
+    log: dict[str, Any],
+    seq: int,
+):
+    for agent in agents:
+        agent["history"] = history._json_dumps(agent["history"])
+    data = {**meta, "agents": agents, "log": log, "journal_seq": seq}
+    js = sanitize_string(_safe_json_serialize(data, ensure_ascii=False))
+    journal.snapshot_bytes = len(js)
+    _write_snapshot(journal.ctxid, js)
+
+
+def _append_chat_changes(context: AgentContext, journal: _ChatJournal):
+    record: dict[str, Any] = {}
+
+    meta = _serialize_meta(context)
+    meta_json = _safe_json_serialize(meta, ensure_ascii=False)
+    if meta_json != journal.meta_json:
+        record["meta"] = meta
+
+    log_marks = _mark_log(context.log)
+    log_changes = _log_changes(context.log, journal)
+    if log_changes:
+        record["log"] = log_changes
+
+    agents = _get_agents(context)
+    agent_marks = [_mark_agent(agent) for agent in agents]
+    if [mark.agent for mark in journal.agents] != agents:
+        record["agents"] = [_serialize_agent(agent) for agent in agents]
+    else:
+        changes = [
+            change
+            for old, new in zip(journal.agents, agent_marks)
+            if (change := _agent_changes(old, new))
+        ]
+        if changes:
+            record["agent_changes"] = changes
+
+    if record:
+        journal.append(record)
+    journal.meta_json = meta_json
+    journal.log_guid, journal.log_version, journal.log_progress = log_marks
+    journal.agents = agent_marks
+
+
+def _mark_log(log: Log) -> tuple[str, int, tuple]:
+    with log._lock:
+        return log.guid, log.updates.version, (log.progress, log.progress_no)
+
+
+def _log_changes(log: Log, journal: _ChatJournal) -> dict[str, Any]:
+    with log._lock:
+        if log.guid != journal.log_guid:
+            changes: dict[str, Any] = {
+                "reset": True,
+                "guid": log.guid,
+                "items": [item.output() for item in log.logs[-LOG_SIZE:]],
+            }
+        else:
+            first = len(log.logs) - LOG_SIZE
+            items = [
+                log.logs[no].output()
+                for no in log.updates.changed_since(journal.log_version)
+                if first <= no < len(log.logs)
+            ]
+            changes = {"items": items} if items else {}
+        if changes or (log.progress, log.progress_no) != journal.log_progress:
+            changes["progress"] = log.progress
+            changes["progress_no"] = log.progress_no
+    return changes
+
+
+def _mark_agent(agent: Agent) -> _AgentMark:
+    hist = agent.history
+    return _AgentMark(
+        agent=agent,
+        data_json=_safe_json_serialize(_serialize_agent_data(agent), ensure_ascii=False),
+        history=hist,
+        bulks=tuple(_mark_record(bulk) for bulk in hist.bulks),
+        topics=tuple(_mark_record(topic) for topic in hist.topics),
+        current=hist.current,
+        summary=hist.current.summary,
+        messages=tuple(_mark_record(msg) for msg in hist.current.messages),
+    )
+
+
+def _mark_record(record: history.Record) -> tuple:
+    # tuples compare items by identity first, so unchanged records compare cheaply
+    if isinstance(record, history.Message):
+        return (record, record.content, record.summary)
+    if isinstance(record, history.Topic):
+        return (record, record.summary, tuple(_mark_record(m) for m in record.messages))
+    if isinstance(record, history.Bulk):
+        return (record, record.summary, tuple(_mark_record(r) for r in record.records))
+    return (record,)
+
+
+def _agent_changes(old: _AgentMark, new: _AgentMark) -> dict[str, Any] | None:
+    changes: dict[str, Any] = {}
+    if new.data_json != old.data_json:
+        changes["data"] = _serialize_agent_data(new.agent)
+    if new.history is not old.history:
+        changes["history"] = new.history.serialize()
+    elif records := _history_changes(old, new):
+        if list(records) == ["messages"] and records["messages"]["start"] == len(
+            old.messages
+        ):
+            changes["messages"] = records["messages"]["items"]  # plain append
+        else:
+            changes["history_changes"] = records
+        changes["counter"] = new.history.counter
+    if not changes:
+        return None
+    return {"number": new.agent.number, **changes}
+
+
+def _history_changes(old: _AgentMark, new: _AgentMark) -> dict[str, Any]:
+    # only the records that changed are journaled, as splices of the history lists
+    changes: dict[str, Any] = {}
+    for key in ("bulks", "topics"):
+        if splice := _splice(getattr(old, key), getattr(new, key)):
+            changes[key] = splice
+    if new.current is not old.current:
+        changes["current"] = new.current.to_dict()
+    else:
+        if new.summary != old.summary:
+            changes["summary"] = new.summary
+        if splice := _splice(old.messages, new.messages):
+            changes["messages"] = splice
+    return changes
+
+
+def _splice(old: tuple, new: tuple) -> dict[str, Any] | None:
+    """Replacement of old[start:end] by the records of new that differ."""
+    if old == new:
+        return None
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    tail = 0
+    while tail < limit - start and old[-1 - tail] == new[-1 - tail]:
+        tail += 1
+    return {
+        "start": start,
+        "end": len(old) - tail,
+        "items": [mark[0].to_dict() for mark in new[start : len(new) - tail]],
+    }
+
+
+def _rotate_journal(ctxid: str):
+    path = _get_journal_file_path(ctxid)
+    rotated = _get_journal_file_path(ctxid, rotated=True)
+    if not os.path.exists(path):
+        return
+    if os.path.exists(rotated):
+        # a previous snapshot never landed, keep its records too
+        with open(path, "rb") as src, open(rotated, "ab") as dst:
+            shutil.copyfileobj(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.remove(path)
+    else:
+        os.replace(path, rotated)
+
+
+def _write_snapshot(ctxid: str, js: str):
+    path = _get_chat_file_path(ctxid)
+    tmp = path + ".tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(js)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    rotated = _get_journal_file_path(ctxid, rotated=True)
+    if os.path.exists(rotated):
+        os.remove(rotated)
+
+
+def _read_chat_data(ctxid: str) -> tuple[dict[str, Any], int]:
+    """Read chat.json and replay its journal, returns the data and the last sequence number."""
+    data = json.loads(files.read_file(_get_chat_file_path(ctxid)))
+    snapshot_seq = data.pop("journal_seq", 0)
+    replay = _JournalReplay(data)
+    seq = snapshot_seq
+    for path in (
+        _get_journal_file_path(ctxid, rotated=True),
+        _get_journal_file_path(ctxid),
+    ):
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn write of a crashed process
+                if record.get("seq", 0) <= snapshot_seq:
+                    continue
+                replay.apply(record)
+                seq = max(seq, record["seq"])
+    return replay.result(), seq
+
+
+class _JournalReplay:
+    def __init__(self, data: dict[str, Any]):
+        self.data = data
+        log = data.get("log") or {}
+        self.log = {k: v for k, v in log.items() if k != "logs"}
+        self.items = {
+            item.get("no", i): item for i, item in enumerate(log.get("logs", []))
+        }
+        self.histories: dict[int, dict[str, Any]] = {}
+
+    def apply(self, record: dict[str, Any]):
+        if "meta" in record:
+            self.data.update(record["meta"])
+        if "log" in record:
+            log = record["log"]
+            if log.get("reset"):
+                self.items = {}
+                self.log["guid"] = log["guid"]
+            for item in log.get("items", []):
+                self.items[item["no"]] = item
+            for key in ("progress", "progress_no"):
+                if key in log:
+                    self.log[key] = log[key]
+        if "agents" in record:
+            self.data["agents"] = record["agents"]
+            self.histories = {}
+        for change in record.get("agent_changes", []):
+            number = change["number"]
+            agent = self._agent(number)
+            if "data" in change:
+                agent["data"] = change["data"]
+            if "history" in change:
+                agent["history"] = change["history"]
+                self.histories.pop(number, None)
+            if "messages" in change:
+                hist = self._history(number)
+                hist["current"]["messages"].extend(change["messages"])
+                hist["counter"] = change["counter"]
+            if "history_changes" in change:
+                hist = self._history(number)
+                records = change["history_changes"]
+                for key in ("bulks", "topics"):
+                    if key in records:
+                        _apply_splice(hist[key], records[key])
+                if "current" in records:
+                    hist["current"] = records["current"]
+                if "summary" in records:
+                    hist["current"]["summary"] = records["summary"]
+                if "messages" in records:
+                    _apply_splice(hist["current"]["messages"], records["messages"])
+                hist["counter"] = change["counter"]
+
+    def result(self) -> dict[str, Any]:
+        for number, hist in self.histories.items():
+            self._agent(number)["history"] = json.dumps(hist, ensure_ascii=False)
+        self.data["log"] = {
+            **self.log,
+            "logs": [self.items[no] for no in sorted(self.items)][-LOG_SIZE:],
+        }
+        return self.data
+
+    def _history(self, number: int) -> dict[str, Any]:
+        hist = self.histories.get(number)
+        if hist is None:
+            js = self._agent(number).get("history", "")
+            hist = json.loads(js) if js else history.History(agent=None).to_dict()
+            self.histories[number] = hist
+        return hist
+
+    def _agent(self, number: int) -> dict[str, Any]:
+        for agent in self.data.get("agents", []):
+            if agent.get("number") == number:
+                return agent
+        agent = {"number": number, "data": {}, "history": ""}
+        self.data.setdefault("agents", []).append(agent)
+        return agent
+
+
+def _apply_splice(records: list, splice: dict[str, Any]):
+    records[splice["start"] : splice["end"]] = splice["items"]
+
+
 def _safe_json_serialize(obj, **kwargs):
     def serializer(o):
         if isinstance(o, dict):
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import copy
 import re, json, glob
 import time
 from pathlib import Path
@@ -65,9 +66,11 @@ HOOKS_CACHE_AREA = "plugin_hooks(plugins)"
 PLUGINS_LIST_CACHE_AREA = "plugins_list(plugins)"
 ENABLED_PLUGINS_LIST_CACHE_AREA = "enabled_plugins(plugins)"
 ENABLED_PLUGINS_PATHS_CACHE_AREA = "enabled_plugins_paths(plugins)"
+PLUGIN_CONFIG_CACHE_AREA = "plugin_config(plugins)"
 
 
 _last_frontend_reload_notification_at = 0.0
+_NOT_CACHED = object()  # plugin configs may be None
 
 
 class PluginMetadata(BaseModel):
@@ -175,6 +178,59 @@ def register_watchdogs():
         handler=on_plugin_change,
     )
 
+    register_config_watchdogs()
+
+
+def register_config_watchdogs():
+    """Config files only invalidate resolved configs, without reloading plugins."""
+
+    def on_config_change(events: list[WatchItem]):
+        print_style.PrintStyle.debug("Plugin config watchdog triggered", events)
+        clear_plugin_config_cache()
+
+    from helpers import projects
+    from helpers import subagents
+
+    agent_config = f"{files.AGENTS_DIR}/*/{files.PLUGINS_DIR}/*/{CONFIG_FILE_NAME}"
+
+    # plugins/<plugin>/ and plugins/<plugin>/agents/<profile>/plugins/<plugin>/
+    watchdog.add_watchdog(
+        id="plugins_config_roots",
+        roots=get_plugin_roots(),
+        patterns=[
+            f"*/{CONFIG_FILE_NAME}",
+            f"*/{CONFIG_DEFAULT_FILE_NAME}",
+            f"*/{agent_config}",
+        ],
+        handler=on_config_change,
+    )
+
+    # projects/<project>/.a0proj/plugins/<plugin>/ and .a0proj/agents/<profile>/plugins/<plugin>/
+    watchdog.add_watchdog(
+        id="plugins_config_projects",
+        roots=[files.get_abs_path(projects.PROJECTS_PARENT_DIR)],
+        patterns=[
+            f"*/{projects.PROJECT_META_DIR}/{files.PLUGINS_DIR}/*/{CONFIG_FILE_NAME}",
+            f"*/{projects.PROJECT_META_DIR}/{agent_config}",
+        ],
+        handler=on_config_change,
+    )
+
+    # agents/<profile>/plugins/<plugin>/ and usr/agents/<profile>/plugins/<plugin>/
+    watchdog.add_watchdog(
+        id="plugins_config_agents",
+        roots=[
+            files.get_abs_path(subagents.DEFAULT_AGENTS_DIR),
+            files.get_abs_path(subagents.USER_AGENTS_DIR),
+        ],
+        patterns=[f"*/{files.PLUGINS_DIR}/*/{CONFIG_FILE_NAME}"],
+        handler=on_config_change,
+    )
+
+
+def clear_plugin_config_cache():
+    cache.clear(PLUGIN_CONFIG_CACHE_AREA)
+
 
 @extension.extensible
 def after_plugin_change(plugin_names: list[str] | None = None, python_change:bool=False):
@@ -586,9 +642,6 @@ def get_plugin_config(
     project_name: str | None = None,
     agent_profile: str | None = None,
 ):
-
-    default_used = False
-
     if project_name is None and agent is not None:
         from helpers import projects
 
@@ -596,6 +649,26 @@ def get_plugin_config(
     if agent_profile is None and agent is not None:
         agent_profile = agent.config.profile
 
+    # resolved configs are reused until a config file changes, see register_config_watchdogs
+    cache_key = (plugin_name, project_name or "", agent_profile or "")
+    cached = cache.get(PLUGIN_CONFIG_CACHE_AREA, cache_key, _NOT_CACHED)
+    if cached is not _NOT_CACHED:
+        # callers may modify the returned config
+        return copy.deepcopy(cached)
+
+    result = _load_plugin_config(plugin_name, agent, project_name, agent_profile)
+    cache.add(PLUGIN_CONFIG_CACHE_AREA, cache_key, result)
+    return copy.deepcopy(result)
+
+
+def _load_plugin_config(
+    plugin_name: str,
+    agent: Agent | None,
+    project_name: str | None,
+    agent_profile: str | None,
+):
+    default_used = False
+
     # find config.json in all possible places
     file = find_plugin_asset(
         plugin_name,
@@ -677,6 +750,7 @@ def save_plugin_config(
     # or do standard load
     if new_settings is not None and file_path:
         files.write_file(file_path, json.dumps(new_settings))
+        clear_plugin_config_cache()  # the watchdog may fire after the next read
         # after_plugin_change([plugin_name]) # don't trigger when only config changes
 
 
@@ -340,6 +340,7 @@ def deactivate_project(context_id: str, *, mark_dirty: bool = True):
 def reactivate_project_in_chats(name: str):
     from agent import AgentContext
 
+    _load_indexed_project_chats(name)
     for context in AgentContext.all():
         if context.get_data(CONTEXT_DATA_KEY_PROJECT) == name:
             activate_project(context.id, name, mark_dirty=False)
@@ -352,6 +353,7 @@ def reactivate_project_in_chats(name: str):
 def deactivate_project_in_chats(name: str):
     from agent import AgentContext
 
+    _load_indexed_project_chats(name)
     for context in AgentContext.all():
         if context.get_data(CONTEXT_DATA_KEY_PROJECT) == name:
             deactivate_project(context.id, mark_dirty=False)
@@ -361,6 +363,15 @@ def deactivate_project_in_chats(name: str):
     mark_dirty_all(reason="projects.deactivate_project_in_chats")
 
 
+def _load_indexed_project_chats(name: str):
+    """Load persisted chats of the project that were not opened since startup."""
+    from agent import AgentContext
+
+    for entry in persist_chat.get_indexed_chats():
+        if entry.get("project") == name:
+            AgentContext.get(entry["id"])
+
+
 def build_system_prompt_vars(name: str):
     project_data = load_basic_project_data(name)
     main_instructions = project_data.get("instructions", "") or ""
@@ -4,7 +4,7 @@ import time
 import os
 from io import StringIO
 from dataclasses import dataclass
-from typing import Dict, Optional, List, Literal, Set, Callable, Tuple, TYPE_CHECKING
+from typing import Dict, Optional, List, Literal, Callable, Tuple, TYPE_CHECKING
 from dotenv.parser import parse_stream
 from helpers.errors import RepairableException
 from helpers import files
@@ -36,75 +36,149 @@ class EnvLine:
     )
 
 
+class SecretsMatcher:
+    """Compiled multi-pattern matcher over secret values.
+
+    - Full values are replaced in a single regex pass, the longest value wins at
+      each position.
+    - An Aho-Corasick automaton over the same values tracks the longest suffix
+      that can still grow into a secret, so streaming filters carry a state
+      across chunks instead of probing every suffix of their buffer.
+    """
+
+    def __init__(self, key_to_value: Dict[str, str], min_length: int = 1):
+        self.value_to_key: Dict[str, str] = {}
+        for key, value in key_to_value.items():
+            if isinstance(value, str) and value and len(value.strip()) >= min_length:
+                self.value_to_key.setdefault(value, key)
+
+        values = sorted(self.value_to_key, key=len, reverse=True)
+        self.max_len: int = len(values[0]) if values else 0
+        self.pattern = (
+            re.compile("|".join(re.escape(v) for v in values)) if values else None
+        )
+        self._aliases: Dict[str, Dict[str, str]] = {}
+
+        # automaton: goto transitions, failure links and prefix length per state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._depth: List[int] = [0]
+        for value in values:
+            state = 0
+            for char in value:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._depth.append(self._depth[state] + 1)
+                    self._goto[state][char] = nxt
+                state = nxt
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                queue.append(nxt)
+
+    def __bool__(self) -> bool:
+        return self.pattern is not None
+
+    def mask(self, text: str, placeholder: str = "§§secret({key})") -> str:
+        return self.mask_count(text, placeholder)[0]
+
+    def mask_count(
+        self, text: str, placeholder: str = "§§secret({key})"
+    ) -> Tuple[str, int]:
+        """Replace full secret values with placeholders, return text and count."""
+        if not text or self.pattern is None:
+            return text, 0
+        aliases = self.aliases(placeholder)
+        return self.pattern.subn(lambda m: aliases[m.group(0)], text)
+
+    def aliases(self, placeholder: str = "§§secret({key})") -> Dict[str, str]:
+        """Map of secret value -> placeholder text, built once per format."""
+        aliases = self._aliases.get(placeholder)
+        if aliases is None:
+            aliases = {
+                value: alias_for_key(key, placeholder)
+                for value, key in self.value_to_key.items()
+            }
+            self._aliases[placeholder] = aliases
+        return aliases
+
+    def advance(self, state: int, text: str) -> int:
+        """Feed text into the automaton starting from state, return the new state."""
+        goto, fail = self._goto, self._fail
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+        return state
+
+    def depth(self, state: int) -> int:
+        """Length of the secret prefix the state stands for."""
+        return self._depth[state]
+
+
 class StreamingSecretsFilter:
     """Stateful streaming filter that masks secrets on the fly.
 
     - Replaces full secret values with placeholders §§secret(KEY) when detected.
     - Holds the longest suffix of the current buffer that matches any secret prefix
-      (with minimum trigger length of 3) to avoid leaking partial secrets across chunks.
-    - On finalize(), any unresolved partial is masked with '***'.
+      to avoid leaking partial secrets across chunks. The suffix is tracked by the
+      matcher automaton state carried between chunks.
+    - On finalize(), any unresolved partial of at least min_trigger (3) characters
+      is masked with '***', shorter ones are flushed as they are.
     """
 
-    def __init__(self, key_to_value: Dict[str, str], min_trigger: int = 3):
+    def __init__(
+        self,
+        key_to_value: Dict[str, str],
+        min_trigger: int = 3,
+        matcher: Optional[SecretsMatcher] = None,
+    ):
         self.min_trigger = max(1, int(min_trigger))
-        # Map value -> key for placeholder construction
-        self.value_to_key: Dict[str, str] = {
-            v: k for k, v in key_to_value.items() if isinstance(v, str) and v
-        }
-        # Only keep non-empty values
-        self.secret_values: List[str] = [v for v in self.value_to_key.keys() if v]
-        # Precompute all prefixes for quick suffix matching
-        self.prefixes: Set[str] = set()
-        for v in self.secret_values:
-            for i in range(self.min_trigger, len(v) + 1):
-                self.prefixes.add(v[:i])
-        self.max_len: int = max((len(v) for v in self.secret_values), default=0)
+        self.matcher = matcher if matcher is not None else SecretsMatcher(key_to_value)
+        self.max_len: int = self.matcher.max_len
+        # Automaton state after everything seen so far
+        self.state: int = 0
 
         # Internal buffer of pending text that is not safe to flush yet
         self.pending: str = ""
 
-    def _replace_full_values(self, text: str) -> str:
-        """Replace all full secret values with placeholders in the given text."""
-        # Sort by length desc to avoid partial overlaps
-        for val in sorted(self.secret_values, key=len, reverse=True):
-            if not val:
-                continue
-            key = self.value_to_key.get(val, "")
-            if key:
-                text = text.replace(val, alias_for_key(key))
-        return text
-
-    def _longest_suffix_prefix(self, text: str) -> int:
-        """Return length of longest suffix of text that is a known secret prefix.
-        Returns 0 if none found (or only shorter than min_trigger)."""
-        max_check = min(len(text), self.max_len)
-        for length in range(max_check, self.min_trigger - 1, -1):
-            suffix = text[-length:]
-            if suffix in self.prefixes:
-                return length
-        return 0
-
     def process_chunk(self, chunk: str) -> str:
         if not chunk:
             return ""
 
-        self.pending += chunk
-
-        # Replace any full secret occurrences first
-        self.pending = self._replace_full_values(self.pending)
-
-        # Determine the longest suffix that could still form a secret
-        hold_len = self._longest_suffix_prefix(self.pending)
-        if hold_len > 0:
-            # Flush everything except the hold suffix
-            emit = self.pending[:-hold_len]
-            self.pending = self.pending[-hold_len:]
-        else:
-            # Safe to flush everything
-            emit = self.pending
-            self.pending = ""
+        matcher = self.matcher
+        text = self.pending + chunk
+        # Only the new characters need to go through the automaton
+        self.state = matcher.advance(self.state, chunk)
+        boundary = len(text) - min(matcher.depth(self.state), len(text))
 
-        return emit
+        # Replace full values, deferring those inside the held suffix as a
+        # longer secret may still be forming there
+        parts: List[str] = []
+        pos = 0
+        aliases = matcher.aliases()
+        while matcher.pattern is not None:
+            match = matcher.pattern.search(text, pos)
+            if match is None or match.start() >= boundary:
+                break
+            parts.append(text[pos : match.start()])
+            parts.append(aliases[match.group(0)])
+            pos = match.end()
+            if pos > boundary:
+                # The secret ran into the held suffix, hold only what follows it
+                self.state = matcher.advance(0, text[pos:])
+                boundary = len(text) - min(matcher.depth(self.state), len(text) - pos)
+
+        parts.append(text[pos:boundary])
+        self.pending = text[boundary:]
+        return "".join(parts)
 
     def finalize(self) -> str:
         """Flush any remaining buffered text. If pending contains an unresolved partial
@@ -112,14 +186,14 @@ class StreamingSecretsFilter:
         if not self.pending:
             return ""
 
-        hold_len = self._longest_suffix_prefix(self.pending)
-        if hold_len > 0:
-            safe = self.pending[:-hold_len]
+        result = self.matcher.mask(self.pending)
+        self.state = self.matcher.advance(0, result)
+        hold_len = min(self.matcher.depth(self.state), len(result))
+        if hold_len >= self.min_trigger:
             # Mask unresolved partial
-            result = safe + "***"
-        else:
-            result = self.pending
+            result = result[:-hold_len] + "***"
         self.pending = ""
+        self.state = 0
         return result
 
 
@@ -147,6 +221,8 @@ class SecretsManager:
         self._raw_snapshots: Dict[str, str] = {}
         self._secrets_cache = None
         self._last_raw_text = None
+        # min_length -> (secrets dict the matcher was built from, matcher)
+        self._matchers: Dict[int, Tuple[Dict[str, str], SecretsMatcher]] = {}
 
     def read_secrets_raw(self) -> str:
         """Read raw secrets file content from local filesystem (same system)."""
@@ -255,9 +331,21 @@ class SecretsManager:
             key_formatter=alias_for_key,
         )
 
+    def get_matcher(self, min_length: int = 4) -> SecretsMatcher:
+        """Compiled matcher for the current secrets, rebuilt only when they change."""
+        secrets = self.load_secrets()
+        with self._lock:
+            cached = self._matchers.get(min_length)
+            if cached is not None and cached[0] is secrets:
+                return cached[1]
+            matcher = SecretsMatcher(secrets, min_length)
+            self._matchers[min_length] = (secrets, matcher)
+            return matcher
+
     def create_streaming_filter(self) -> "StreamingSecretsFilter":
         """Create a streaming-aware secrets filter snapshotting current secret values."""
-        return StreamingSecretsFilter(self.load_secrets())
+        secrets = self.load_secrets()
+        return StreamingSecretsFilter(secrets, matcher=self.get_matcher(min_length=1))
 
     def replace_placeholders(self, text: str) -> str:
         """Replace secret placeholders with actual values"""
@@ -303,17 +391,7 @@ class SecretsManager:
         if not text:
             return text
 
-        secrets = self.load_secrets()
-        result = text
-
-        # Sort by length (longest first) to avoid partial replacements
-        for key, value in sorted(
-            secrets.items(), key=lambda x: len(x[1]), reverse=True
-        ):
-            if value and len(value.strip()) >= min_length:
-                result = result.replace(value, alias_for_key(key, placeholder))
-
-        return result
+        return self.get_matcher(min_length).mask(text, placeholder)
 
     def get_masked_secrets(self) -> str:
         """Get content with values masked for frontend display (preserves comments and unrecognized lines)"""
@@ -352,6 +430,7 @@ class SecretsManager:
             self._secrets_cache = None
             self._raw_snapshots = {}
             self._last_raw_text = None
+            self._matchers = {}
 
     @classmethod
     def _invalidate_all_caches(cls):
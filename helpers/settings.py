@@ -1,4 +1,5 @@
 import base64
+import copy
 import hashlib
 import json
 import os
@@ -7,11 +8,11 @@ import subprocess
 from typing import Any, Literal, TypedDict, cast, TypeVar
 
 import models
-from helpers import runtime, whisper, defer, git, subagents
+from helpers import runtime, whisper, defer, git, subagents, cache
 from . import files, dotenv
 from helpers.print_style import PrintStyle
 from helpers.providers import get_providers, FieldOption as ProvidersFO
-from helpers.secrets import get_default_secrets_manager
+from helpers.secrets import DEFAULT_SECRETS_FILE, get_default_secrets_manager
 from helpers import dirty_json
 from helpers.notification import NotificationManager, NotificationType, NotificationPriority
 
@@ -165,6 +166,7 @@ PASSWORD_PLACEHOLDER = "****PSWD****"
 API_KEY_PLACEHOLDER = "************"
 
 SETTINGS_FILE = files.get_abs_path("usr/settings.json")
+SETTINGS_CACHE_AREA = "settings"
 _settings: Settings | None = None
 _runtime_settings_snapshot: Settings | None = None
 
@@ -291,6 +293,10 @@ def convert_in(settings: Settings) -> Settings:
 
 
 def get_settings() -> Settings:
+    # normalized settings with sensitive values are reused until a source file changes
+    if cached := cache.get(SETTINGS_CACHE_AREA, ""):
+        return copy.deepcopy(cached)
+
     global _settings
     if not _settings:
         _settings = _read_settings_file()
@@ -298,15 +304,41 @@ def get_settings() -> Settings:
         _settings = get_default_settings()
     norm = normalize_settings(_settings)
     _load_sensitive_settings(norm)
-    return norm
+    cache.add(SETTINGS_CACHE_AREA, "", norm)
+    return copy.deepcopy(norm)
 
 
 def reload_settings() -> Settings:
     global _settings
     _settings = None
+    cache.clear(SETTINGS_CACHE_AREA)
     return get_settings()
 
 
+def register_watchdogs():
+    from helpers import watchdog
+
+    def on_settings_change(items: list[watchdog.WatchItem]):
+        global _settings
+        PrintStyle.debug("Settings watchdog triggered:", items)
+        _settings = None  # settings.json is read again
+        cache.clear(SETTINGS_CACHE_AREA)
+
+    # settings file, .env with api keys and auth values, secrets
+    watchdog.add_watchdog(
+        "settings_files",
+        roots=[files.get_abs_path("usr")],
+        patterns=[
+            os.path.basename(SETTINGS_FILE),
+            os.path.basename(dotenv.get_dotenv_file_path()),
+            os.path.basename(DEFAULT_SECRETS_FILE),
+        ],
+        # only the files directly in usr/, not namesakes in workdirs or plugins
+        ignore_patterns=["*/*"],
+        handler=on_settings_change,
+    )
+
+
 def set_runtime_settings_snapshot(settings: Settings) -> None:
     global _runtime_settings_snapshot
     _runtime_settings_snapshot = settings.copy()
@@ -317,6 +349,7 @@ def set_settings(settings: Settings, apply: bool = True):
     previous = _settings
     _settings = normalize_settings(settings)
     _write_settings_file(_settings)
+    cache.clear(SETTINGS_CACHE_AREA)
     if apply:
         _apply_settings(previous)
     return reload_settings()
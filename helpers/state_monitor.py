@@ -5,14 +5,16 @@ import os
 import threading
 import time
 from dataclasses import dataclass, field
-from typing import Any, TYPE_CHECKING
+from typing import Any, Mapping, TYPE_CHECKING
 
 from helpers import runtime
 from helpers.print_style import PrintStyle
 from helpers.state_snapshot import (
+    ContextListsMemo,
     StateRequestV1,
     advance_state_request_after_snapshot,
     build_snapshot_from_request,
+    use_context_lists_memo,
 )
 from helpers.ws import ConnectionIdentity, ConnectionNotFoundError, _ws_debug_enabled, ws_debug
 from helpers.ws_manager import STATE_PUSH_EVENT
@@ -36,6 +38,50 @@ class ConnectionProjection:
     dirty_reason: str | None = None
     dirty_wave_id: str | None = None
     created_at: float = field(default_factory=time.time)
+    # Context/task entries this connection already has, by id. None means the next
+    # push carries full lists (after a state_request, i.e. on every resync).
+    sent_contexts: dict[str, dict[str, Any]] | None = None
+    sent_tasks: dict[str, dict[str, Any]] | None = None
+
+
+def _entries_by_id(entries: Any) -> dict[str, dict[str, Any]] | None:
+    if not isinstance(entries, list):
+        return None
+    by_id: dict[str, dict[str, Any]] = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not isinstance(entry.get("id"), str):
+            return None
+        by_id[entry["id"]] = entry
+    return by_id
+
+
+def _snapshot_delta(
+    snapshot: Mapping[str, Any],
+    projection: ConnectionProjection,
+) -> tuple[Mapping[str, Any], dict[str, list[str]] | None]:
+    """Reduce context/task lists to entries the connection does not have yet.
+
+    Returns the snapshot to emit and the delta descriptor (ids removed since the
+    previous push), or None when full lists are sent. Updates what the projection
+    considers sent.
+    """
+    contexts = _entries_by_id(snapshot.get("contexts"))
+    tasks = _entries_by_id(snapshot.get("tasks"))
+    sent_contexts, sent_tasks = projection.sent_contexts, projection.sent_tasks
+    projection.sent_contexts, projection.sent_tasks = contexts, tasks
+    if contexts is None or tasks is None or sent_contexts is None or sent_tasks is None:
+        return snapshot, None
+
+    out = dict(snapshot)
+    out["contexts"] = [
+        entry for ctxid, entry in contexts.items() if sent_contexts.get(ctxid) != entry
+    ]
+    out["tasks"] = [entry for ctxid, entry in tasks.items() if sent_tasks.get(ctxid) != entry]
+    delta = {
+        "contexts_removed": [ctxid for ctxid in sent_contexts if ctxid not in contexts],
+        "tasks_removed": [ctxid for ctxid in sent_tasks if ctxid not in tasks],
+    }
+    return out, delta
 
 
 class StateMonitor:
@@ -51,6 +97,8 @@ class StateMonitor:
         self._emit_handler_id: str | None = None
         self._dispatcher_loop: asyncio.AbstractEventLoop | None = None
         self._dirty_wave_seq: int = 0
+        # Context/task lists are built once per state generation and shared by all sids.
+        self._lists_memo = ContextListsMemo()
 
     def bind_manager(self, manager: "WsManager", *, handler_id: str | None = None) -> None:
         with self._lock:
@@ -129,6 +177,8 @@ class StateMonitor:
             projection.request = request
             projection.seq_base = seq_base
             projection.seq = seq_base
+            projection.sent_contexts = None
+            projection.sent_tasks = None
         ws_debug(
             f"[StateMonitor] update_projection namespace={namespace} sid={sid} context={request.context!r} "
             f"log_from={request.log_from} notifications_from={request.notifications_from} "
@@ -169,6 +219,8 @@ class StateMonitor:
         wave_id: str | None = None,
     ) -> None:
         with self._lock:
+            # any dirty signal may change the shared context/task lists
+            self._lists_memo.generation += 1
             projection = self._projections.get(identity)
             if projection is None:
                 return
@@ -253,7 +305,8 @@ class StateMonitor:
                 dirty_reason = projection.dirty_reason
                 dirty_wave_id = projection.dirty_wave_id
 
-            snapshot = await build_snapshot_from_request(request=request)
+            with use_context_lists_memo(self._lists_memo):
+                snapshot = await build_snapshot_from_request(request=request)
 
             with self._lock:
                 projection = self._projections.get(identity)
@@ -273,11 +326,16 @@ class StateMonitor:
                 # arrived while building/emitting, a follow-up push will be scheduled.
                 projection.pushed_version = max(projection.pushed_version, base_version)
 
-            payload = {
+                # Send only context/task entries this sid does not have yet.
+                snapshot, delta = _snapshot_delta(snapshot, projection)
+
+            payload: dict[str, Any] = {
                 "runtime_epoch": runtime.get_runtime_id(),
                 "seq": seq,
                 "snapshot": snapshot,
             }
+            if delta is not None:
+                payload["delta"] = delta
 
             try:
                 logs_len = (
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
 import types
-from typing import Any, Mapping, TypedDict, Union, get_args, get_origin, get_type_hints
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Mapping, TypedDict, Union, get_args, get_origin, get_type_hints
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import pytz  # type: ignore[import-untyped]
 
 from agent import AgentContext, AgentContextType
 
+from helpers import persist_chat
 from helpers.dotenv import get_dotenv_value
 from helpers.localization import Localization
 from helpers.task_scheduler import TaskScheduler
@@ -39,6 +42,51 @@ class StateRequestV1:
     timezone: str
 
 
+@dataclass
+class ContextListsMemo:
+    """Context and task lists shared by snapshots built for the same state generation.
+
+    The owner bumps ``generation`` whenever state changes; lists built for an older
+    generation are rebuilt on next use. Lists are keyed by timezone as dates are
+    serialized in the requester's timezone.
+    """
+
+    generation: int = 0
+    _lists: dict[str, tuple[int, list[dict[str, Any]], list[dict[str, Any]]]] = field(
+        default_factory=dict
+    )
+
+    def get(self, timezone: str) -> tuple[list[dict[str, Any]], list[dict[str, Any]]] | None:
+        cached = self._lists.get(timezone)
+        if cached is None or cached[0] != self.generation:
+            return None
+        return cached[1], cached[2]
+
+    def put(
+        self,
+        timezone: str,
+        generation: int,
+        ctxs: list[dict[str, Any]],
+        tasks: list[dict[str, Any]],
+    ) -> None:
+        self._lists[timezone] = (generation, ctxs, tasks)
+
+
+_context_lists_memo: ContextVar[ContextListsMemo | None] = ContextVar(
+    "context_lists_memo", default=None
+)
+
+
+@contextmanager
+def use_context_lists_memo(memo: ContextListsMemo) -> Iterator[None]:
+    """Let snapshots built in this scope reuse context and task lists from memo."""
+    token = _context_lists_memo.set(memo)
+    try:
+        yield
+    finally:
+        _context_lists_memo.reset(token)
+
+
 class StateRequestValidationError(ValueError):
     def __init__(
         self,
@@ -211,54 +259,41 @@ def advance_state_request_after_snapshot(
     )
 
 
-async def build_snapshot_from_request(*, request: StateRequestV1) -> SnapshotV1:
-    """Build a poll-shaped snapshot for both /poll and state_push."""
-
-    Localization.get().set_timezone(request.timezone)
-
-    ctxid = request.context if isinstance(request.context, str) else ""
-    ctxid = ctxid.strip()
-
-    from_no = _coerce_non_negative_int(request.log_from, default=0)
-    notifications_from_no = _coerce_non_negative_int(request.notifications_from, default=0)
-
-    active_context = AgentContext.get(ctxid) if ctxid else None
-
-    if active_context:
-        log_output = active_context.log.output(start=from_no)
-        logs = log_output.items
-        log_end = log_output.end
-    else:
-        logs = []
-        log_end = 0
-
-    notification_manager = AgentContext.get_notification_manager()
-    notifications = notification_manager.output(start=notifications_from_no)
-
+def _build_context_lists() -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Serialize all visible contexts, split into chats and task contexts."""
     scheduler = TaskScheduler.get()
 
     ctxs: list[dict[str, Any]] = []
     tasks: list[dict[str, Any]] = []
     processed_contexts: set[str] = set()
 
-    all_ctxs = AgentContext.all()
-    for ctx in all_ctxs:
-        if ctx.id in processed_contexts:
+    # loaded contexts first, then persisted chats that were not opened yet
+    all_ctxs = [(ctx.id, ctx.type, ctx.output) for ctx in AgentContext.all()]
+    all_ctxs += [
+        (
+            entry["id"],
+            AgentContextType(entry.get("type", AgentContextType.USER.value)),
+            lambda entry=entry: persist_chat.output_indexed_chat(entry),
+        )
+        for entry in persist_chat.get_indexed_chats()
+    ]
+    for ctxid, ctx_type, output in all_ctxs:
+        if ctxid in processed_contexts:
             continue
 
-        if ctx.type == AgentContextType.BACKGROUND:
-            processed_contexts.add(ctx.id)
+        if ctx_type == AgentContextType.BACKGROUND:
+            processed_contexts.add(ctxid)
             continue
 
-        context_data = ctx.output()
+        context_data = output()
 
-        context_task = scheduler.get_task_by_uuid(ctx.id)
-        is_task_context = context_task is not None and context_task.context_id == ctx.id
+        context_task = scheduler.get_task_by_uuid(ctxid)
+        is_task_context = context_task is not None and context_task.context_id == ctxid
 
         if not is_task_context:
             ctxs.append(context_data)
         else:
-            task_details = scheduler.serialize_task(ctx.id)
+            task_details = scheduler.serialize_task(ctxid)
             if task_details:
                 context_data.update(
                     {
@@ -284,10 +319,45 @@ async def build_snapshot_from_request(*, request: StateRequestV1) -> SnapshotV1:
 
             tasks.append(context_data)
 
-        processed_contexts.add(ctx.id)
+        processed_contexts.add(ctxid)
 
     ctxs.sort(key=lambda x: x["created_at"], reverse=True)
     tasks.sort(key=lambda x: x["created_at"], reverse=True)
+    return ctxs, tasks
+
+
+async def build_snapshot_from_request(*, request: StateRequestV1) -> SnapshotV1:
+    """Build a poll-shaped snapshot for both /poll and state_push."""
+
+    Localization.get().set_timezone(request.timezone)
+
+    ctxid = request.context if isinstance(request.context, str) else ""
+    ctxid = ctxid.strip()
+
+    from_no = _coerce_non_negative_int(request.log_from, default=0)
+    notifications_from_no = _coerce_non_negative_int(request.notifications_from, default=0)
+
+    active_context = AgentContext.get(ctxid) if ctxid else None
+
+    if active_context:
+        log_output = active_context.log.output(start=from_no)
+        logs = log_output.items
+        log_end = log_output.end
+    else:
+        logs = []
+        log_end = 0
+
+    notification_manager = AgentContext.get_notification_manager()
+    notifications = notification_manager.output(start=notifications_from_no)
+
+    memo = _context_lists_memo.get()
+    lists = memo.get(request.timezone) if memo is not None else None
+    if lists is None:
+        generation = memo.generation if memo is not None else 0
+        lists = _build_context_lists()
+        if memo is not None:
+            memo.put(request.timezone, generation, *lists)
+    ctxs, tasks = lists
 
     snapshot: SnapshotV1 = {
         "deselect_chat": bool(ctxid) and active_context is None,
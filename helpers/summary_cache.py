@@ -0,0 +1,110 @@
+"""Persistent cache of utility model summaries.
+
+Summaries are keyed by a hash of the model, the system prompt and the rendered
+messages, so a branched chat, a retried compaction or a reloaded chat that
+summarizes the same records again reuses the earlier result instead of calling
+the model. Entries are small text files under tmp/summaries; the least recently
+used ones are pruned once there are more than MAX_ENTRIES.
+
+Entries are keyed by content only and not tied to a chat, so summaries of a
+deleted chat stay until they are pruned or clear() removes the whole cache.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Awaitable, Callable
+
+from helpers import files
+
+SUMMARY_CACHE_DIR = "tmp/summaries"
+MAX_ENTRIES = 2000
+PRUNE_TO_RATIO = 0.9  # prune a little below the bound, not on every add
+
+_lock = threading.Lock()
+_index: dict[str, float] | None = None  # key -> last use, loaded on first add
+
+
+def make_key(model: str, system: str, message: str) -> str:
+    payload = json.dumps([model, system, message], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> str | None:
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            summary = f.read()
+    except OSError:
+        return None
+    now = time.time()
+    try:
+        os.utime(path, (now, now))
+    except OSError:
+        pass
+    with _lock:
+        if _index is not None:
+            _index[key] = now
+    return summary
+
+
+async def get_or_create(key: str, produce: Callable[[], Awaitable[str]]) -> str:
+    """Cached summary for key, or the one produce() returns, cached if not empty."""
+    summary = get(key)
+    if summary is None:
+        summary = await produce()
+        if summary:
+            add(key, summary)
+    return summary
+
+
+def add(key: str, summary: str) -> None:
+    path = _entry_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(summary)
+    os.replace(tmp, path)
+    with _lock:
+        index = _load_index()
+        index[key] = time.time()
+        if len(index) > MAX_ENTRIES:
+            _prune(index, int(MAX_ENTRIES * PRUNE_TO_RATIO))
+
+
+def clear() -> None:
+    global _index
+    with _lock:
+        files.delete_dir(SUMMARY_CACHE_DIR)
+        _index = None
+
+
+def _entry_path(key: str) -> str:
+    return files.get_abs_path(SUMMARY_CACHE_DIR, key[:2], key + ".txt")
+
+
+def _load_index() -> dict[str, float]:
+    global _index
+    if _index is None:
+        _index = {}
+        root = files.get_abs_path(SUMMARY_CACHE_DIR)
+        if os.path.isdir(root):
+            for folder in os.scandir(root):
+                if not folder.is_dir():
+                    continue
+                for entry in os.scandir(folder.path):
+                    if entry.name.endswith(".txt"):
+                        _index[entry.name[:-4]] = entry.stat().st_mtime
+    return _index
+
+
+def _prune(index: dict[str, float], keep: int) -> None:
+    oldest = sorted(index, key=index.__getitem__)[: len(index) - keep]
+    for key in oldest:
+        index.pop(key, None)
+        try:
+            os.remove(_entry_path(key))
+        except OSError:
+            pass
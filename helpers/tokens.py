@@ -1,30 +1,127 @@
-from typing import Literal
+from collections import OrderedDict
+from functools import lru_cache
+import threading
+from typing import Iterable, Literal, Sequence
 import tiktoken
 
 APPROX_BUFFER = 1.1
 TRIM_BUFFER = 0.8
+CHARS_PER_TOKEN = 4.0  # rough ratio used by estimate_tokens
+CACHE_SIZE = 4096  # number of token counts remembered by content hash
+CACHE_MIN_CHARS = 32  # shorter texts are cheaper to tokenize than to cache
+BATCH_THREADS = 4
+
+_cache: OrderedDict[tuple[str, int, int], int] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name="cl100k_base") -> tiktoken.Encoding:
+    return tiktoken.get_encoding(encoding_name)
+
+
+def _cache_key(text: str, encoding_name: str) -> tuple[str, int, int]:
+    # keyed by hash so large texts are not kept alive by the cache
+    return (encoding_name, len(text), hash(text))
+
+
+def _cache_get(key: tuple[str, int, int]) -> int | None:
+    with _cache_lock:
+        value = _cache.get(key)
+        if value is not None:
+            _cache.move_to_end(key)
+        return value
+
+
+def _cache_put(key: tuple[str, int, int], value: int):
+    with _cache_lock:
+        _cache[key] = value
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
 
 
 def count_tokens(text: str, encoding_name="cl100k_base") -> int:
     if not text:
         return 0
 
+    cacheable = len(text) >= CACHE_MIN_CHARS
+    if cacheable:
+        key = _cache_key(text, encoding_name)
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+
     # Get the encoding
-    encoding = tiktoken.get_encoding(encoding_name)
+    encoding = get_encoding(encoding_name)
 
     # Encode the text and count the tokens
     tokens = encoding.encode(text, disallowed_special=())
     token_count = len(tokens)
 
+    if cacheable:
+        _cache_put(key, token_count)
     return token_count
 
 
+def count_tokens_many(
+    texts: Sequence[str], encoding_name="cl100k_base"
+) -> list[int]:
+    """Count tokens of several texts, cached ones are reused and the rest are encoded in one batch."""
+    result: list[int] = [0] * len(texts)
+    missing: dict[tuple[str, int, int], list[int]] = {}
+    missing_texts: list[str] = []
+
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        key = _cache_key(text, encoding_name)
+        cached = _cache_get(key)
+        if cached is not None:
+            result[i] = cached
+        elif key in missing:
+            missing[key].append(i)
+        else:
+            missing[key] = [i]
+            missing_texts.append(text)
+
+    if missing_texts:
+        encoding = get_encoding(encoding_name)
+        encoded = encoding.encode_batch(
+            missing_texts, num_threads=BATCH_THREADS, disallowed_special=()
+        )
+        for (key, indices), tokens in zip(missing.items(), encoded):
+            count = len(tokens)
+            if key[1] >= CACHE_MIN_CHARS:
+                _cache_put(key, count)
+            for i in indices:
+                result[i] = count
+
+    return result
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap char-ratio estimate for hot paths where exact counts are not needed, like stream deltas."""
+    if not text:
+        return 0
+    return max(1, int(len(text) / CHARS_PER_TOKEN * APPROX_BUFFER))
+
+
 def approximate_tokens(
     text: str,
 ) -> int:
     return int(count_tokens(text) * APPROX_BUFFER)
 
 
+def approximate_tokens_many(texts: Sequence[str]) -> int:
+    return int(sum(count_tokens_many(texts)) * APPROX_BUFFER)
+
+
 def trim_to_tokens(
     text: str,
     max_tokens: int,
@@ -42,3 +139,35 @@ def trim_to_tokens(
     if direction == "start":
         return text[:approx_chars] + ellipsis
     return ellipsis + text[chars - approx_chars : chars]
+
+
+class TokenLedger:
+    """Token counts of named prompt segments, kept between prompt builds.
+
+    Segments are fingerprinted by their text, so only new or changed segments
+    are tokenized again and the total is assembled by summation.
+    """
+
+    def __init__(self):
+        self._segments: dict[str, tuple[tuple[int, int], int]] = {}
+
+    def count(self, key: str, text: str) -> int:
+        fingerprint = (len(text), hash(text))
+        cached = self._segments.get(key)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+        value = approximate_tokens(text)
+        self._segments[key] = (fingerprint, value)
+        return value
+
+    def set(self, key: str, value: int) -> int:
+        self._segments[key] = ((-1, 0), value)
+        return value
+
+    def retain(self, keys: Iterable[str]):
+        keep = set(keys)
+        for key in [k for k in self._segments if k not in keep]:
+            del self._segments[key]
+
+    def total(self) -> int:
+        return sum(value for _, value in self._segments.values())
@@ -3,7 +3,8 @@ from dataclasses import dataclass
 from typing import Any
 
 from agent import Agent, LoopData
-from helpers.extension import call_extensions_async
+from helpers import cache, extract_tools, subagents
+from helpers.extension import TOOLS_CACHE_AREA, call_extensions_async
 from helpers.print_style import PrintStyle
 from helpers.strings import sanitize_string
 
@@ -72,3 +73,29 @@ class Tool:
         words = [words[0].capitalize()] + [word.lower() for word in words[1:]]
         result = ' '.join(words)
         return result
+
+
+def get_tool_class(agent: Agent, name: str) -> type[Tool] | None:
+    """Resolve the tool class for the agent's profile and project.
+    Tool files are imported once and reused until the tools watchdog clears the cache."""
+    cache_key = cache.determine_cache_key(agent, name)
+    cached = cache.get(TOOLS_CACHE_AREA, cache_key)
+    if cached is not None:
+        return cached or None
+
+    # search for tools in agent's folder hierarchy
+    paths = subagents.get_paths(agent, "tools", name + ".py")
+
+    for path in paths:
+        try:
+            classes = extract_tools.load_classes_from_file(path, Tool)  # type: ignore[arg-type]
+        except Exception:
+            continue
+        tool_class = classes[0] if classes else None
+        cache.add(TOOLS_CACHE_AREA, cache_key, tool_class or False)
+        return tool_class
+
+    # remember missing tools too, failed imports are retried
+    if not paths:
+        cache.add(TOOLS_CACHE_AREA, cache_key, False)
+    return None
@@ -1,9 +1,4 @@
 from typing import Any, List, Sequence
-from langchain_community.vectorstores import FAISS
-
-# faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
-from helpers import faiss_monkey_patch
-import faiss
 
 
 from langchain_core.documents import Document
@@ -17,9 +12,13 @@ from simpleeval import simple_eval
 
 from agent import Agent
 from helpers import guids
+from helpers.faiss_index import IndexedFaiss, create_index, parse_prefilter, INDEX_FLAT
+
 
+class MyFaiss(IndexedFaiss):
+    # document queries filter chunks by document, apply that inside the index
+    prefilter_keys = ("document_uri",)
 
-class MyFaiss(FAISS):
     # override aget_by_ids
     def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
         # return all self.docstore._dict[id] in ids
@@ -36,6 +35,10 @@ class VectorDB:
 
     _cached_embeddings: dict[str, CacheBackedEmbeddings] = {}
 
+    @staticmethod
+    def get_embeddings_id(agent: Agent) -> str:
+        return getattr(agent.get_embedding_model(), "model_name", "default")
+
     @staticmethod
     def _get_embeddings(agent: Agent, cache: bool = True):
         model = agent.get_embedding_model()
@@ -57,15 +60,26 @@ class VectorDB:
             )
         return VectorDB._cached_embeddings[namespace]
 
-    def __init__(self, agent: Agent, cache: bool = True):
+    def __init__(
+        self,
+        agent: Agent,
+        cache: bool = True,
+        db: MyFaiss | None = None,
+        index_type: str = INDEX_FLAT,
+    ):
         self.agent = agent
         self.cache = cache  # store cache preference
         self.embeddings = self._get_embeddings(agent, cache=cache)
-        self.index = faiss.IndexFlatIP(len(self.embeddings.embed_query("example")))
+
+        if db:
+            self.db = db
+            return
 
         self.db = MyFaiss(
             embedding_function=self.embeddings,
-            index=self.index,
+            index=create_index(
+                index_type, len(self.embeddings.embed_query("example"))
+            ),
             docstore=InMemoryDocstore(),
             index_to_docstore_id={},
             distance_strategy=DistanceStrategy.COSINE,
@@ -73,6 +87,37 @@ class VectorDB:
             relevance_score_fn=cosine_normalizer,
         )
 
+    @property
+    def index(self):
+        # the store replaces its index when it is trained or rebuilt
+        return self.db.index
+
+    @staticmethod
+    def load_local(agent: Agent, folder_path: str, cache: bool = True) -> "VectorDB":
+        """Load a database saved by save_local, the agent must use the same embeddings model."""
+        embeddings = VectorDB._get_embeddings(agent, cache=cache)
+        db = MyFaiss.load_local(
+            folder_path=folder_path,
+            embeddings=embeddings,
+            allow_dangerous_deserialization=True,
+            distance_strategy=DistanceStrategy.COSINE,
+            # normalize_L2=True,
+            relevance_score_fn=cosine_normalizer,
+        )  # type: ignore
+        return VectorDB(agent, cache=cache, db=db)
+
+    @staticmethod
+    async def embed_documents(agent: Agent, texts: list[str]):
+        """Embed texts into the embeddings cache, inserting them later costs no model calls."""
+        return await VectorDB._get_embeddings(agent, cache=True).aembed_documents(texts)
+
+    def save_local(self, folder_path: str):
+        self.db.save_local(folder_path=folder_path)
+
+    def merge(self, other: "VectorDB"):
+        """Add all documents and vectors of the other database to this one."""
+        self.db.merge_from(other.db)
+
     async def search_by_similarity_threshold(
         self, query: str, limit: int, threshold: float, filter: str = ""
     ):
@@ -84,6 +129,7 @@ class VectorDB:
             k=limit,
             score_threshold=threshold,
             filter=comparator,
+            prefilter=parse_prefilter(filter) if filter else None,
         )
 
     async def search_by_metadata(self, filter: str, limit: int = 0) -> list[Document]:
@@ -1,7 +1,12 @@
-from dataclasses import dataclass, field
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
 from enum import Enum
+import hashlib
+import json
 import logging
 import os
+import threading
+import time
 from typing import (
     Any,
     Awaitable,
@@ -24,7 +29,7 @@ from helpers import settings, dirty_json
 from helpers.dotenv import load_dotenv
 from helpers.providers import ModelType as ProviderModelType, get_provider_config
 from helpers.rate_limiter import RateLimiter
-from helpers.tokens import approximate_tokens
+from helpers.tokens import approximate_tokens, approximate_tokens_many, estimate_tokens
 from helpers import dirty_json
 from helpers.extension import extensible  # extensible: allows plugins to intercept get_api_key()
 
@@ -92,6 +97,53 @@ class ChatChunk(TypedDict):
     response_delta: str
     reasoning_delta: str
 
+STREAM_FLUSH_MS = 50  # default coalescing window for stream callbacks
+STREAM_FLUSH_CHARS = 256  # flush earlier when this many characters are pending
+
+
+class StreamCoalescer:
+    """Buffers stream deltas and calls the callback once per window instead of per delta.
+    The first delta and deltas that may close a JSON object ("}") are flushed immediately,
+    so tool request detection is not delayed."""
+
+    def __init__(
+        self,
+        callback: Callable[[str, str], Awaitable[str | None]],
+        flush_ms: float = STREAM_FLUSH_MS,
+        flush_chars: int = STREAM_FLUSH_CHARS,
+        flush_on: str | None = "}",
+    ):
+        self.callback = callback
+        self.flush_seconds = max(flush_ms, 0) / 1000
+        self.flush_chars = max(flush_chars, 0)
+        self.flush_on = flush_on
+        self.pending = ""
+        self.full = ""
+        self.flushed = False
+        self.last_flush = 0.0
+
+    async def add(self, chunk: str, full: str) -> str | None:
+        self.pending += chunk
+        self.full = full
+        if (
+            not self.flushed
+            or not self.flush_seconds
+            or (self.flush_on and self.flush_on in chunk)
+            or (self.flush_chars and len(self.pending) >= self.flush_chars)
+            or time.monotonic() - self.last_flush >= self.flush_seconds
+        ):
+            return await self.flush()
+        return None
+
+    async def flush(self) -> str | None:
+        if not self.pending:
+            return None
+        chunk, self.pending = self.pending, ""
+        self.flushed = True
+        self.last_flush = time.monotonic()
+        return await self.callback(chunk, self.full)
+
+
 class ChatGenerationResult:
     """Chat generation result object"""
     def __init__(self, chunk: ChatChunk|None = None):
@@ -254,7 +306,7 @@ def _is_transient_litellm_error(exc: Exception) -> bool:
 
 async def apply_rate_limiter(
     model_config: ModelConfig | None,
-    input_text: str,
+    input_text: str | list[str],
     rate_limiter_callback: (
         Callable[[str, str, int, int], Awaitable[bool]] | None
     ) = None,
@@ -268,7 +320,11 @@ async def apply_rate_limiter(
         model_config.limit_input,
         model_config.limit_output,
     )
-    limiter.add(input=approximate_tokens(input_text))
+    # lists are counted per item so unchanged items hit the token cache
+    if isinstance(input_text, list):
+        limiter.add(input=approximate_tokens_many(input_text))
+    else:
+        limiter.add(input=approximate_tokens(input_text))
     limiter.add(requests=1)
     await limiter.wait(rate_limiter_callback)
     return limiter
@@ -276,7 +332,7 @@ async def apply_rate_limiter(
 
 def apply_rate_limiter_sync(
     model_config: ModelConfig | None,
-    input_text: str,
+    input_text: str | list[str],
     rate_limiter_callback: (
         Callable[[str, str, int, int], Awaitable[bool]] | None
     ) = None,
@@ -393,7 +449,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
         msgs = self._convert_messages(messages)
 
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, str(msgs))
+        apply_rate_limiter_sync(self.a0_model_conf, [str(m) for m in msgs])
 
         # Call the model
         resp = completion(
@@ -417,7 +473,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
         msgs = self._convert_messages(messages)
 
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, str(msgs))
+        apply_rate_limiter_sync(self.a0_model_conf, [str(m) for m in msgs])
 
         result = ChatGenerationResult()
 
@@ -448,7 +504,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
         msgs = self._convert_messages(messages)
 
         # Apply rate limiting if configured
-        await apply_rate_limiter(self.a0_model_conf, str(msgs))
+        await apply_rate_limiter(self.a0_model_conf, [str(m) for m in msgs])
 
         result = ChatGenerationResult()
 
@@ -500,13 +556,15 @@ class LiteLLMChatWrapper(SimpleChatModel):
 
         # Apply rate limiting if configured
         limiter = await apply_rate_limiter(
-            self.a0_model_conf, str(msgs_conv), rate_limiter_callback
+            self.a0_model_conf, [str(m) for m in msgs_conv], rate_limiter_callback
         )
 
         # Prepare call kwargs and retry config (strip A0-only params before calling LiteLLM)
         call_kwargs: dict[str, Any] = {**self.kwargs, **kwargs}
         max_retries: int = int(call_kwargs.pop("a0_retry_attempts", 2))
         retry_delay_s: float = float(call_kwargs.pop("a0_retry_delay_seconds", 1.5))
+        flush_ms: float = float(call_kwargs.pop("a0_stream_flush_ms", STREAM_FLUSH_MS))
+        flush_chars: int = int(call_kwargs.pop("a0_stream_flush_chars", STREAM_FLUSH_CHARS))
         stream = reasoning_callback is not None or response_callback is not None or tokens_callback is not None
 
         # results
@@ -525,6 +583,18 @@ class LiteLLMChatWrapper(SimpleChatModel):
                 )
 
                 if stream:
+                    # coalesce deltas so callbacks run per window, not per token
+                    reasoning_stream = (
+                        StreamCoalescer(reasoning_callback, flush_ms, flush_chars, flush_on=None)  # type: ignore[arg-type]
+                        if reasoning_callback
+                        else None
+                    )
+                    response_stream = (
+                        StreamCoalescer(response_callback, flush_ms, flush_chars)
+                        if response_callback
+                        else None
+                    )
+
                     # iterate over chunks
                     stop_response: str | None = None
                     try:
@@ -536,33 +606,45 @@ class LiteLLMChatWrapper(SimpleChatModel):
 
                             # collect reasoning delta and call callbacks
                             if output["reasoning_delta"]:
-                                if reasoning_callback:
-                                    await reasoning_callback(output["reasoning_delta"], result.reasoning)
+                                if reasoning_stream:
+                                    await reasoning_stream.add(output["reasoning_delta"], result.reasoning)
                                 if tokens_callback:
                                     await tokens_callback(
                                         output["reasoning_delta"],
-                                        approximate_tokens(output["reasoning_delta"]),
+                                        estimate_tokens(output["reasoning_delta"]),
                                     )
                                 # Add output tokens to rate limiter if configured
                                 if limiter:
-                                    limiter.add(output=approximate_tokens(output["reasoning_delta"]))
+                                    limiter.add(output=estimate_tokens(output["reasoning_delta"]))
                             # collect response delta and call callbacks
                             if output["response_delta"]:
-                                if response_callback:
-                                    stop_response = await response_callback(
+                                # reasoning window goes out before the response starts
+                                if reasoning_stream:
+                                    await reasoning_stream.flush()
+                                if response_stream:
+                                    stop_response = await response_stream.add(
                                         output["response_delta"], result.response
                                     )
                                 if tokens_callback:
                                     await tokens_callback(
                                         output["response_delta"],
-                                        approximate_tokens(output["response_delta"]),
+                                        estimate_tokens(output["response_delta"]),
                                     )
                                 # Add output tokens to rate limiter if configured
                                 if limiter:
-                                    limiter.add(output=approximate_tokens(output["response_delta"]))
+                                    limiter.add(output=estimate_tokens(output["response_delta"]))
                             if stop_response is not None:
                                 result.response = stop_response
                                 break
+
+                        # deliver whatever is left in the last window
+                        if stop_response is None:
+                            if reasoning_stream:
+                                await reasoning_stream.flush()
+                            if response_stream:
+                                stop_response = await response_stream.flush()
+                                if stop_response is not None:
+                                    result.response = stop_response
                     finally:
                         if stop_response is not None and hasattr(_completion, "aclose"):
                             await _completion.aclose()  # type: ignore[attr-defined]
@@ -608,7 +690,7 @@ class LiteLLMEmbeddingWrapper(Embeddings):
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, " ".join(texts))
+        apply_rate_limiter_sync(self.a0_model_conf, list(texts))
 
         resp = embedding(model=self.model_name, input=texts, **self.kwargs)
         return [
@@ -659,7 +741,7 @@ class LocalSentenceTransformerWrapper(Embeddings):
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, " ".join(texts))
+        apply_rate_limiter_sync(self.a0_model_conf, list(texts))
 
         embeddings = self.model.encode(texts, convert_to_tensor=False)  # type: ignore
         return embeddings.tolist() if hasattr(embeddings, "tolist") else embeddings  # type: ignore
@@ -818,13 +900,66 @@ def _merge_provider_defaults(
     return provider_name, kwargs
 
 
+# Model instances are shared process-wide, keyed by the resolved configuration.
+# Wrappers keep no per-call state; local embedding models load their weights once.
+MODEL_POOL_SIZE = 16  # distinct configurations kept, the least recently used is dropped
+
+_model_pool: "OrderedDict[str, Any]" = OrderedDict()
+_model_pool_locks: dict[str, threading.Lock] = {}
+_model_pool_lock = threading.Lock()
+
+
+def clear_model_pool():
+    """Drop all pooled model instances, called when the model configuration changes."""
+    with _model_pool_lock:
+        _model_pool.clear()
+        _model_pool_locks.clear()
+
+
+def _model_pool_key(
+    kind: str, provider: str, name: str, model_config: Optional[ModelConfig], kwargs: dict
+) -> str:
+    payload = json.dumps(
+        [kind, provider, name, asdict(model_config) if model_config else None, kwargs],
+        sort_keys=True,
+        default=repr,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _get_pooled_model(key: str, build: Callable[[], Any]) -> Any:
+    with _model_pool_lock:
+        model = _model_pool.get(key)
+        if model is not None:
+            _model_pool.move_to_end(key)
+            return model
+        key_lock = _model_pool_locks.setdefault(key, threading.Lock())
+
+    # built outside the pool lock, loading a local model takes seconds
+    with key_lock:
+        with _model_pool_lock:
+            model = _model_pool.get(key)
+        if model is None:
+            model = build()
+            with _model_pool_lock:
+                _model_pool[key] = model
+                while len(_model_pool) > MODEL_POOL_SIZE:
+                    old_key, _ = _model_pool.popitem(last=False)
+                    _model_pool_locks.pop(old_key, None)
+        return model
+
+
 def get_chat_model(
     provider: str, name: str, model_config: Optional[ModelConfig] = None, **kwargs: Any
 ) -> LiteLLMChatWrapper:
     orig = provider.lower()
     provider_name, kwargs = _merge_provider_defaults("chat", orig, kwargs)
-    return _get_litellm_chat(
-        LiteLLMChatWrapper, name, provider_name, model_config, **kwargs
+    key = _model_pool_key("chat", provider_name, name, model_config, kwargs)
+    return _get_pooled_model(
+        key,
+        lambda: _get_litellm_chat(
+            LiteLLMChatWrapper, name, provider_name, model_config, **kwargs
+        ),
     )
 
 def get_embedding_model(
@@ -832,4 +967,8 @@ def get_embedding_model(
 ) -> LiteLLMEmbeddingWrapper | LocalSentenceTransformerWrapper:
     orig = provider.lower()
     provider_name, kwargs = _merge_provider_defaults("embedding", orig, kwargs)
-    return _get_litellm_embedding(name, provider_name, model_config, **kwargs)
+    key = _model_pool_key("embedding", provider_name, name, model_config, kwargs)
+    return _get_pooled_model(
+        key,
+        lambda: _get_litellm_embedding(name, provider_name, model_config, **kwargs),
+    )
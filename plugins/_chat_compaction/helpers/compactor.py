@@ -4,7 +4,7 @@ from datetime import datetime
 
 import models as models_module
 from agent import Agent
-from helpers import tokens
+from helpers import summary_cache, tokens
 from helpers.history import History, output_text
 from helpers.persist_chat import (
     export_json_chat,
@@ -214,11 +214,19 @@ async def _compact_large_history(
         system_prompt = agent.read_prompt("compact.sys.md")
         user_prompt = agent.read_prompt("compact.msg.md", conversation=chunk)
 
-        chunk_summary, _ = await model.unified_call(
-            system_message=system_prompt,
-            user_message=user_prompt,
+        # parts already summarized by a failed attempt are reused on retry
+        cache_key = summary_cache.make_key(
+            getattr(model, "model_name", ""), system_prompt, user_prompt
         )
-        summaries.append(chunk_summary)
+
+        async def summarize_chunk():
+            chunk_summary, _ = await model.unified_call(
+                system_message=system_prompt,
+                user_message=user_prompt,
+            )
+            return chunk_summary
+
+        summaries.append(await summary_cache.get_or_create(cache_key, summarize_chunk))
 
     combined = "\n\n---\n\n".join(summaries)
     log_item.update(content="Creating final summary from parts...")
@@ -6,13 +6,18 @@ import sys
 from typing import Optional, Tuple
 from helpers import runtime
 from plugins._code_execution.helpers import tty_session
-from plugins._code_execution.helpers.shell_ssh import clean_string
+from plugins._code_execution.helpers.terminal_output import TerminalOutput, clean_string
 
 class LocalInteractiveSession:
     def __init__(self, cwd: str|None = None):
         self.session: tty_session.TTYSession|None = None
-        self.full_output = ''
+        self.output = TerminalOutput()
         self.cwd = cwd
+        self._ready = ""  # output received by wait_output, not read yet
+
+    @property
+    def full_output(self) -> str:
+        return self.output.text()
 
     async def connect(self):
         self.session = tty_session.TTYSession(runtime.get_terminal_executable(), cwd=self.cwd)
@@ -27,24 +32,39 @@ class LocalInteractiveSession:
     async def send_command(self, command: str):
         if not self.session:
             raise Exception("Shell not connected")
-        self.full_output = ""
+        self.output.reset()
         await self.session.sendline(command)
- 
+
+    async def wait_output(self, timeout: float):
+        """Return as soon as the terminal produced output, or after timeout."""
+        if not self.session:
+            raise Exception("Shell not connected")
+        if self._ready:
+            return
+        chunk = await self.session.read(timeout=timeout)
+        if chunk:
+            self._ready += chunk
+
     async def read_output(self, timeout: float = 0, reset_full_output: bool = False) -> Tuple[str, Optional[str]]:
+        partial_output = await self.read_partial_output(timeout, reset_full_output)
+        if not partial_output:
+            return self.output.text(), None
+        return self.output.text(), partial_output
+
+    async def read_partial_output(self, timeout: float = 0, reset_full_output: bool = False) -> str:
+        """Read output produced so far into self.output, returns it cleaned."""
         if not self.session:
             raise Exception("Shell not connected")
 
         if reset_full_output:
-            self.full_output = ""
+            self.output.reset()
 
         # get output from terminal
-        partial_output = await self.session.read_full_until_idle(idle_timeout=0.01, total_timeout=timeout)
-        self.full_output += partial_output
+        partial_output = self._ready + self.session.read_nowait()
+        self._ready = ""
+        if not partial_output and timeout > 0:
+            partial_output = await self.session.read_full_until_idle(idle_timeout=0.01, total_timeout=timeout)
+        self.output.feed(partial_output)
 
         # clean output
-        partial_output = clean_string(partial_output)
-        clean_full_output = clean_string(self.full_output)
-
-        if not partial_output:
-            return clean_full_output, None
-        return clean_full_output, partial_output
\ No newline at end of file
+        return clean_string(partial_output)
@@ -1,10 +1,10 @@
 import asyncio
 import paramiko
 import time
-import re
 from typing import Tuple
 from helpers.log import Log
 from helpers.print_style import PrintStyle
+from plugins._code_execution.helpers.terminal_output import TerminalOutput, clean_string
 # from helpers.strings import calculate_valid_match_lengths
 
 
@@ -24,7 +24,7 @@ class SSHInteractiveSession:
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         self.shell = None
-        self.full_output = b""
+        self.output = TerminalOutput()
         self.last_command = b""
         self.trimmed_command_length = 0  # Initialize trimmed_command_length
         self.cwd = cwd
@@ -96,7 +96,7 @@ class SSHInteractiveSession:
     async def send_command(self, command: str):
         if not self.shell:
             raise Exception("Shell not connected")
-        self.full_output = b""
+        self.output.reset()
         # if len(command) > 10: # if command is long, add end_comment to split output
         #     command = (command + " \\\n" +SSHInteractiveSession.end_comment + "\n")
         # else:
@@ -105,14 +105,33 @@ class SSHInteractiveSession:
         self.trimmed_command_length = 0
         self.shell.send(self.last_command)
         
+    @property
+    def full_output(self) -> str:
+        return self.output.text()
+
+    async def wait_output(self, timeout: float):
+        """Return once output is ready to be read, or after timeout."""
+        if not self.shell:
+            raise Exception("Shell not connected")
+        start_time = time.time()
+        while not self.shell.recv_ready() and time.time() - start_time < timeout:
+            await asyncio.sleep(0.05)
+
     async def read_output(
         self, timeout: float = 0, reset_full_output: bool = False
     ) -> Tuple[str, str]:
+        partial_output = await self.read_partial_output(timeout, reset_full_output)
+        return self.output.text(), partial_output
+
+    async def read_partial_output(
+        self, timeout: float = 0, reset_full_output: bool = False
+    ) -> str:
+        """Read output ready on the channel into self.output, returns it cleaned."""
         if not self.shell:
             raise Exception("Shell not connected")
 
         if reset_full_output:
-            self.full_output = b""
+            self.output.reset()
         partial_output = b""
         leftover = b""
         start_time = time.time()
@@ -152,17 +171,13 @@ class SSHInteractiveSession:
             #         self.trimmed_command_length += trim_com
 
             partial_output += data
-            self.full_output += data
             await asyncio.sleep(0.1)  # Prevent busy waiting
 
-        # Decode once at the end
+        # Decode once at the end, receive_bytes keeps multi-byte characters whole
         decoded_partial_output = partial_output.decode("utf-8", errors="replace")
-        decoded_full_output = self.full_output.decode("utf-8", errors="replace")
-
-        decoded_partial_output = clean_string(decoded_partial_output)
-        decoded_full_output = clean_string(decoded_full_output)
+        self.output.feed(decoded_partial_output)
 
-        return decoded_full_output, decoded_partial_output
+        return clean_string(decoded_partial_output)
 
     def receive_bytes(self, num_bytes=1024):
         if not self.shell:
@@ -211,35 +226,3 @@ class SSHInteractiveSession:
                         break
 
         return data
-
-def clean_string(input_string):
-    # Remove ANSI escape codes
-    ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-    cleaned = ansi_escape.sub("", input_string)
-
-    # remove null bytes
-    cleaned = cleaned.replace("\x00", "")
-
-    # remove ipython \r\r\n> sequences from the start
-    cleaned = re.sub(r'^[ \r]*(?:\r*\n>[ \r]*)*', '', cleaned)
-    # also remove any amount of '> ' sequences from the start
-    cleaned = re.sub(r'^(>\s*)+', '', cleaned)
-
-    # Replace '\r\n' with '\n'
-    cleaned = cleaned.replace("\r\n", "\n")
-
-    # remove leading \r and spaces
-    cleaned = cleaned.lstrip("\r ")
-
-    # Split the string by newline characters to process each segment separately
-    lines = cleaned.split("\n")
-
-    for i in range(len(lines)):
-        # Handle carriage returns '\r' by splitting and taking the last part
-        parts = [part for part in lines[i].split("\r") if part.strip()]
-        if parts:
-            lines[i] = parts[
-                -1
-            ].rstrip()  # Overwrite with the last part after the last '\r'
-
-    return "\n".join(lines)
@@ -0,0 +1,167 @@
+import re
+from collections import deque
+
+ANSI_ESCAPE = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+HEX_ESCAPE = re.compile(r"(?<!\\)\\x[0-9A-Fa-f]{2}")
+
+MAX_OUTPUT_CHARS = 1_000_000  # head and tail halves of this are retained
+MAX_OPEN_LINE_CHARS = 64 * 1024  # open line (progress bars redrawn with \r) is collapsed beyond this
+
+
+def clean_string(input_string):
+    # Remove ANSI escape codes
+    cleaned = ANSI_ESCAPE.sub("", input_string)
+
+    # remove null bytes
+    cleaned = cleaned.replace("\x00", "")
+
+    # remove ipython \r\r\n> sequences from the start
+    cleaned = re.sub(r'^[ \r]*(?:\r*\n>[ \r]*)*', '', cleaned)
+    # also remove any amount of '> ' sequences from the start
+    cleaned = re.sub(r'^(>\s*)+', '', cleaned)
+
+    # Replace '\r\n' with '\n'
+    cleaned = cleaned.replace("\r\n", "\n")
+
+    # remove leading \r and spaces
+    cleaned = cleaned.lstrip("\r ")
+
+    # Split the string by newline characters to process each segment separately
+    lines = cleaned.split("\n")
+
+    for i in range(len(lines)):
+        lines[i] = _last_carriage_part(lines[i])
+
+    return "\n".join(lines)
+
+
+def clean_line(line: str) -> str:
+    """clean_string for a single line, without the start of output handling."""
+    line = ANSI_ESCAPE.sub("", line).replace("\x00", "")
+    if line.endswith("\r"):
+        line = line[:-1]
+    return HEX_ESCAPE.sub("", _last_carriage_part(line))
+
+
+def _last_carriage_part(line: str) -> str:
+    # Handle carriage returns '\r' by splitting and taking the last part
+    parts = [part for part in line.split("\r") if part.strip()]
+    if parts:
+        return parts[-1].rstrip()  # Overwrite with the last part after the last '\r'
+    return line
+
+
+class TerminalOutput:
+    """Cleaned output of a terminal command, fed incrementally.
+
+    Every line is cleaned once when it completes, only the open line is cleaned
+    on demand. The first and the last half of max_chars are retained; lines
+    dropped in between are counted in `dropped`, so a command printing hundreds
+    of MB costs memory and CPU proportional to what is kept.
+    """
+
+    def __init__(self, max_chars: int = MAX_OUTPUT_CHARS):
+        self.max_chars = max_chars
+        self.reset()
+
+    def reset(self):
+        self.head: list[str] = []
+        self.head_chars = 0
+        self.tail: deque[str] = deque()
+        self.tail_chars = 0
+        self.dropped = 0
+        self.version = 0
+        self._open = ""  # raw text of the line still being written
+        self._lead = ""  # raw output until the first non-blank line
+        self._started = False
+        self._text: tuple[int, str, str] | None = None
+
+    def feed(self, text: str):
+        if not text:
+            return
+        self.version += 1
+        lines = text.split("\n")
+        if len(lines) > 1:
+            self._complete(self._open + lines[0])
+            for line in lines[1:-1]:
+                self._complete(line)
+            self._open = lines[-1]
+        else:
+            self._open += text
+        if len(self._open) > MAX_OPEN_LINE_CHARS:
+            self._open = self._collapse(self._open)
+
+    def text(self, placeholder: str = "") -> str:
+        """Cleaned output, placeholder stands in for the dropped middle part."""
+        if self._text and self._text[0] == self.version and self._text[1] == placeholder:
+            return self._text[2]
+        if not self._started:
+            text = clean_string(self._lead + self._open)
+        else:
+            lines = list(self.head)
+            if self.dropped and placeholder:
+                lines.append(placeholder)
+            lines.extend(self.tail)
+            lines.append(clean_line(self._open))
+            text = "\n".join(lines)
+        self._text = (self.version, placeholder, text)
+        return text
+
+    def last_lines(self, count: int) -> list[str]:
+        """Last lines of the cleaned output like text().splitlines()[-count:]."""
+        if not self._started:
+            return self.text().splitlines()[-count:]
+        lines: list[str] = []
+        if self._open:
+            lines.append(clean_line(self._open))
+        for part in (self.tail, self.head):
+            for line in reversed(part):
+                if len(lines) >= count:
+                    break
+                lines.append(line)
+        lines = lines[:count]
+        lines.reverse()
+        return lines
+
+    def _complete(self, raw: str):
+        if not self._started:
+            # prompt remnants at the start of output span lines, clean them as a whole
+            self._lead += raw + "\n"
+            cleaned = clean_string(self._lead)
+            if not cleaned.strip():
+                return
+            self._started = True
+            self._lead = ""
+            for line in cleaned.split("\n")[:-1]:
+                self._append(HEX_ESCAPE.sub("", line))
+            return
+        self._append(clean_line(raw))
+
+    def _append(self, line: str):
+        half = self.max_chars // 2
+        if len(line) > half // 2:
+            keep = half // 4
+            self.dropped += len(line) - 2 * keep
+            line = line[:keep] + line[-keep:]
+        size = len(line) + 1
+        if not self.tail and self.head_chars + size <= half:
+            self.head.append(line)
+            self.head_chars += size
+            return
+        self.tail.append(line)
+        self.tail_chars += size
+        while self.tail_chars > half and len(self.tail) > 1:
+            old = self.tail.popleft()
+            self.tail_chars -= len(old) + 1
+            self.dropped += len(old) + 1
+
+    def _collapse(self, line: str) -> str:
+        # only the last non-blank \r-separated part of a line survives cleaning
+        *done, current = line.split("\r")
+        last = next((part for part in reversed(done) if part.strip()), "")
+        line = f"{last}\r{current}" if done else current
+        if len(line) > MAX_OPEN_LINE_CHARS:
+            keep = MAX_OPEN_LINE_CHARS // 4
+            self.dropped += len(line) - 2 * keep
+            line = line[:keep] + line[-keep:]
+        return line
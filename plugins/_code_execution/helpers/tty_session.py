@@ -1,4 +1,4 @@
-import asyncio, os, sys, platform, errno
+import asyncio, codecs, os, sys, platform, errno
 
 _IS_WIN = platform.system() == "Windows"
 if _IS_WIN:
@@ -110,6 +110,15 @@ class TTYSession:
     # backward-compat alias:
     readline = read
 
+    def read_nowait(self) -> str:
+        # Return all decoded text already received, without waiting
+        chunks = []
+        while True:
+            try:
+                chunks.append(self._buf.get_nowait())
+            except asyncio.QueueEmpty:
+                return "".join(chunks)
+
     async def read_full_until_idle(self, idle_timeout, total_timeout):
         # Collect child output using iter_until_idle to avoid duplicate logic
         return "".join(
@@ -139,11 +148,18 @@ class TTYSession:
         if self._proc is None:
             raise RuntimeError("TTYSpawn is not started")
         reader = self._proc.stdout
+        # multi-byte characters may be split between reads
+        decoder = codecs.getincrementaldecoder(self.encoding)("replace")
         while True:
-            chunk = await reader.read(4096)  # grab whatever is ready # type: ignore
+            chunk = await reader.read(1 << 16)  # grab whatever is ready # type: ignore
             if not chunk:
                 break
-            self._buf.put_nowait(chunk.decode(self.encoding, "replace"))
+            text = decoder.decode(chunk)
+            if text:
+                self._buf.put_nowait(text)
+        text = decoder.decode(b"", final=True)
+        if text:
+            self._buf.put_nowait(text)
 
 
 # ──────────────────────────── POSIX IMPLEMENTATION ────────────────────
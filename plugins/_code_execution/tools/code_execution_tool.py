@@ -1,4 +1,3 @@
-import asyncio
 from dataclasses import dataclass
 import re
 import shlex
@@ -8,12 +7,13 @@ from helpers.tool import Tool, Response
 from helpers import files, rfc_exchange, projects, runtime, secrets, settings
 from helpers.print_style import PrintStyle
 from helpers.strings import truncate_text as truncate_text_string
-from helpers.messages import truncate_text as truncate_text_agent
 from helpers import plugins
 
 from plugins._code_execution.helpers.shell_local import LocalInteractiveSession
 from plugins._code_execution.helpers.shell_ssh import SSHInteractiveSession
 
+OUTPUT_UPDATE_INTERVAL = 0.5  # seconds between log updates while output streams
+
 
 @dataclass
 class ShellWrap:
@@ -232,21 +232,23 @@ class CodeExecution(Tool):
 
         prompt_patterns = cfg["prompt_patterns"]
         dialog_patterns = cfg["dialog_patterns"]
+        shell = self.state.shells[session].session
 
         start_time = time.time()
         last_output_time = start_time
-        full_output = ""
-        truncated_output = ""
+        last_update_time = 0.0
         got_output = False
+        update_pending = False
 
         # if prefix, log right away
         if prefix:
             self.log.update(content=prefix)
 
         while True:
-            await asyncio.sleep(sleep_time)
-            full_output, partial_output = await self.state.shells[session].session.read_output(
-                timeout=1, reset_full_output=reset_full_output
+            # wakes up as soon as there is output, sleep_time at most
+            await shell.wait_output(sleep_time)
+            partial_output = await shell.read_partial_output(
+                reset_full_output=reset_full_output
             )
             reset_full_output = False  # only reset once
 
@@ -255,17 +257,12 @@ class CodeExecution(Tool):
             now = time.time()
             if partial_output:
                 PrintStyle(font_color="#85C1E9").stream(partial_output)
-                truncated_output = self.fix_full_output(full_output)
-                self.set_progress(truncated_output)
-                heading = self.get_heading_from_output(truncated_output, 0)
-                self.log.update(content=prefix + truncated_output, heading=heading)
                 last_output_time = now
                 got_output = True
+                update_pending = True
 
                 # Check for shell prompt at the end of output
-                last_lines = (
-                    truncated_output.splitlines()[-3:] if truncated_output else []
-                )
+                last_lines = shell.output.last_lines(3)
                 last_lines.reverse()
                 for idx, line in enumerate(last_lines):
                     line = line.strip()
@@ -275,6 +272,7 @@ class CodeExecution(Tool):
                             PrintStyle.info(
                                 "Detected shell prompt, returning output early."
                             )
+                            truncated_output = await self.update_output_log(shell, prefix)
                             last_lines.reverse()
                             heading = self.get_heading_from_output(
                                 "\n".join(last_lines), idx + 1, True
@@ -283,8 +281,16 @@ class CodeExecution(Tool):
                             self.mark_session_idle(session)
                             return truncated_output
 
+            # log updates are rate limited, output may arrive many times a second
+            if update_pending and now - last_update_time >= OUTPUT_UPDATE_INTERVAL:
+                await self.update_output_log(shell, prefix)
+                last_update_time = now
+                update_pending = False
+
             # Check for max execution time
             if now - start_time > max_exec_timeout:
+                # the whole buffer is only joined when it is returned
+                truncated_output = self.get_output_text(shell) if got_output else ""
                 sysinfo = self.agent.read_prompt(
                     "fw.code.max_time.md", timeout=max_exec_timeout
                 )
@@ -309,6 +315,7 @@ class CodeExecution(Tool):
             else:
                 # Waiting for more output after first output
                 if now - last_output_time > between_output_timeout:
+                    truncated_output = self.get_output_text(shell)
                     sysinfo = self.agent.read_prompt(
                         "fw.code.pause_time.md", timeout=between_output_timeout
                     )
@@ -322,15 +329,14 @@ class CodeExecution(Tool):
 
                 # potential dialog detection
                 if now - last_output_time > dialog_timeout:
-                    last_lines = (
-                        truncated_output.splitlines()[-2:] if truncated_output else []
-                    )
+                    last_lines = shell.output.last_lines(2)
                     for line in last_lines:
                         for pat in dialog_patterns:
                             if pat.search(line.strip()):
                                 PrintStyle.info(
                                     "Detected dialog prompt, returning output early."
                                 )
+                                truncated_output = self.get_output_text(shell)
 
                                 sysinfo = self.agent.read_prompt(
                                     "fw.code.pause_dialog.md", timeout=dialog_timeout
@@ -349,6 +355,24 @@ class CodeExecution(Tool):
                                 )
                                 return response
 
+    def get_output_text(self, shell: LocalInteractiveSession | SSHInteractiveSession) -> str:
+        output = shell.output
+        placeholder = (
+            self.agent.read_prompt("fw.msg_truncated.md", length=output.dropped)
+            if output.dropped
+            else ""
+        )
+        return output.text(placeholder)
+
+    async def update_output_log(
+        self, shell: LocalInteractiveSession | SSHInteractiveSession, prefix: str = ""
+    ) -> str:
+        truncated_output = self.get_output_text(shell)
+        await self.set_progress(truncated_output)
+        heading = self.get_heading_from_output("\n".join(shell.output.last_lines(10)), 0)
+        self.log.update(content=prefix + truncated_output, heading=heading)
+        return truncated_output
+
     async def handle_running_session(
         self,
         cfg: dict,
@@ -364,16 +388,13 @@ class CodeExecution(Tool):
         prompt_patterns = cfg["prompt_patterns"]
         dialog_patterns = cfg["dialog_patterns"]
 
-        full_output, _ = await self.state.shells[session].session.read_output(
-            timeout=1, reset_full_output=reset_full_output
-        )
-        truncated_output = self.fix_full_output(full_output)
-        self.set_progress(truncated_output)
-        heading = self.get_heading_from_output(truncated_output, 0)
+        shell = self.state.shells[session].session
+        await shell.read_partial_output(timeout=1, reset_full_output=reset_full_output)
+        truncated_output = self.get_output_text(shell)
+        await self.set_progress(truncated_output)
+        heading = self.get_heading_from_output("\n".join(shell.output.last_lines(10)), 0)
 
-        last_lines = (
-            truncated_output.splitlines()[-3:] if truncated_output else []
-        )
+        last_lines = shell.output.last_lines(3)
         last_lines.reverse()
         for line in last_lines:
             for pat in prompt_patterns:
@@ -441,11 +462,6 @@ class CodeExecution(Tool):
 
         return self.get_heading() + done_icon
 
-    def fix_full_output(self, output: str):
-        output = re.sub(r"(?<!\\)\\x[0-9A-Fa-f]{2}", "", output)
-        output = truncate_text_agent(agent=self.agent, output=output, threshold=1000000)
-        return output
-
     async def ensure_cwd(self) -> str | None:
         project_name = projects.get_context_project_name(self.agent.context)
         if project_name:
@@ -13,7 +13,7 @@ import uuid
 from agent import Agent, AgentContext, AgentContextType, UserMessage
 from helpers import guids, plugins, files, runtime
 from helpers import message_queue as mq
-from helpers.persist_chat import save_tmp_chat
+from helpers.persist_chat import load_indexed_chats, save_tmp_chat
 from helpers.print_style import PrintStyle
 from helpers.errors import format_error
 from initialize import initialize_agent
@@ -345,6 +345,11 @@ HISTORY_PREVIEW_MAX_CHARS: int = 500
 
 
 def _find_handler_chats(handler_name: str, sender: str) -> list[disp.ChatSummary]:
+    # persisted chats not used since startup are only indexed
+    load_indexed_chats(
+        lambda data: data.get(disp.CTX_EMAIL_HANDLER) == handler_name
+        and data.get(disp.CTX_EMAIL_SENDER, "").lower() == sender.lower()
+    )
     results = []
     for ctx_id, ctx in AgentContext._contexts.items():
         if not isinstance(ctx, AgentContext):
@@ -5,11 +5,7 @@ from langchain.embeddings import CacheBackedEmbeddings
 from helpers import guids
 
 # from langchain_chroma import Chroma
-from langchain_community.vectorstores import FAISS
-
-# faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
-from helpers import faiss_monkey_patch
-import faiss
+from helpers.faiss_index import IndexedFaiss, create_index, parse_prefilter, INDEX_FLAT
 
 
 from langchain_community.docstore.in_memory import InMemoryDocstore
@@ -25,7 +21,7 @@ import numpy as np
 from helpers.print_style import PrintStyle
 from helpers import files, plugins, projects
 from langchain_core.documents import Document
-from . import knowledge_import
+from . import knowledge_import, memory_persistence
 from helpers.log import Log, LogItem
 from enum import Enum
 from agent import Agent, AgentContext
@@ -38,7 +34,10 @@ from simpleeval import simple_eval
 logging.getLogger("langchain_core.vectorstores.base").setLevel(logging.ERROR)
 
 
-class MyFaiss(FAISS):
+class MyFaiss(IndexedFaiss):
+    # recall filters memories by area, apply them inside the index
+    prefilter_keys = ("area",)
+
     # override aget_by_ids
     def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
         # return all self.docstore._dict[id] in ids
@@ -78,6 +77,7 @@ class Memory:
                 Memory._get_embedding_config(agent),
                 memory_subdir,
                 False,
+                index_type=get_memory_index_type(agent),
             )
             Memory.index[memory_subdir] = db
             wrap = Memory(db, memory_subdir=memory_subdir)
@@ -109,6 +109,7 @@ class Memory:
                 model_config=model_config,
                 memory_subdir=memory_subdir,
                 in_memory=False,
+                index_type=get_memory_index_type(),
             )
             wrap = Memory(db, memory_subdir=memory_subdir)
             if preload_knowledge:
@@ -126,6 +127,7 @@ class Memory:
     async def reload(agent: Agent):
         memory_subdir = get_agent_memory_subdir(agent)
         if Memory.index.get(memory_subdir):
+            memory_persistence.flush(memory_subdir)
             del Memory.index[memory_subdir]
         return await Memory.get(agent)
 
@@ -135,6 +137,7 @@ class Memory:
         model_config: models.ModelConfig,
         memory_subdir: str,
         in_memory=False,
+        index_type: str = INDEX_FLAT,
     ) -> tuple[MyFaiss, bool]:
 
         PrintStyle.standard("Initializing VectorDB...")
@@ -175,6 +178,8 @@ class Memory:
         docs: dict[str, Document] | None = None
 
         created = False
+        persistence = memory_persistence.get_persistence(memory_subdir, db_dir)
+        persistence.recover()
 
         # if db folder exists and is not empty:
         if os.path.exists(db_dir) and files.exists(db_dir, "index.faiss"):
@@ -187,6 +192,10 @@ class Memory:
                 relevance_score_fn=Memory._cosine_normalizer,
             )  # type: ignore
 
+            # apply changes made after the last snapshot
+            if db and persistence.replay(db):
+                PrintStyle.standard("Restored recent memory changes")
+
             # if there is a mismatch in embeddings used, re-index the whole DB
             emb_ok = False
             emb_set_file = files.get_abs_path(db_dir, "embedding.json")
@@ -204,9 +213,14 @@ class Memory:
                 docs = db.get_all_docs()
                 db = None
 
+            # index type changed in settings, rebuild the index from stored vectors
+            if db and db.set_index_type(index_type):
+                PrintStyle.standard(f"Rebuilt memory index as {index_type}")
+                persistence.snapshot(db)
+
         # DB not loaded, create one
         if not db:
-            index = faiss.IndexFlatIP(len(embedder.embed_query("example")))
+            index = create_index(index_type, len(embedder.embed_query("example")))
 
             db = MyFaiss(
                 embedding_function=embedder,
@@ -226,7 +240,7 @@ class Memory:
                 db.add_documents(documents=list(docs.values()), ids=list(docs.keys()))
 
             # save DB
-            Memory._save_db_file(db, memory_subdir)
+            persistence.snapshot(db)
             # save meta file
             meta_file_path = files.get_abs_path(db_dir, "embedding.json")
             files.write_file(
@@ -241,6 +255,7 @@ class Memory:
 
             created = True
 
+        persistence.attach(db)
         return db, created
 
     def __init__(
@@ -250,6 +265,10 @@ class Memory:
     ):
         self.db = db
         self.memory_subdir = memory_subdir
+        self.persistence = memory_persistence.get_persistence(
+            memory_subdir, abs_db_dir(memory_subdir)
+        )
+        self.persistence.attach(db)
 
     async def preload_knowledge(
         self, log_item: LogItem | None, kn_dirs: list[str], memory_subdir: str
@@ -343,6 +362,7 @@ class Memory:
             k=limit,
             score_threshold=threshold,
             filter=comparator,
+            prefilter=parse_prefilter(filter) if filter else None,
         )
 
     async def delete_documents_by_query(
@@ -368,15 +388,13 @@ class Memory:
                 # fnd = self.db.get(where={"id": {"$in": document_ids}})
                 # if fnd["ids"]: self.db.delete(ids=fnd["ids"])
                 # tot += len(fnd["ids"])
-                await self.db.adelete(ids=document_ids)
+                self._delete_ids(document_ids)
                 tot += len(document_ids)
 
             # If fewer than K document IDs, break the loop
             if len(document_ids) < k:
                 break
 
-        if tot:
-            self._save_db()  # persist
         return removed
 
     async def delete_documents_by_ids(self, ids: list[str]):
@@ -386,10 +404,7 @@ class Memory:
         )  # existing docs to remove (prevents error)
         if rem_docs:
             rem_ids = [doc.metadata["id"] for doc in rem_docs]  # ids to remove
-            await self.db.adelete(ids=rem_ids)
-
-        if rem_docs:
-            self._save_db()  # persist
+            self._delete_ids(rem_ids)  # persisted in the background
         return rem_docs
 
     async def insert_text(self, text, metadata: dict = {}):
@@ -408,19 +423,38 @@ class Memory:
                 if not doc.metadata.get("area", ""):
                     doc.metadata["area"] = Memory.Area.MAIN.value
 
-            await self.db.aadd_documents(documents=docs, ids=ids)
-            self._save_db()  # persist
+            vectors = await self._embed_documents(docs)
+            self._add_embedded(docs, vectors)  # persisted in the background
         return ids
 
     async def update_documents(self, docs: list[Document]):
         ids = [doc.metadata["id"] for doc in docs]
-        await self.db.adelete(ids=ids)  # delete originals
-        ins = await self.db.aadd_documents(documents=docs, ids=ids)  # add updated
-        self._save_db()  # persist
-        return ins
+        vectors = await self._embed_documents(docs)
+        with self.persistence.lock:
+            self._delete_ids(ids)  # delete originals
+            self._add_embedded(docs, vectors)  # add updated
+        return ids
 
-    def _save_db(self):
-        Memory._save_db_file(self.db, self.memory_subdir)
+    async def _embed_documents(self, docs: list[Document]) -> list[list[float]]:
+        return await self.db.embedding_function.aembed_documents(  # type: ignore
+            [doc.page_content for doc in docs]
+        )
+
+    def _add_embedded(self, docs: list[Document], vectors: list[list[float]]):
+        with self.persistence.lock:
+            self.db.add_embeddings(
+                text_embeddings=list(zip([doc.page_content for doc in docs], vectors)),
+                metadatas=[doc.metadata for doc in docs],
+                ids=[doc.metadata["id"] for doc in docs],
+            )
+            self.persistence.log_add(docs, vectors)
+
+    def _delete_ids(self, ids: list[str]):
+        with self.persistence.lock:
+            existing = [id for id in ids if id in self.db.get_all_docs()]
+            if existing:
+                self.db.delete(ids=existing)
+                self.persistence.log_delete(existing)
 
     def _generate_doc_id(self):
         while True:
@@ -428,11 +462,6 @@ class Memory:
             if not self.db.get_by_ids(doc_id):  # check if exists
                 return doc_id
 
-    @staticmethod
-    def _save_db_file(db: MyFaiss, memory_subdir: str):
-        abs_dir = abs_db_dir(memory_subdir)
-        db.save_local(folder_path=abs_dir)
-
     @staticmethod
     def _get_comparator(condition: str):
         def comparator(data: dict[str, Any]):
@@ -484,7 +513,8 @@ def get_custom_knowledge_subdir_abs(agent: Agent) -> str:
 
 
 def reload():
-    # clear the memory index, this will force all DBs to reload
+    # save pending changes and clear the memory index, this will force all DBs to reload
+    memory_persistence.flush_all()
     Memory.index = {}
 
 
@@ -519,6 +549,11 @@ def get_memory_subdir_abs(agent: Agent) -> str:
     return abs_db_dir(subdir)
 
 
+def get_memory_index_type(agent: Agent | None = None) -> str:
+    config = plugins.get_plugin_config("_memory", agent) or {}
+    return config.get("memory_index_type", "") or INDEX_FLAT
+
+
 def get_agent_memory_subdir(agent: Agent) -> str:
     config = plugins.get_plugin_config("_memory", agent)
 
@@ -0,0 +1,285 @@
+"""Write-behind persistence of memory databases.
+
+save_local rewrites index.faiss and pickles the whole docstore, which takes
+seconds for large memories, so mutations are not saved one by one. Each one
+appends a record with the documents and their vectors to memory.wal in the
+database folder. A snapshot is written in the background once changes settle
+for FLUSH_DELAY seconds (FLUSH_MAX_DELAY at most), when the database is
+unloaded, and by flush_all at shutdown. Loading replays the WAL over the
+snapshot; replay is idempotent, so records the snapshot already contains
+apply again without changing it.
+
+Taking a snapshot rotates memory.wal to memory.wal.1 under the lock that
+guards mutations, serializes the database in memory and writes the files
+after releasing it, and only then drops the rotated WAL. index.faiss and
+index.pkl only make sense as a pair, so both are written to .new files
+first and SNAPSHOT_COMMIT_FILE marks them complete before they replace the
+old pair; recover() finishes a replacement a crash interrupted and discards
+an uncommitted one. A crash at any point leaves a snapshot and WAL files
+that replay to the last change.
+"""
+
+import base64
+import json
+import os
+import pickle
+import threading
+import time
+from typing import Any
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from helpers.print_style import PrintStyle
+
+WAL_FILE = "memory.wal"
+WAL_ROTATED_FILE = "memory.wal.1"
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+SNAPSHOT_COMMIT_FILE = "snapshot.commit"
+FLUSH_DELAY = 5.0  # seconds without changes before a snapshot is written
+FLUSH_MAX_DELAY = 60.0  # snapshot at the latest this long after the first change
+WAL_FSYNC_INTERVAL = 1.0
+
+_persistences: dict[str, "MemoryPersistence"] = {}
+_persistences_lock = threading.Lock()
+
+
+class MemoryPersistence:
+
+    def __init__(self, db_dir: str):
+        self.db_dir = db_dir
+        # held while the database is mutated or serialized for a snapshot
+        self.lock = threading.RLock()
+        self._snapshot_lock = threading.Lock()
+        self.db: Any = None
+        self.dirty_since: float | None = None
+        self.last_change = 0.0
+        self.timer: threading.Timer | None = None
+        self.last_fsync = 0.0
+        self.unsynced = False
+
+    def attach(self, db):
+        """Persist this database from now on, after a (re)load."""
+        with self.lock:
+            self.db = db
+
+    def log_add(self, docs: list[Document], vectors: list[list[float]]):
+        array = np.asarray(vectors, dtype=np.float32)
+        self._append({
+            "op": "add",
+            "ids": [doc.metadata["id"] for doc in docs],
+            "texts": [doc.page_content for doc in docs],
+            "metadatas": [doc.metadata for doc in docs],
+            "dim": int(array.shape[1]) if array.ndim == 2 else 0,
+            "vectors": base64.b64encode(array.tobytes()).decode("ascii"),
+        })
+
+    def log_delete(self, ids: list[str]):
+        self._append({"op": "delete", "ids": list(ids)})
+
+    def replay(self, db) -> int:
+        """Apply WAL records to a freshly loaded database, returns their count."""
+        count = 0
+        for name in (WAL_ROTATED_FILE, WAL_FILE):
+            path = os.path.join(self.db_dir, name)
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line of a crashed write
+                    _apply(db, record)
+                    count += 1
+        if count:
+            with self.lock:
+                self.db = db
+                self._mark_dirty()
+        return count
+
+    def recover(self):
+        """Complete or discard a snapshot interrupted by a crash, before loading."""
+        with self._snapshot_lock:
+            _recover_snapshot(self.db_dir)
+
+    def snapshot(self, db=None):
+        """Write the database to index.faiss and index.pkl now and drop the WAL."""
+        with self._snapshot_lock:
+            with self.lock:
+                self._cancel_timer()
+                db = db if db is not None else self.db
+                if db is None:
+                    return
+                rotated = self._rotate_wal()
+                index_bytes = faiss.serialize_index(db.index)
+                docstore_bytes = pickle.dumps((db.docstore, db.index_to_docstore_id))
+                self.dirty_since = None
+
+            os.makedirs(self.db_dir, exist_ok=True)
+            _write_file(_new_path(self.db_dir, INDEX_FILE), index_bytes.tobytes())
+            _write_file(_new_path(self.db_dir, DOCSTORE_FILE), docstore_bytes)
+            # from here on the new pair replaces the old one, even after a crash
+            _write_file(os.path.join(self.db_dir, SNAPSHOT_COMMIT_FILE), b"")
+            _recover_snapshot(self.db_dir)
+            if rotated:
+                os.remove(rotated)
+
+    def flush(self):
+        """Snapshot pending changes, if any."""
+        if self.dirty_since is not None:
+            self.snapshot()
+        self.sync()
+
+    def sync(self):
+        with self.lock:
+            if not self.unsynced:
+                return
+            path = os.path.join(self.db_dir, WAL_FILE)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    os.fsync(f.fileno())
+            self.last_fsync = time.monotonic()
+            self.unsynced = False
+
+    def _append(self, record: dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self.lock:
+            os.makedirs(self.db_dir, exist_ok=True)
+            with open(os.path.join(self.db_dir, WAL_FILE), "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                now = time.monotonic()
+                if now - self.last_fsync >= WAL_FSYNC_INTERVAL:
+                    os.fsync(f.fileno())
+                    self.last_fsync = now
+                    self.unsynced = False
+                else:
+                    self.unsynced = True
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        now = time.monotonic()
+        if self.dirty_since is None:
+            self.dirty_since = now
+        self.last_change = now
+        if not self.timer:
+            self._start_timer(FLUSH_DELAY)
+
+    def _start_timer(self, delay: float):
+        self.timer = threading.Timer(delay, self._on_timer)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _cancel_timer(self):
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+    def _on_timer(self):
+        with self.lock:
+            self.timer = None
+            if self.dirty_since is None:
+                return
+            # wait for changes to settle, but not forever
+            now = time.monotonic()
+            settle = self.last_change + FLUSH_DELAY - now
+            limit = self.dirty_since + FLUSH_MAX_DELAY - now
+            if settle > 0 and limit > 0:
+                self._start_timer(min(settle, limit))
+                return
+        try:
+            self.snapshot()
+        except Exception as e:
+            # the WAL still holds every change, retry with the next one
+            PrintStyle.error(f"Error saving memory database {self.db_dir}: {e}")
+
+    def _rotate_wal(self) -> str | None:
+        path = os.path.join(self.db_dir, WAL_FILE)
+        rotated = os.path.join(self.db_dir, WAL_ROTATED_FILE)
+        if os.path.exists(rotated):
+            # an earlier snapshot failed, keep its records ahead of the new ones
+            if os.path.exists(path):
+                with open(path, "rb") as src, open(rotated, "ab") as dst:
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(path)
+        elif os.path.exists(path):
+            os.replace(path, rotated)
+        else:
+            return None
+        self.unsynced = False
+        return rotated
+
+
+def get_persistence(memory_subdir: str, db_dir: str) -> MemoryPersistence:
+    with _persistences_lock:
+        persistence = _persistences.get(memory_subdir)
+        if not persistence or persistence.db_dir != db_dir:
+            persistence = _persistences[memory_subdir] = MemoryPersistence(db_dir)
+        return persistence
+
+
+def flush(memory_subdir: str):
+    with _persistences_lock:
+        persistence = _persistences.get(memory_subdir)
+    if persistence:
+        persistence.flush()
+
+
+def flush_all():
+    """Snapshot all databases with pending changes, called on shutdown."""
+    with _persistences_lock:
+        persistences = list(_persistences.values())
+    for persistence in persistences:
+        try:
+            persistence.flush()
+        except Exception as e:
+            PrintStyle.error(f"Error saving memory database {persistence.db_dir}: {e}")
+
+
+def _apply(db, record: dict[str, Any]):
+    ids = record.get("ids") or []
+    existing = [id for id in ids if id in db.docstore._dict]  # type: ignore
+    if existing:
+        db.delete(ids=existing)
+    if record.get("op") != "add" or not ids:
+        return
+    vectors = np.frombuffer(
+        base64.b64decode(record["vectors"]), dtype=np.float32
+    ).reshape(len(ids), record["dim"])
+    db.add_embeddings(
+        text_embeddings=list(zip(record["texts"], vectors.tolist())),
+        metadatas=record["metadatas"],
+        ids=ids,
+    )
+
+
+def _recover_snapshot(db_dir: str):
+    committed = os.path.exists(os.path.join(db_dir, SNAPSHOT_COMMIT_FILE))
+    for name in (INDEX_FILE, DOCSTORE_FILE):
+        tmp = _new_path(db_dir, name)
+        if not os.path.exists(tmp):
+            continue
+        if committed:
+            os.replace(tmp, os.path.join(db_dir, name))
+        else:
+            os.remove(tmp)  # never completed, the old pair stays
+    if committed:
+        os.remove(os.path.join(db_dir, SNAPSHOT_COMMIT_FILE))
+
+
+def _new_path(db_dir: str, name: str) -> str:
+    return os.path.join(db_dir, f"{name}.new")
+
+
+def _write_file(path: str, content: bytes):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
@@ -1,4 +1,9 @@
+import models
+
+
 def save_plugin_config(result=None, settings=None, **kwargs):
+    # models built from the previous configuration are not reused
+    models.clear_model_pool()
     if settings and isinstance(settings, dict):
         # Remove transient UI-only fields before persisting
         for section in ("chat_model", "utility_model", "embedding_model"):
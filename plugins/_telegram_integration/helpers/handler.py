@@ -14,7 +14,7 @@ from agent import AgentContext, UserMessage
 from helpers import plugins, files, projects
 from helpers import message_queue as mq
 from helpers.notification import NotificationManager, NotificationType, NotificationPriority
-from helpers.persist_chat import save_tmp_chat
+from helpers.persist_chat import load_indexed_chats, save_tmp_chat
 from helpers.print_style import PrintStyle
 from helpers.errors import format_error
 from initialize import initialize_agent
@@ -578,6 +578,10 @@ def _inherit_model_override(ctx: AgentContext):
             return
     except Exception:
         return
+    # persisted chats not used since startup are only indexed
+    load_indexed_chats(
+        lambda data: data.get("project") == project and bool(data.get("chat_model_override"))
+    )
     source = max(
         (c for c in AgentContext.all()
          if c.id != ctx.id and c.get_data("project") == project and c.get_data("chat_model_override")),
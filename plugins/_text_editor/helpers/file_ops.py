@@ -4,14 +4,25 @@ Pure file operations for the text_editor plugin.
 No agent/tool dependencies — only stdlib + tokens helper.
 """
 
+import asyncio
+import bisect
+import functools
+import mmap
 import os
 import shutil
 import tempfile
-from typing import TypedDict
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, TypedDict
 
 from helpers import tokens
 
 _BINARY_PEEK = 8192
+_INDEX_BLOCK = 64 * 1024  # a line offset is kept for about every block of bytes
+_INDEX_CACHE_SIZE = 64  # files with a cached line index
+_COPY_CHUNK = 1024 * 1024
 
 
 # ------------------------------------------------------------------
@@ -101,25 +112,23 @@ def read_file(
             error="file appears binary, use terminal instead",
         )
 
+    line_from = max(line_from, 1)
+    if line_to is None:
+        line_to = line_from + default_line_count - 1
+
     try:
-        with open(path, "r", encoding="utf-8", errors="replace") as f:
-            all_lines = f.readlines()
+        with open(path, "rb") as f, _map_file(f) as mm:
+            index = _get_line_index(path, f, mm)
+            total_lines = index.total_lines
+            line_to = min(line_to, total_lines)
+            # Convert 1-based inclusive range to 0-based start and count
+            selected = _read_lines(mm, index, line_from - 1, line_to - line_from + 1)
     except OSError as exc:
         return ReadResult(
             content="", total_lines=0, warnings="",
             error=str(exc),
         )
 
-    total_lines = len(all_lines)
-    line_from = max(line_from, 1)
-    if line_to is None:
-        line_to = line_from + default_line_count - 1
-    line_to = min(line_to, total_lines)
-
-    # Convert 1-based inclusive range to 0-based slice
-    idx_from = line_from - 1
-    idx_to = line_to  # slice is exclusive, line_to is inclusive 1-based
-    selected = all_lines[idx_from:idx_to]
     num_width = len(str(line_to))
 
     warn_parts: list[str] = []
@@ -130,7 +139,7 @@ def read_file(
 
     for i, raw_line in enumerate(selected):
         line_no = line_from + i  # 1-based
-        stripped = raw_line.rstrip("\n").rstrip("\r")
+        stripped = raw_line.decode("utf-8", errors="replace").rstrip("\r")
         line_tok = tokens.count_tokens(stripped)
 
         if line_tok > max_line_tokens:
@@ -171,6 +180,14 @@ def read_file(
     )
 
 
+async def read_file_async(path: str, **kwargs) -> ReadResult:
+    """read_file in a worker thread, indexing a large file must not block the loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, functools.partial(read_file, path, **kwargs)
+    )
+
+
 # ------------------------------------------------------------------
 # Write
 # ------------------------------------------------------------------
@@ -267,6 +284,8 @@ def apply_patch(path: str, edits: list[dict]) -> int:
 
     Line numbers are 1-based. Edits use inclusive 'to'.
     Inserts have 'insert': True.
+    Untouched spans between edits are copied byte for byte, by the kernel
+    where the platform allows it.
     Returns total line count after patching.
     """
     # Ensure content always ends with newline to prevent line merging
@@ -278,55 +297,59 @@ def apply_patch(path: str, edits: list[dict]) -> int:
     fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".tmp")
     try:
         with (
-            open(path, "r", encoding="utf-8", errors="replace") as src,
-            os.fdopen(fd, "w", encoding="utf-8") as dst,
+            open(path, "rb") as src,
+            _map_file(src) as mm,
+            os.fdopen(fd, "wb") as dst,
         ):
-            edit_idx = 0
-            line_no = 1  # 1-based
+            index = _get_line_index(path, src, mm)
+            total = index.total_lines
+            # content written after a last line without newline joins it,
+            # so the mapped index would be off, the next read builds one
+            open_end = mm is not None and mm[index.size - 1 : index.size] != b"\n"
+            # line index of the patched file, mapped from the source one
+            new_lines, new_offsets = array("q"), array("q")
+            line = 0  # source lines consumed (0-based index of the next one)
+            pos = 0  # source bytes consumed
             total_written = 0
+            bytes_written = 0
+
+            for edit in edits:
+                start_line = min(edit["from"] - 1, total)
+                start = _line_offset(mm, index, start_line)
+                _map_checkpoints(
+                    index, line, start_line, pos,
+                    total_written, bytes_written, new_lines, new_offsets,
+                )
+                _copy_range(src, dst, pos, start - pos)
+                total_written += start_line - line
+                bytes_written += start - pos
+                line, pos = start_line, start
 
-            for raw_line in src:
-                # Process all inserts targeting this line first
-                while (
-                    edit_idx < len(edits)
-                    and edits[edit_idx]["insert"]
-                    and edits[edit_idx]["from"] == line_no
-                ):
-                    edit = edits[edit_idx]
-                    if edit["content"]:
-                        dst.write(edit["content"])
-                        total_written += _count_content_lines(edit["content"])
-                    edit_idx += 1
-
-                # Check if current line falls in a replace/delete range
-                if edit_idx < len(edits) and not edits[edit_idx]["insert"]:
-                    edit = edits[edit_idx]
-                    if edit["from"] <= line_no <= edit["to"]:
-                        # Write replacement content once at range start
-                        if line_no == edit["from"] and edit["content"]:
-                            dst.write(edit["content"])
-                            total_written += _count_content_lines(
-                                edit["content"]
-                            )
-                        # Skip original line; advance edit at range end
-                        if line_no == edit["to"]:
-                            edit_idx += 1
-                        line_no += 1
-                        continue
-
-                dst.write(raw_line)
-                total_written += 1
-                line_no += 1
-
-            # Remaining edits past end of file
-            while edit_idx < len(edits):
-                edit = edits[edit_idx]
                 if edit["content"]:
-                    dst.write(edit["content"])
+                    content = edit["content"].encode("utf-8")
+                    dst.write(content)
                     total_written += _count_content_lines(edit["content"])
-                edit_idx += 1
+                    bytes_written += len(content)
+                if not edit["insert"]:
+                    # Skip original lines of the replaced/deleted range
+                    line = max(min(edit["to"], total), start_line)
+                    pos = _line_offset(mm, index, line)
+
+            # Rest of the file after the last edit
+            _map_checkpoints(
+                index, line, total, pos,
+                total_written, bytes_written, new_lines, new_offsets,
+            )
+            _copy_range(src, dst, pos, index.size - pos)
+            total_written += total - line
 
-        shutil.move(tmp_path, path)
+        try:
+            shutil.copymode(path, tmp_path)
+        except OSError:
+            pass
+        os.replace(tmp_path, path)
+        if not open_end:
+            _store_line_index(path, total_written, new_lines, new_offsets)
         return total_written
     except Exception:
         if os.path.exists(tmp_path):
@@ -334,6 +357,12 @@ def apply_patch(path: str, edits: list[dict]) -> int:
         raise
 
 
+async def apply_patch_async(path: str, edits: list[dict]) -> int:
+    """apply_patch in a worker thread, copying a large file must not block the loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, apply_patch, path, edits)
+
+
 def patch_file(path: str, edits: list | None) -> PatchResult:
     """Validate and apply edits to a file."""
     path = os.path.expanduser(path)
@@ -360,3 +389,196 @@ def _count_content_lines(content: str) -> int:
     return content.count("\n") + (
         1 if content and not content.endswith("\n") else 0
     )
+
+
+
+# ------------------------------------------------------------------
+# Line index
+# ------------------------------------------------------------------
+# Reading a window of a large file must not cost a pass over the whole
+# file. The byte offset where a line starts is recorded for about every
+# _INDEX_BLOCK bytes, so a window is found by bisecting the checkpoints and
+# scanning forward less than one block in the memory-mapped file. Indexes
+# are cached per real path and rebuilt when the file's mtime or size change.
+
+
+class _LineIndex:
+    __slots__ = ("mtime_ns", "size", "total_lines", "lines", "offsets")
+
+    def __init__(
+        self, mtime_ns: int, size: int, total_lines: int,
+        lines: array, offsets: array,
+    ):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.total_lines = total_lines
+        self.lines = lines  # 0-based line numbers, ascending
+        self.offsets = offsets  # byte offset where each of those lines starts
+
+
+_indexes: OrderedDict[str, _LineIndex] = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+@contextmanager
+def _map_file(f) -> Iterator[mmap.mmap | None]:
+    """Read-only mmap of an open file, None for an empty one."""
+    if not os.fstat(f.fileno()).st_size:
+        yield None
+        return
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield mm
+    finally:
+        mm.close()
+
+
+def _get_line_index(path: str, f, mm: mmap.mmap | None) -> _LineIndex:
+    stat = os.fstat(f.fileno())
+    key = os.path.realpath(path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if (
+            index
+            and index.mtime_ns == stat.st_mtime_ns
+            and index.size == stat.st_size
+        ):
+            _indexes.move_to_end(key)
+            return index
+
+    index = _build_line_index(mm, stat.st_mtime_ns, stat.st_size)
+    _cache_line_index(key, index)
+    return index
+
+
+def _build_line_index(
+    mm: mmap.mmap | None, mtime_ns: int, size: int
+) -> _LineIndex:
+    lines, offsets = array("q", [0]), array("q", [0])
+    newlines = 0
+    if mm is not None:
+        size = min(size, len(mm))
+        for block in range(0, size, _INDEX_BLOCK):
+            end = min(block + _INDEX_BLOCK, size)
+            count = mm[block:end].count(b"\n")
+            if not count:
+                continue
+            newlines += count
+            last = mm.rfind(b"\n", block, end)
+            if last + 1 < size:
+                lines.append(newlines)
+                offsets.append(last + 1)
+    total_lines = newlines
+    if size and (mm is None or mm[size - 1 : size] != b"\n"):
+        total_lines += 1  # last line without a trailing newline
+    return _LineIndex(mtime_ns, size, total_lines, lines, offsets)
+
+
+def _store_line_index(
+    path: str, total_lines: int, lines: array, offsets: array
+):
+    """Cache an index built while writing the file."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+    if not lines or lines[0] != 0:
+        lines.insert(0, 0)
+        offsets.insert(0, 0)
+    index = _LineIndex(
+        stat.st_mtime_ns, stat.st_size, total_lines, lines, offsets
+    )
+    _cache_line_index(os.path.realpath(path), index)
+
+
+def _cache_line_index(key: str, index: _LineIndex):
+    with _indexes_lock:
+        _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > _INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+
+
+def _line_offset(mm: mmap.mmap | None, index: _LineIndex, line: int) -> int:
+    """Byte offset where 0-based line starts, file size past the last line."""
+    if mm is None or line >= index.total_lines:
+        return index.size
+    i = bisect.bisect_right(index.lines, line) - 1
+    current, pos = index.lines[i], index.offsets[i]
+    while current < line:
+        newline = mm.find(b"\n", pos, index.size)
+        if newline < 0:
+            return index.size
+        pos = newline + 1
+        current += 1
+    return pos
+
+
+def _read_lines(
+    mm: mmap.mmap | None, index: _LineIndex, line: int, count: int
+) -> list[bytes]:
+    """count lines from 0-based line on, without their newlines."""
+    if count <= 0:
+        return []
+    pos = _line_offset(mm, index, line)
+    result: list[bytes] = []
+    while mm is not None and len(result) < count and pos < index.size:
+        newline = mm.find(b"\n", pos, index.size)
+        end = newline if newline >= 0 else index.size
+        result.append(mm[pos:end])
+        pos = end + 1
+    return result
+
+
+def _map_checkpoints(
+    index: _LineIndex, line_from: int, line_to: int, pos: int,
+    new_line: int, new_pos: int, lines: array, offsets: array,
+):
+    """Add checkpoints of a source span copied to new_line/new_pos to a new index."""
+    if pos >= index.size or line_from >= line_to:
+        return
+    _add_checkpoint(lines, offsets, new_line, new_pos)
+    i = bisect.bisect_right(index.lines, line_from)
+    while i < len(index.lines) and index.lines[i] < line_to:
+        _add_checkpoint(
+            lines, offsets,
+            index.lines[i] - line_from + new_line,
+            index.offsets[i] - pos + new_pos,
+        )
+        i += 1
+
+
+def _add_checkpoint(lines: array, offsets: array, line: int, offset: int):
+    if not lines or lines[-1] < line:
+        lines.append(line)
+        offsets.append(offset)
+
+
+def _copy_range(src, dst, offset: int, count: int):
+    """Append count bytes of src from offset to dst, in kernel where possible."""
+    if count <= 0:
+        return
+    dst.flush()
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    try:
+        while count > 0:
+            if hasattr(os, "copy_file_range"):
+                sent = os.copy_file_range(src_fd, dst_fd, count, offset)
+            elif hasattr(os, "sendfile"):
+                sent = os.sendfile(dst_fd, src_fd, offset, count)
+            else:
+                break
+            if not sent:
+                break
+            offset += sent
+            count -= sent
+    except OSError:
+        pass  # unsupported by the filesystem, copy the rest in user space
+    if count > 0:
+        src.seek(offset)
+        while count > 0:
+            chunk = src.read(min(count, _COPY_CHUNK))
+            if not chunk:
+                break
+            dst.write(chunk)
+            count -= len(chunk)
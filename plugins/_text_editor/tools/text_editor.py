@@ -3,10 +3,10 @@ from helpers.extension import call_extensions_async
 from helpers import plugins, runtime
 from plugins._text_editor.helpers.file_ops import (
     FileInfo,
-    read_file,
+    read_file_async,
     write_file,
     validate_edits,
-    apply_patch,
+    apply_patch_async,
     file_info,
 )
 
@@ -43,7 +43,7 @@ class TextEditor(Tool):
         line_to = int(raw_to) if raw_to is not None else None
 
         result = await runtime.call_development_function(
-            read_file,
+            read_file_async,
             path,
             line_from=line_from,
             line_to=line_to,
@@ -109,7 +109,7 @@ class TextEditor(Tool):
 
         cfg = _get_config(self.agent)
         read_result = await runtime.call_development_function(
-            read_file,
+            read_file_async,
             info["expanded"],
             line_from=1,
             line_to=result["total_lines"],
@@ -154,7 +154,7 @@ class TextEditor(Tool):
 
         try:
             total_lines = await runtime.call_development_function(
-                apply_patch, ext_data["path"], ext_data["edits"]
+                apply_patch_async, ext_data["path"], ext_data["edits"]
             )
         except Exception as exc:
             return self._error("patch", path, str(exc))
@@ -220,7 +220,7 @@ async def _read_patch_region(
     end_line = max_to + added - removed + 3
 
     result = await runtime.call_development_function(
-        read_file,
+        read_file_async,
         path,
         line_from=max(min_from - 1, 1),
         line_to=min(end_line, total_lines),
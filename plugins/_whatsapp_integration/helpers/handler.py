@@ -13,7 +13,7 @@ import uuid
 from agent import Agent, AgentContext, UserMessage
 from helpers import plugins, files, runtime
 from helpers import message_queue as mq
-from helpers.persist_chat import save_tmp_chat
+from helpers.persist_chat import load_indexed_chats, save_tmp_chat
 from helpers.print_style import PrintStyle
 from helpers.errors import format_error
 from initialize import initialize_agent
@@ -218,6 +218,8 @@ async def _route_to_chat(
 
 def _find_chats_by_jid(chat_id: str) -> list[str]:
     """Return context IDs for chats matching the given WhatsApp JID, newest first."""
+    # persisted chats not used since startup are only indexed
+    load_indexed_chats(lambda data: data.get(CTX_WA_CHAT_ID) == chat_id)
     results = []
     for ctx_id, ctx in AgentContext._contexts.items():
         if not isinstance(ctx, AgentContext):
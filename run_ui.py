@@ -1,3 +1,5 @@
+import sys
+
 import initialize
 from helpers import dotenv, extension, runtime
 from helpers.print_style import PrintStyle
@@ -53,9 +55,18 @@ def start_web_server(server_runtime: UiServerRuntime, host: str, port: int) -> N
 def create_flush_callback():
     def flush_and_shutdown_callback() -> None:
         """
-        TODO(dev): add cleanup + flush-to-disk logic here.
+        Flush pending state to disk before shutdown.
         """
-        return
+        from helpers import persist_chat
+
+        persist_chat.flush_tmp_chats()
+
+        # memory databases are saved in the background, only if memory was used
+        memory_persistence = sys.modules.get(
+            "plugins._memory.helpers.memory_persistence"
+        )
+        if memory_persistence:
+            memory_persistence.flush_all()
 
     flush_ran = False
 
@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import cache, files, plugins, settings
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    cache.clear(plugins.PLUGIN_CONFIG_CACHE_AREA)
+    cache.clear(settings.SETTINGS_CACHE_AREA)
+    cache.reset_stats()
+    yield
+    cache.clear(plugins.PLUGIN_CONFIG_CACHE_AREA)
+    cache.clear(settings.SETTINGS_CACHE_AREA)
+
+
+def test_plugin_config_is_read_once(monkeypatch):
+    reads = []
+    read_file = files.read_file
+    monkeypatch.setattr(
+        files, "read_file", lambda path, *a, **kw: reads.append(path) or read_file(path, *a, **kw)
+    )
+
+    config = plugins.get_plugin_config("_memory")
+    assert config and "memory_index_type" in config
+    config["memory_index_type"] = "changed"  # callers get their own copy
+
+    again = plugins.get_plugin_config("_memory")
+    assert again is not config
+    assert again["memory_index_type"] != "changed"
+    assert len(reads) == 1
+    assert cache.get_stats(plugins.PLUGIN_CONFIG_CACHE_AREA)[
+        plugins.PLUGIN_CONFIG_CACHE_AREA
+    ] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+    # a different project or profile resolves separately
+    plugins.get_plugin_config("_memory", agent_profile="agent0")
+    assert len(reads) == 2
+
+    plugins.clear_plugin_config_cache()
+    plugins.get_plugin_config("_memory")
+    assert len(reads) == 3
+
+
+def test_settings_are_normalized_once(monkeypatch):
+    first = settings.get_settings()
+    normalized = []
+    normalize = settings.normalize_settings
+    monkeypatch.setattr(
+        settings, "normalize_settings", lambda s: normalized.append(1) or normalize(s)
+    )
+
+    second = settings.get_settings()
+    assert second == first and second is not first
+    second["api_keys"]["test"] = "changed"
+    assert "test" not in settings.get_settings()["api_keys"]
+    assert not normalized
+
+    settings.reload_settings()
+    assert normalized
+
+
+def test_settings_watchdog_rereads_top_level_files_only(monkeypatch):
+    from helpers import watchdog
+
+    registered = {}
+    monkeypatch.setattr(
+        watchdog, "add_watchdog", lambda id, **kwargs: registered.update(kwargs)
+    )
+    settings.register_watchdogs()
+
+    [root] = registered["roots"]
+    matches = watchdog._compile_matcher(
+        root, registered["patterns"], registered["ignore_patterns"]
+    )
+    assert matches(settings.SETTINGS_FILE)
+    assert matches(files.get_abs_path("usr/.env"))
+    assert not matches(files.get_abs_path("usr/workdir/app/.env"))
+    assert not matches(files.get_abs_path("usr/plugins/x/settings.json"))
+
+    monkeypatch.setattr(settings, "_settings", {"stale": True})
+    registered["handler"]([[settings.SETTINGS_FILE]])
+    assert settings._settings is None
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import sys
+import time
 from pathlib import Path
 
 import pytest
@@ -9,7 +10,8 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from helpers.dirty_json import DirtyJson
+from helpers.dirty_json import DirtyJson, DirtyJsonStream
+from helpers.extract_tools import extract_json_root_string
 
 
 @pytest.mark.parametrize(
@@ -54,3 +56,87 @@ def test_completed_remains_true_after_trailing_content() -> None:
     }
 
     assert parser.completed is True
+
+
+STREAM_PAYLOADS = [
+    '{"tool_name": "response", "tool_args": {"text": "Hi \\"there\\" \\u00e9\\n", '
+    '"n": [1, 2.5, -3, true, null]}}',
+    'Thinking first.\n{\n  "thoughts": ["a", "b",],\n  // comment\n'
+    '  tool_name: code_exe,\n  "tool_args": {"code": """\nprint(1)\n"""}\n} trailing',
+    '{"a": `x`, /* note */ "b": {"c": []}}',
+]
+
+
+def _feed(payload: str, step: int) -> DirtyJsonStream:
+    stream = DirtyJsonStream()
+    for index in range(0, len(payload), step):
+        stream.feed(payload[index : index + step])
+    return stream
+
+
+@pytest.mark.parametrize("payload", STREAM_PAYLOADS)
+@pytest.mark.parametrize("step", [1, 3, 1000])
+def test_stream_matches_full_parse_for_any_chunking(payload, step) -> None:
+    stream = _feed(payload, step)
+    root = extract_json_root_string(payload)
+
+    assert stream.completed is True
+    assert stream.root_string() == root
+    assert stream.snapshot() == DirtyJson.parse_string(root)
+
+
+def test_stream_snapshot_shows_partial_values() -> None:
+    stream = DirtyJsonStream()
+
+    stream.feed('{"tool_name": "resp')
+    assert stream.snapshot() == {"tool_name": "resp"}
+
+    stream.feed('onse", "tool_args": {"items": [1, "x')
+    assert stream.snapshot() == {
+        "tool_name": "response",
+        "tool_args": {"items": [1, "x"]},
+    }
+    assert stream.completed is False
+    assert stream.root_string() is None
+
+
+def test_stream_waits_for_split_escape_and_wrapper() -> None:
+    stream = _feed('{{"text": "caf\\u00e9"}}', 1)
+
+    assert stream.snapshot() == {"text": "café"}
+    assert stream.root_string() == '{{"text": "caf\\u00e9"}}'
+
+
+def test_stream_flags_array_before_root() -> None:
+    stream = _feed('[1] {"a": 1}', 2)
+
+    assert stream.array_first is True
+    assert extract_json_root_string('[1] {"a": 1}') is None
+
+
+def test_stream_snapshot_is_detached_from_session() -> None:
+    stream = DirtyJsonStream()
+    stream.feed('{"tool_args": {"a": 1}')
+
+    snapshot = stream.snapshot()
+    snapshot["tool_args"]["a"] = 2
+    stream.feed("}")
+
+    assert stream.snapshot() == {"tool_args": {"a": 1}}
+
+
+def test_stream_feed_cost_grows_linearly_with_long_values() -> None:
+    def feed_time(size: int) -> float:
+        payload = '{"tool_name": "text_editor", "tool_args": {"content": "' + "x" * size + '"}}'
+        best = float("inf")
+        for _ in range(3):
+            stream = DirtyJsonStream()
+            start = time.perf_counter()
+            for index in range(0, len(payload), 4):
+                stream.feed(payload[index : index + 4])
+            best = min(best, time.perf_counter() - start)
+        assert stream.snapshot()["tool_args"]["content"] == "x" * size
+        return best
+
+    # 8x the input, a quadratic feed would take about 64x as long
+    assert feed_time(128 * 1024) < feed_time(16 * 1024) * 20
@@ -0,0 +1,108 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from helpers import document_query_cache
+from helpers.vector_db import VectorDB
+
+
+class _Agent:
+    def __init__(self):
+        self.model = DeterministicFakeEmbedding(size=16)
+
+    def get_embedding_model(self):
+        return self.model
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        document_query_cache, "DOCUMENT_CACHE_DIR", str(tmp_path / "documents")
+    )
+    monkeypatch.setattr(document_query_cache, "_index", None)
+
+
+def test_cache_keeps_recent_documents_within_bounds(monkeypatch):
+    monkeypatch.setattr(document_query_cache, "MAX_ENTRIES", 3)
+    keys = [document_query_cache.make_key(f"file:///doc{i}.pdf", "1:1") for i in range(5)]
+    assert document_query_cache.make_key("file:///doc0.pdf", "1:2") != keys[0]
+
+    for i, key in enumerate(keys[:3]):
+        document_query_cache.add_content(key, f"file:///doc{i}.pdf", f"text {i}")
+    assert document_query_cache.get_content(keys[0]) == "text 0"  # now most recent
+    document_query_cache.add_content(keys[3], "file:///doc3.pdf", "text 3")
+    document_query_cache.add_content(keys[4], "file:///doc4.pdf", "text 4")
+
+    assert document_query_cache.get_content(keys[0]) == "text 0"
+    assert document_query_cache.get_content(keys[1]) is None
+    assert document_query_cache.get_content(keys[4]) == "text 4"
+
+    monkeypatch.setattr(document_query_cache, "MAX_BYTES", 1)
+    document_query_cache.add_content(keys[1], "file:///doc1.pdf", "text 1")
+    assert document_query_cache.get_content(keys[1]) == "text 1"
+    assert document_query_cache.get_content(keys[0]) is None
+
+
+@pytest.mark.asyncio
+async def test_indexed_chunks_round_trip_through_cache():
+    agent = _Agent()
+    key = document_query_cache.make_key("file:///doc.pdf", "1:1")
+    document_query_cache.add_content(key, "file:///doc.pdf", "alpha\nbeta")
+    embeddings_id = VectorDB.get_embeddings_id(agent)
+    assert document_query_cache.get_index_dir(key, embeddings_id) is None
+
+    db = VectorDB(agent)  # type: ignore[arg-type]
+    ids = await db.insert_documents([
+        Document(page_content="alpha", metadata={"document_uri": "file:///doc.pdf"}),
+        Document(page_content="beta", metadata={"document_uri": "file:///doc.pdf"}),
+    ])
+    db.save_local(document_query_cache.new_index_dir(key, embeddings_id))
+    document_query_cache.index_saved(key)
+
+    folder = document_query_cache.get_index_dir(key, embeddings_id)
+    assert folder
+    loaded = VectorDB.load_local(agent, folder)  # type: ignore[arg-type]
+    other = VectorDB(agent)  # type: ignore[arg-type]
+    await other.insert_documents([Document(page_content="gamma", metadata={})])
+    other.merge(loaded)
+
+    assert set(ids) <= set(other.db.get_all_docs())
+    results = await other.search_by_similarity_threshold(
+        "alpha", limit=1, threshold=0.0, filter="document_uri == 'file:///doc.pdf'"
+    )
+    assert results[0].page_content == "alpha"
+
+
+def test_pdf_pages_are_cached_by_content():
+    key = document_query_cache.make_content_key(b"%PDF-1.7 one")
+    assert key != document_query_cache.make_content_key(b"%PDF-1.7 two")
+    assert document_query_cache.get_pages(key) == {}
+
+    document_query_cache.add_pages(key, {0: "first", 1: "second"})
+    document_query_cache.add_pages(key, {4: "fifth"})
+
+    assert document_query_cache.get_pages(key) == {0: "first", 1: "second", 4: "fifth"}
+
+
+def test_page_batches_track_size_without_walking(monkeypatch):
+    key = document_query_cache.make_content_key(b"%PDF large")
+    walks = []
+    dir_size = document_query_cache._dir_size
+    monkeypatch.setattr(
+        document_query_cache, "_dir_size", lambda path: walks.append(path) or dir_size(path)
+    )
+
+    for start in range(0, 40, 4):
+        document_query_cache.add_pages(key, {n: f"page {n} " * n for n in range(start, start + 4)})
+    document_query_cache.add_pages(key, {0: "page 0 rewritten"})
+
+    assert len(walks) == 1  # only when the entry is first registered
+    assert document_query_cache._index[key][1] == dir_size(document_query_cache._entry_dir(key))
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import cache, extension
+
+
+class _Context:
+    def get_data(self, key):
+        return None
+
+
+class _Config:
+    profile = "default"
+
+
+class _Owner:
+    def __init__(self):
+        self.config = _Config()
+        self.context = _Context()
+
+
+class Stateless(extension.Extension):
+    instances: list[extension.Extension] = []
+
+    def execute(self, **kwargs):
+        Stateless.instances.append(self)
+
+
+class Stateful(extension.Extension):
+    instances: list[extension.Extension] = []
+
+    def execute(self, **kwargs):
+        Stateful.instances.append(self)
+        self.seen = kwargs
+
+
+class AsyncStateless(extension.Extension):
+    async def execute(self, data: dict | None = None, **kwargs):
+        if data is not None:
+            data["calls"] = data.get("calls", 0) + 1
+
+
+@pytest.fixture
+def point(monkeypatch):
+    classes: dict[str, list] = {
+        "test_sync": [Stateless, Stateful],
+        "test_async": [AsyncStateless],
+    }
+    monkeypatch.setattr(
+        extension,
+        "_get_extension_classes",
+        lambda extension_point, agent=None, **kwargs: classes[extension_point],
+    )
+    cache.clear(extension._PLANS_CACHE_AREA)
+    Stateless.instances.clear()
+    Stateful.instances.clear()
+    yield
+    cache.clear(extension._PLANS_CACHE_AREA)
+    extension.toggle_profiling(False)
+    extension.reset_profile()
+
+
+def test_stateless_instances_are_reused_per_agent(point) -> None:
+    owner_a, owner_b = _Owner(), _Owner()
+
+    extension.call_extensions_sync("test_sync", agent=owner_a)  # type: ignore[arg-type]
+    extension.call_extensions_sync("test_sync", agent=owner_a)  # type: ignore[arg-type]
+    extension.call_extensions_sync("test_sync", agent=owner_b)  # type: ignore[arg-type]
+
+    assert Stateless.instances[0] is Stateless.instances[1]
+    assert Stateless.instances[2] is not Stateless.instances[0]
+
+
+def test_stateful_extension_gets_fresh_instances(point) -> None:
+    owner = _Owner()
+    for _ in range(3):
+        extension.call_extensions_sync("test_sync", agent=owner)  # type: ignore[arg-type]
+
+    assert len({id(instance) for instance in Stateful.instances}) == 3
+
+
+@pytest.mark.asyncio
+async def test_profiling_records_points_and_extensions(point) -> None:
+    extension.reset_profile()
+    extension.toggle_profiling(True)
+
+    data: dict = {}
+    for _ in range(4):
+        await extension.call_extensions_async("test_async", agent=None, data=data)
+
+    profile = extension.get_profile()
+    assert data["calls"] == 4
+    assert profile["enabled"] is True
+    assert [p["name"] for p in profile["points"]] == ["test_async"]
+    ext = profile["extensions"][0]
+    assert ext["calls"] == 4
+    assert ext["name"].startswith("test_async/")
+    assert ext["p95_ms"] <= ext["max_ms"]
+
+
+def test_profiling_is_off_by_default(point) -> None:
+    extension.reset_profile()
+    extension.call_extensions_sync("test_sync", agent=None)
+
+    assert extension.get_profile()["extensions"] == []
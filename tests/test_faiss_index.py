@@ -0,0 +1,174 @@
+import sys
+from concurrent.futures import Future
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from helpers import faiss_index
+from helpers.faiss_index import IndexedFaiss, create_index, parse_prefilter
+
+DIM = 16
+EMBEDDINGS = DeterministicFakeEmbedding(size=DIM)
+
+
+class AreaFaiss(IndexedFaiss):
+    prefilter_keys = ("area",)
+
+
+def _new_db(index_type: str) -> AreaFaiss:
+    return AreaFaiss(
+        embedding_function=EMBEDDINGS,
+        index=create_index(index_type, DIM),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.COSINE,
+    )
+
+
+def _add(db: AreaFaiss, count: int, area: str, start: int = 0):
+    rng = np.random.default_rng(start)
+    vectors = rng.normal(size=(count, DIM)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    ids = [f"{area}-{start + i}" for i in range(count)]
+    db.add_embeddings(
+        text_embeddings=list(zip(ids, vectors.tolist())),
+        metadatas=[{"area": area} for _ in ids],
+        ids=ids,
+    )
+    return ids
+
+
+def test_parse_prefilter():
+    assert parse_prefilter("area == 'main'") == ("area", frozenset({"main"}))
+    assert parse_prefilter("area == 'main' or area=='fragments'") == (
+        "area",
+        frozenset({"main", "fragments"}),
+    )
+    assert parse_prefilter("area in ['a', 'b']") == ("area", frozenset({"a", "b"}))
+    assert parse_prefilter("area == 'main' and id == 'x'") is None
+    assert parse_prefilter("area == 'main' or id == 'x'") is None
+    assert parse_prefilter("area != 'main'") is None
+
+
+@pytest.mark.parametrize("index_type", faiss_index.INDEX_TYPES)
+def test_prefilter_finds_rare_area(index_type, monkeypatch):
+    monkeypatch.setattr(faiss_index, "IVF_MIN_TRAIN", 400)
+    monkeypatch.setattr(faiss_index, "EXACT_SEARCH_MAX", 4)
+    db = _new_db(index_type)
+    _add(db, 1000, "main")
+    solutions = _add(db, 10, "solutions", start=5000)
+    db.wait_rebuild()
+    if index_type == faiss_index.INDEX_IVF:
+        assert isinstance(db.index, faiss.IndexIVF)
+
+    vector = np.random.default_rng(1).normal(size=DIM).tolist()
+    # a post filter over the top fetch_k candidates would find nothing here
+    results = db.similarity_search_with_score_by_vector(
+        vector,
+        k=5,
+        filter=lambda metadata: metadata["area"] == "solutions",
+        prefilter=("area", frozenset({"solutions"})),
+    )
+    assert len(results) == 5
+    assert all(doc.id in solutions for doc, _score in results)
+
+
+@pytest.mark.parametrize("index_type", faiss_index.INDEX_TYPES)
+def test_delete_and_rebuild_keep_documents(index_type, monkeypatch):
+    monkeypatch.setattr(faiss_index, "IVF_MIN_TRAIN", 400)
+    db = _new_db(index_type)
+    main = _add(db, 600, "main")
+    fragments = _add(db, 50, "fragments", start=5000)
+    db.delete(ids=main[:300] + fragments[:10])
+
+    # serialized and loaded like a memory snapshot
+    db = AreaFaiss(
+        embedding_function=EMBEDDINGS,
+        index=faiss.deserialize_index(faiss.serialize_index(db.index)),
+        docstore=db.docstore,
+        index_to_docstore_id=db.index_to_docstore_id,
+        distance_strategy=DistanceStrategy.COSINE,
+    )
+    assert db.index_type == index_type
+    added = _add(db, 20, "fragments", start=9000)
+
+    for converted in (None, faiss_index.INDEX_FLAT, faiss_index.INDEX_HNSW):
+        if converted:
+            db.set_index_type(converted)
+        live = set(db.index_to_docstore_id.values())
+        assert live == set(main[300:] + fragments[10:] + added)
+        for doc_id in (main[-1], fragments[-1], added[0]):
+            label = next(l for l, i in db.index_to_docstore_id.items() if i == doc_id)
+            area = doc_id.split("-")[0]
+            results = db.similarity_search_with_score_by_vector(
+                db.index.reconstruct(label).tolist(),
+                k=1,
+                prefilter=("area", frozenset({area})),
+            )
+            assert results[0][0].id == doc_id
+
+
+class _DeferredExecutor:
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.jobs.append((future, fn, args))
+        return future
+
+    def run(self):
+        for future, fn, args in self.jobs:
+            future.set_result(fn(*args))
+        self.jobs = []
+
+
+@pytest.mark.parametrize("index_type", [faiss_index.INDEX_HNSW, faiss_index.INDEX_IVF])
+def test_rebuild_runs_in_background_and_keeps_changes(index_type, monkeypatch):
+    monkeypatch.setattr(faiss_index, "IVF_MIN_TRAIN", 400)
+    executor = _DeferredExecutor()
+    monkeypatch.setattr(faiss_index, "_rebuild_executor", executor)
+    db = _new_db(index_type)
+    main = _add(db, 500, "main")
+    db.delete(ids=main[:150])
+    assert len(executor.jobs) == 1
+    old_index = db.index
+
+    # the old index keeps serving and taking changes while the new one builds
+    added = _add(db, 20, "fragments", start=5000)
+    db.delete(ids=main[150:160] + added[:5])
+    assert db.index is old_index
+    executor.run()
+
+    # searches, possibly on executor threads, keep using the current index
+    vector = db.index.reconstruct(next(iter(db.index_to_docstore_id))).tolist()
+    db.similarity_search_with_score_by_vector(vector, k=1)
+    assert db.index is old_index
+
+    # the next add switches, after replaying the changes made meanwhile
+    late = _add(db, 5, "solutions", start=7000)
+    assert db.index is not old_index
+    live = set(main[160:] + added[5:] + late)
+    vectors = {
+        db.index_to_docstore_id[label]: db.index.reconstruct(label).tolist()
+        for label in db.index_to_docstore_id
+    }
+    if index_type == faiss_index.INDEX_IVF:
+        assert isinstance(db.index, faiss.IndexIVF)
+        assert db.index.ntotal == len(live)
+    else:
+        assert db.index.ntotal - len(db._deleted) == len(live)
+    assert set(db.index_to_docstore_id.values()) == live
+    for doc_id in (main[160], main[-1], added[5], added[-1], late[0], late[-1]):
+        results = db.similarity_search_with_score_by_vector(vectors[doc_id], k=1)
+        assert results[0][0].id == doc_id
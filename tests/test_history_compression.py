@@ -0,0 +1,101 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import history
+
+
+class _Agent:
+    def parse_prompt(self, _file, **kwargs):
+        return f"summary: {kwargs['summary']}"
+
+    def read_prompt(self, _file, **kwargs):
+        return ""
+
+    async def call_utility_model(self, system, message):
+        return "bulk"
+
+
+def _topic(hist: history.History, count: int) -> history.Topic:
+    topic = history.Topic(history=hist)
+    for i in range(count):
+        topic.add_message(i % 2 == 1, f"message {i}", tokens=10)
+    return topic
+
+
+@pytest.fixture
+def summaries(monkeypatch, tmp_path):
+    from helpers import summary_cache
+
+    monkeypatch.setattr(summary_cache, "SUMMARY_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(summary_cache, "_index", None)
+    monkeypatch.setattr(history, "_summary_model_id", lambda agent: "test/model")
+    state = {"running": 0, "peak": 0, "calls": 0}
+
+    async def summarize_messages(self, messages):
+        state["running"] += 1
+        state["calls"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+        return "short"
+
+    monkeypatch.setattr(history.Topic, "summarize_messages", summarize_messages)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_topics_attention_is_summarized_in_parallel_with_cap(summaries):
+    hist = history.History(agent=_Agent())
+    hist.topics = [_topic(hist, 6) for _ in range(5)]
+
+    assert await hist.compress_topics()
+
+    assert summaries["calls"] == history.COMPRESSION_CONCURRENCY
+    assert summaries["peak"] == history.COMPRESSION_CONCURRENCY
+    compressed = [len(t.messages) for t in hist.topics]
+    assert compressed == [3] * history.COMPRESSION_CONCURRENCY + [6, 6]
+
+
+@pytest.mark.asyncio
+async def test_attention_summary_is_dropped_when_messages_changed(summaries):
+    hist = history.History(agent=_Agent())
+    topic = _topic(hist, 6)
+    original = list(topic.messages)
+
+    task = asyncio.create_task(topic.compress_attention(0))
+    await asyncio.sleep(0)
+    topic.messages[2] = history.Message(False, "edited", tokens=10)
+    assert not await task
+    assert len(topic.messages) == 6
+
+    # appends while summarizing keep the swap valid
+    task = asyncio.create_task(topic.compress_attention(0))
+    await asyncio.sleep(0)
+    topic.add_message(False, "appended", tokens=10)
+    assert await task
+    assert topic.messages[0] is original[0]
+    assert topic.messages[1].content.startswith("summary:")
+    assert topic.messages[-1].content == "appended"
+
+
+@pytest.mark.asyncio
+async def test_compression_starts_at_soft_limit(summaries, monkeypatch):
+    hist = history.History(agent=_Agent())
+    hist.topics = [_topic(hist, 6)]
+    hist.current = _topic(hist, 2)
+    total = hist.get_tokens()  # 80 tokens
+
+    monkeypatch.setattr(
+        history.History, "_get_ctx_size_for_history", lambda self: int(total / 0.95)
+    )
+    assert not hist.is_over_limit()
+    assert hist.is_over_soft_limit()
+    assert await hist.compress()
+    assert hist.get_tokens() < total
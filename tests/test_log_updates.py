@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pytest
+
+from helpers import log as log_module
+from helpers.log import Log, LogUpdates
+from helpers.secrets import SecretsMatcher
+
+
+def test_journal_keeps_one_entry_per_item_and_monotonic_version() -> None:
+    journal = LogUpdates()
+    for _ in range(1000):
+        journal.append(0)
+    journal.append(1)
+
+    assert journal.version == len(journal) == 1001
+    assert len(journal._latest) == 2
+    assert journal.changed_since(0) == [0, 1]
+    assert journal.changed_since(1000) == [1]
+    assert journal.changed_since(1001) == []
+
+
+def test_changed_items_are_returned_in_log_order() -> None:
+    journal = LogUpdates()
+    journal.append(5)
+    journal.append(6)
+    journal.append(5)
+
+    assert journal.changed_since(0) == [5, 6]
+    assert journal.changed_since(2) == [5]
+    assert journal.changed_since(0, end=2) == [6]
+
+
+def test_log_output_returns_items_changed_since_version() -> None:
+    log = Log()
+    first = log.log(type="user", heading="hi", content="hello")
+    second = log.log(type="agent", heading="thinking")
+    for chunk in ("a", "b", "c"):
+        second.stream(content=chunk)
+
+    full = log.output()
+    assert [item["no"] for item in full.items] == [first.no, second.no]
+    assert full.end == log.updates.version
+
+    first.update(content="edited")
+    delta = log.output(start=full.end)
+    assert [item["no"] for item in delta.items] == [first.no]
+    assert delta.items[0]["content"] == "edited"
+    assert log.output(start=delta.end).items == []
+
+
+@pytest.fixture
+def masked_log(monkeypatch) -> Log:
+    matcher = SecretsMatcher({"TOKEN": "hunter2pass"})
+    monkeypatch.setattr(Log, "_get_matcher", lambda self: matcher)
+    return Log()
+
+
+def test_streamed_content_masks_secret_split_across_chunks(masked_log) -> None:
+    item = masked_log.log(type="agent", heading="streaming")
+    text = ""
+    for chunk in ("password is hun", "ter2", "pass, done"):
+        text += chunk
+        item.update(content=text)
+
+    assert item.content == "password is §§secret(TOKEN), done"
+    item.stream(content=" and hunter2pass")
+    assert item.content.endswith("and §§secret(TOKEN)")
+
+
+def test_unmasked_stream_keeps_caller_string(masked_log) -> None:
+    item = masked_log.log(type="agent")
+    text = "nothing secret here"
+
+    item.update(content=text)
+
+    assert item.content is text
+
+
+def test_kvps_are_not_shared_with_caller(masked_log) -> None:
+    kvps = {"args": {"code": "print('hunter2pass')"}, "items": [1, 2]}
+    item = masked_log.log(type="tool", kvps=kvps)
+
+    kvps["args"]["code"] = "changed"
+    kvps["items"].append(3)
+
+    assert item.kvps == {"args": {"code": "print('§§secret(TOKEN)')"}, "items": [1, 2]}
+
+
+def test_truncation_is_applied_lazily_on_output(masked_log, monkeypatch) -> None:
+    monkeypatch.setattr(log_module, "CONTENT_MAX_LEN", 100)
+    item = masked_log.log(type="agent", content="x" * 500)
+
+    assert len(item.content) == 500
+    first = item.output()
+    assert len(first["content"]) < 200
+    assert item.output() is first
+
+    item.update(heading="changed")
+    assert item.output() is not first
@@ -0,0 +1,126 @@
+import asyncio
+import sys
+import textwrap
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData
+
+from helpers import mcp_session_pool
+from helpers.mcp_session_pool import MCPSession
+
+SERVER = textwrap.dedent(
+    """
+    import asyncio, os
+    from mcp.server.fastmcp import FastMCP
+
+    mcp = FastMCP("test")
+
+    @mcp.tool()
+    async def pid(delay: float = 0) -> str:
+        await asyncio.sleep(delay)
+        return str(os.getpid())
+
+    mcp.run()
+    """
+)
+
+
+@pytest.fixture
+def connect(tmp_path):
+    script = tmp_path / "server.py"
+    script.write_text(SERVER)
+    starts = []
+
+    async def connect(stack: AsyncExitStack) -> ClientSession:
+        starts.append(1)
+        params = StdioServerParameters(
+            command=sys.executable, args=[str(script)], cwd=str(PROJECT_ROOT)
+        )
+        read, write = await stack.enter_async_context(stdio_client(params))
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await session.initialize()
+        return session
+
+    connect.starts = starts  # type: ignore
+    return connect
+
+
+async def _pid(pool: MCPSession, delay: float = 0) -> str:
+    async def call(session: ClientSession):
+        result = await session.call_tool("pid", {"delay": delay})
+        return result.content[0].text  # type: ignore
+
+    return await pool.run(call)
+
+
+def test_session_is_reused_across_calls_and_loops(connect):
+    pool = MCPSession("test", connect)
+    first = asyncio.run(_pid(pool))
+
+    async def concurrent():
+        return await asyncio.gather(*[_pid(pool, 0.2) for _ in range(5)])
+
+    # another event loop, concurrent requests pipelined over the same process
+    assert set(asyncio.run(concurrent())) == {first}
+    assert len(connect.starts) == 1
+
+    pool.close()
+    assert asyncio.run(_pid(pool)) != first
+    assert len(connect.starts) == 2
+    pool.close()
+
+
+def test_timed_out_or_stopped_session_is_replaced(connect):
+    pool = MCPSession("test", connect)
+    first = asyncio.run(_pid(pool))
+
+    async def timeout(session: ClientSession):
+        raise McpError(ErrorData(code=408, message="Timed out while waiting for response"))
+
+    with pytest.raises(McpError):
+        asyncio.run(pool.run(timeout))
+    second = asyncio.run(_pid(pool))
+    assert second != first
+
+    async def stop_reading(session: ClientSession):
+        # what an SSE transport does after its read timeout
+        await session._read_stream.aclose()  # type: ignore
+
+    asyncio.run(pool.run(stop_reading))
+    assert asyncio.run(_pid(pool)) not in (first, second)
+    assert len(connect.starts) == 3
+    pool.close()
+
+
+def test_failed_connect_backs_off(monkeypatch):
+    attempts = []
+
+    async def connect(stack: AsyncExitStack) -> ClientSession:
+        attempts.append(1)
+        raise OSError("server not found")
+
+    pool = MCPSession("broken", connect)
+    with pytest.raises(OSError):
+        asyncio.run(_pid(pool))
+    with pytest.raises(ConnectionError, match="reconnecting"):
+        asyncio.run(_pid(pool))
+    assert len(attempts) == 1
+
+    monkeypatch.setattr(pool, "retry_at", 0.0)
+    with pytest.raises(OSError):
+        asyncio.run(_pid(pool))
+    assert len(attempts) == 2
+    assert pool.failures == 2
+    # the delay doubles with each failed attempt
+    assert pool.retry_at - time.monotonic() > mcp_session_pool.RECONNECT_DELAY
@@ -0,0 +1,93 @@
+import asyncio
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import mcp_handler
+from helpers.mcp_handler import MCPConfig
+
+
+def _tool(name: str) -> dict:
+    return {
+        "name": name,
+        "description": f"{name} description",
+        "input_schema": {"type": "object", "properties": {"q": {"type": "string"}}},
+    }
+
+
+def _client(server):
+    return server._MCPServerLocal__client
+
+
+def _config() -> MCPConfig:
+    # commands that do not exist, servers start without tools
+    config = MCPConfig(
+        servers_list=[
+            {"name": "alpha", "command": "a0-missing-mcp-command"},
+            {"name": "beta", "command": "a0-missing-mcp-command"},
+        ]
+    )
+    alpha, beta = config.servers
+    _client(alpha)._set_tools([_tool("search"), _tool("fetch")])
+    _client(beta)._set_tools([_tool("run")])
+    return config
+
+
+def test_tools_prompt_is_rendered_once_per_version(monkeypatch):
+    config = _config()
+    version = config.get_tools_version()
+    prompt = config.get_tools_prompt()
+    assert "### alpha.search:" in prompt and "### beta.run:" in prompt
+
+    dumps = []
+    monkeypatch.setattr(
+        mcp_handler.json, "dumps", lambda value: dumps.append(value) or "{}"
+    )
+    assert config.get_tools_prompt() is prompt
+    assert config.get_tools_version() == version
+    assert not dumps
+
+    # only the server with a changed tool list is rendered again
+    _client(config.servers[1])._set_tools([_tool("run"), _tool("stop")])
+    assert config.get_tools_version() != version
+    assert "### beta.stop:" in config.get_tools_prompt()
+    assert len(dumps) == 2
+
+    # the same tool list again does not change the version
+    version = config.get_tools_version()
+    _client(config.servers[1])._set_tools([_tool("run"), _tool("stop")])
+    assert config.get_tools_version() == version
+
+
+def test_tools_are_looked_up_by_qualified_name(monkeypatch):
+    config = _config()
+    assert config.has_tool("alpha.fetch")
+    assert config.has_tool("beta.run")
+    assert not config.has_tool("beta.fetch")
+    assert not config.has_tool("alpha.fetch.more")
+
+    calls = []
+
+    async def call_tool(tool_name, input_data):
+        calls.append((tool_name, input_data))
+        return "result"
+
+    monkeypatch.setattr(_client(config.servers[1]), "call_tool", call_tool)
+    assert asyncio.run(config.call_tool("beta.run", {"q": "x"})) == "result"
+    assert calls == [("run", {"q": "x"})]
+
+
+def test_reloaded_config_renders_new_tools():
+    config = _config()
+    assert "### alpha.search:" in config.get_tools_prompt()
+
+    # the same server name with another tool list after a settings change
+    config = MCPConfig(servers_list=[{"name": "alpha", "command": "a0-missing-mcp-command"}])
+    _client(config.servers[0])._set_tools([_tool("lookup")])
+    prompt = config.get_tools_prompt()
+    assert config.has_tool("alpha.lookup")
+    assert "### alpha.lookup:" in prompt
+    assert "### alpha.search:" not in prompt
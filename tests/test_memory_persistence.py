@@ -0,0 +1,137 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from plugins._memory.helpers import memory, memory_persistence
+from plugins._memory.helpers.memory import Memory, MyFaiss
+
+EMBEDDINGS = DeterministicFakeEmbedding(size=8)
+
+
+def _new_db() -> MyFaiss:
+    return MyFaiss(
+        embedding_function=EMBEDDINGS,
+        index=faiss.IndexFlatIP(8),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.COSINE,
+        relevance_score_fn=Memory._cosine_normalizer,
+    )
+
+
+def _load_db(db_dir: Path) -> MyFaiss:
+    return MyFaiss.load_local(
+        folder_path=str(db_dir),
+        embeddings=EMBEDDINGS,
+        allow_dangerous_deserialization=True,
+        distance_strategy=DistanceStrategy.COSINE,
+        relevance_score_fn=Memory._cosine_normalizer,
+    )  # type: ignore
+
+
+def _contents(db: MyFaiss) -> dict[str, str]:
+    return {id: doc.page_content for id, doc in db.get_all_docs().items()}
+
+
+@pytest.fixture
+def db_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory, "abs_db_dir", lambda subdir: str(tmp_path / subdir))
+    monkeypatch.setattr(memory_persistence, "_persistences", {})
+    return tmp_path / "test"
+
+
+@pytest.mark.asyncio
+async def test_changes_replay_from_wal_until_snapshot(db_dir, monkeypatch):
+    monkeypatch.setattr(memory_persistence, "FLUSH_DELAY", 60)
+    mem = Memory(_new_db(), memory_subdir="test")
+    ids = await mem.insert_documents([Document("alpha"), Document("beta"), Document("gamma")])
+    await mem.update_documents([Document("beta v2", metadata={**mem.db.get_by_ids(ids[1])[0].metadata})])
+    await mem.delete_documents_by_ids([ids[2]])
+
+    # nothing rewritten yet, a crash now loses nothing
+    assert not (db_dir / "index.faiss").exists()
+    restored = _new_db()
+    assert mem.persistence.replay(restored) == 4
+    assert _contents(restored) == {ids[0]: "alpha", ids[1]: "beta v2"}
+
+    memory_persistence.flush_all()
+    assert not (db_dir / "memory.wal").exists()
+    loaded = _load_db(db_dir)
+    assert _contents(loaded) == _contents(mem.db)
+    assert mem.persistence.replay(loaded) == 0
+
+    results = await Memory(loaded, memory_subdir="test").search_similarity_threshold(
+        "alpha", limit=1, threshold=0.0
+    )
+    assert results[0].page_content == "alpha"
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_written_in_background(db_dir, monkeypatch):
+    monkeypatch.setattr(memory_persistence, "FLUSH_DELAY", 0.05)
+    mem = Memory(_new_db(), memory_subdir="test")
+    await mem.insert_documents([Document("alpha")])
+    await mem.insert_documents([Document("beta")])
+
+    deadline = time.monotonic() + 5
+    while not (db_dir / "index.pkl").exists() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    with mem.persistence._snapshot_lock:  # snapshot finished writing
+        assert mem.persistence.dirty_since is None
+
+    assert not (db_dir / "memory.wal").exists()
+    assert sorted(_contents(_load_db(db_dir)).values()) == ["alpha", "beta"]
+
+
+@pytest.mark.asyncio
+async def test_crash_between_snapshot_files_recovers_the_pair(db_dir, monkeypatch):
+    monkeypatch.setattr(memory_persistence, "FLUSH_DELAY", 60)
+    mem = Memory(_new_db(), memory_subdir="test")
+    ids = await mem.insert_documents([Document("alpha"), Document("beta"), Document("gamma")])
+    memory_persistence.flush_all()
+    await mem.delete_documents_by_ids([ids[0]])
+    await mem.insert_documents([Document("delta")])
+    expected = _contents(mem.db)
+
+    # crash after index.faiss was replaced, before index.pkl was
+    replace = memory_persistence.os.replace
+
+    def crashing_replace(src, dst):
+        if str(dst).endswith(memory_persistence.DOCSTORE_FILE):
+            raise OSError("crash")
+        replace(src, dst)
+
+    monkeypatch.setattr(memory_persistence.os, "replace", crashing_replace)
+    with pytest.raises(OSError):
+        mem.persistence.snapshot()
+    monkeypatch.setattr(memory_persistence.os, "replace", replace)
+    mem.persistence._cancel_timer()
+
+    persistence = memory_persistence.MemoryPersistence(str(db_dir))
+    persistence.recover()
+    loaded = _load_db(db_dir)
+    persistence.replay(loaded)
+    persistence._cancel_timer()
+    assert _contents(loaded) == expected
+    assert loaded.index.ntotal == len(loaded.index_to_docstore_id)
+    assert not (db_dir / memory_persistence.SNAPSHOT_COMMIT_FILE).exists()
+
+
+def test_uncommitted_snapshot_files_are_discarded(db_dir):
+    db_dir.mkdir(parents=True)
+    (db_dir / "index.faiss.new").write_bytes(b"partial")
+    memory_persistence.MemoryPersistence(str(db_dir)).recover()
+    assert not (db_dir / "index.faiss.new").exists()
+    assert not (db_dir / "index.faiss").exists()
@@ -0,0 +1,78 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import models
+from models import ModelConfig, ModelType
+
+
+@pytest.fixture(autouse=True)
+def empty_pool():
+    models.clear_model_pool()
+    yield
+    models.clear_model_pool()
+
+
+def _config(name: str, **kwargs) -> ModelConfig:
+    return ModelConfig(
+        type=ModelType.CHAT, provider="openai", name=name, api_key="sk-test", kwargs=kwargs
+    )
+
+
+def test_chat_models_are_shared_per_configuration():
+    config = _config("gpt-4.1")
+    first = models.get_chat_model("openai", "gpt-4.1", model_config=config, api_key="sk-test")
+    same = models.get_chat_model("openai", "gpt-4.1", model_config=config, api_key="sk-test")
+    assert same is first
+
+    other = models.get_chat_model(
+        "openai", "gpt-4.1", model_config=config, api_key="sk-test", temperature=0.2
+    )
+    assert other is not first
+
+    models.clear_model_pool()
+    assert (
+        models.get_chat_model("openai", "gpt-4.1", model_config=config, api_key="sk-test")
+        is not first
+    )
+
+
+def test_pool_drops_least_recently_used(monkeypatch):
+    monkeypatch.setattr(models, "MODEL_POOL_SIZE", 2)
+    get = lambda name: models.get_chat_model("openai", name, api_key="sk-test")
+    a, b = get("a"), get("b")
+    assert get("a") is a
+    get("c")  # evicts b
+    assert get("a") is a
+    assert get("b") is not b
+
+
+def test_local_embedding_model_loads_once(monkeypatch):
+    loads = []
+
+    class FakeSentenceTransformer:
+        def __init__(self, model, **kwargs):
+            loads.append(model)
+
+    monkeypatch.setattr(models, "SentenceTransformer", FakeSentenceTransformer)
+    name = "sentence-transformers/all-MiniLM-L6-v2"
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(models.get_embedding_model("huggingface", name))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
@@ -0,0 +1,101 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from agent import AgentContext
+from helpers import persist_chat
+from initialize import initialize_agent
+
+
+@pytest.fixture
+def chats_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(persist_chat, "CHATS_FOLDER", str(tmp_path))
+    monkeypatch.setattr(persist_chat, "_chat_index", {})
+    ctxids: list[str] = []
+    try:
+        yield tmp_path, ctxids
+    finally:
+        for ctxid in ctxids:
+            persist_chat.remove_chat(ctxid)
+            AgentContext.remove(ctxid)
+
+
+def _save_and_unload(
+    ctxids: list[str], ctxid: str, name: str, data: dict | None = None
+) -> AgentContext:
+    ctx = AgentContext(config=initialize_agent(), id=ctxid, name=name, set_current=False)
+    ctxids.append(ctxid)
+    for key, value in (data or {}).items():
+        ctx.set_data(key, value)
+    ctx.agent0.history.add_message(False, f"hello from {name}")
+    ctx.log.log(type="user", heading="User", content=name)
+    persist_chat.save_tmp_chat(ctx)
+    persist_chat.flush_tmp_chats()
+    expected = ctx.output()
+    AgentContext.remove(ctxid)
+    return expected
+
+
+def test_startup_indexes_chats_and_loads_them_on_first_use(chats_folder):
+    from helpers.state_snapshot import _build_context_lists
+
+    _folder, ctxids = chats_folder
+    expected = _save_and_unload(ctxids, "ctx-index-a", "first chat")
+
+    assert persist_chat.load_tmp_chats() == ["ctx-index-a"]
+    assert "ctx-index-a" not in {ctx.id for ctx in AgentContext.all()}
+
+    chats, _tasks = _build_context_lists()
+    [listed] = [chat for chat in chats if chat["id"] == "ctx-index-a"]
+    for key in ("name", "created_at", "last_message", "type", "log_guid", "log_version", "running"):
+        assert listed[key] == expected[key]
+
+    ctx = AgentContext.get("ctx-index-a")
+    assert ctx is not None
+    assert ctx.output()["no"] == listed["no"]
+    assert ctx.output()["log_version"] == listed["log_version"]
+    assert ctx.agent0.history.current.messages[-1].content == "hello from first chat"
+    assert not persist_chat.is_chat_indexed("ctx-index-a")
+    assert AgentContext.get("ctx-index-a") is ctx
+
+
+def test_chats_saved_without_index_entry_get_one_at_startup(chats_folder):
+    folder, ctxids = chats_folder
+    _save_and_unload(ctxids, "ctx-index-b", "older chat")
+    (folder / "ctx-index-b" / persist_chat.INDEX_FILE_NAME).unlink()
+
+    persist_chat.load_tmp_chats()
+
+    [entry] = persist_chat.get_indexed_chats()
+    assert entry["name"] == "older chat"
+    assert (folder / "ctx-index-b" / persist_chat.INDEX_FILE_NAME).exists()
+    assert AgentContext.get("ctx-index-b").name == "older chat"
+
+
+def test_messaging_lookups_find_chats_not_loaded_yet(chats_folder):
+    from plugins._whatsapp_integration.helpers.handler import (
+        CTX_WA_CHAT_ID,
+        _find_chats_by_jid,
+    )
+
+    folder, ctxids = chats_folder
+    jid = "123456789@s.whatsapp.net"
+    _save_and_unload(ctxids, "ctx-index-c", "whatsapp chat", {CTX_WA_CHAT_ID: jid})
+    _save_and_unload(ctxids, "ctx-index-d", "other chat", {CTX_WA_CHAT_ID: "other"})
+    # entries written before the index held context data are rebuilt once
+    index_path = folder / "ctx-index-c" / persist_chat.INDEX_FILE_NAME
+    entry = json.loads(index_path.read_text())
+    del entry["data"]
+    index_path.write_text(json.dumps(entry))
+
+    persist_chat.load_tmp_chats()
+
+    assert _find_chats_by_jid(jid) == ["ctx-index-c"]
+    assert not persist_chat.is_chat_indexed("ctx-index-c")
+    assert persist_chat.is_chat_indexed("ctx-index-d")
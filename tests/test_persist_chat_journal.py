@@ -0,0 +1,194 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from agent import AgentContext
+from helpers import persist_chat
+from initialize import initialize_agent
+
+
+@pytest.fixture
+def chat(tmp_path, monkeypatch):
+    monkeypatch.setattr(persist_chat, "CHATS_FOLDER", str(tmp_path))
+    ctx = AgentContext(config=initialize_agent(), id="ctx-journal", set_current=False)
+    try:
+        yield ctx, tmp_path / "ctx-journal"
+    finally:
+        persist_chat.remove_chat(ctx.id)
+        AgentContext.remove(ctx.id)
+
+
+def _journal_records(folder: Path) -> list[dict]:
+    path = folder / persist_chat.JOURNAL_FILE_NAME
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def _assert_replays_to_context(ctx: AgentContext):
+    data, _seq = persist_chat._read_chat_data(ctx.id)
+    expected = json.loads(persist_chat.export_json_chat(ctx))
+    for agent in data["agents"] + expected["agents"]:
+        agent["history"] = json.loads(agent["history"])
+    assert data == expected
+
+
+def test_saves_append_only_new_messages_and_log_items(chat):
+    ctx, folder = chat
+    agent = ctx.agent0
+    agent.history.add_message(False, "first")
+    ctx.log.log(type="user", heading="User", content="first")
+    persist_chat.save_tmp_chat(ctx)
+    assert (folder / persist_chat.CHAT_FILE_NAME).exists()
+    assert _journal_records(folder) == []
+
+    agent.history.add_message(True, "second")
+    ctx.log.log(type="agent", heading="Agent", content="second")
+    persist_chat.save_tmp_chat(ctx)
+    persist_chat.save_tmp_chat(ctx)  # nothing changed, nothing appended
+
+    records = _journal_records(folder)
+    assert len(records) == 1
+    record = records[0]
+    assert "meta" not in record and "agents" not in record
+    [change] = record["agent_changes"]
+    assert [m["content"] for m in change["messages"]] == ["second"]
+    assert [item["content"] for item in record["log"]["items"]] == ["second"]
+    _assert_replays_to_context(ctx)
+
+
+def test_new_topic_journals_changed_records_and_log_reset_whole(chat):
+    ctx, folder = chat
+    agent = ctx.agent0
+    agent.history.add_message(False, "question")
+    ctx.log.log(type="user", heading="User", content="question")
+    persist_chat.save_tmp_chat(ctx)
+
+    agent.history.new_topic()
+    agent.history.add_message(False, "next topic")
+    ctx.log.reset()
+    ctx.log.log(type="user", heading="User", content="after reset")
+    ctx.name = "renamed"
+    persist_chat.save_tmp_chat(ctx)
+
+    [record] = _journal_records(folder)
+    assert record["meta"]["name"] == "renamed"
+    assert record["log"]["reset"] is True
+    [change] = record["agent_changes"]
+    assert "history" not in change
+    records = change["history_changes"]
+    assert records["topics"]["start"] == records["topics"]["end"] == 0
+    [topic] = records["topics"]["items"]
+    assert topic["messages"][-1]["content"] == "question"
+    assert [m["content"] for m in records["current"]["messages"]] == ["next topic"]
+    _assert_replays_to_context(ctx)
+
+
+def test_summarized_records_are_journaled_alone(chat):
+    ctx, folder = chat
+    agent = ctx.agent0
+    for i in range(3):
+        agent.history.add_message(False, f"topic {i}")
+        agent.history.new_topic()
+    agent.history.add_message(False, "current")
+    agent.history.add_message(True, "reply")
+    persist_chat.save_tmp_chat(ctx)
+
+    agent.history.topics[1].summary = "summarized topic"
+    agent.history.current.messages[0].summary = "summarized message"
+    persist_chat.save_tmp_chat(ctx)
+
+    [record] = _journal_records(folder)
+    [change] = record["agent_changes"]
+    records = change["history_changes"]
+    assert records["topics"]["start"] == 1 and records["topics"]["end"] == 2
+    assert [t["summary"] for t in records["topics"]["items"]] == ["summarized topic"]
+    assert records["messages"]["start"] == 0 and records["messages"]["end"] == 1
+    assert [m["summary"] for m in records["messages"]["items"]] == [
+        "summarized message"
+    ]
+    assert "bulks" not in records and "current" not in records
+    _assert_replays_to_context(ctx)
+
+
+def test_compaction_rotates_journal_and_keeps_replay_consistent(chat, monkeypatch):
+    ctx, folder = chat
+    agent = ctx.agent0
+    persist_chat.save_tmp_chat(ctx)
+    for i in range(3):
+        agent.history.add_message(False, f"message {i}")
+        persist_chat.save_tmp_chat(ctx)
+    assert len(_journal_records(folder)) == 3
+
+    monkeypatch.setattr(persist_chat, "JOURNAL_COMPACT_MIN_BYTES", 0)
+    journal = persist_chat._get_journal(ctx.id)
+    journal.snapshot_bytes = 0
+    agent.history.add_message(False, "compacted")
+    persist_chat.save_tmp_chat(ctx)
+    persist_chat.flush_tmp_chats()
+
+    assert not (folder / persist_chat.JOURNAL_ROTATED_FILE_NAME).exists()
+    assert _journal_records(folder) == []
+    snapshot = json.loads((folder / persist_chat.CHAT_FILE_NAME).read_text())
+    assert snapshot["journal_seq"] == journal.seq
+    _assert_replays_to_context(ctx)
+
+
+def test_replay_skips_records_already_in_snapshot(chat):
+    ctx, folder = chat
+    agent = ctx.agent0
+    persist_chat.save_tmp_chat(ctx)
+    agent.history.add_message(False, "kept once")
+    persist_chat.save_tmp_chat(ctx)
+
+    # a crash after the snapshot landed but before the rotated journal was dropped
+    journal_path = folder / persist_chat.JOURNAL_FILE_NAME
+    stale = journal_path.read_text(encoding="utf-8")
+    persist_chat.save_tmp_chat(ctx, compact=True)
+    (folder / persist_chat.JOURNAL_ROTATED_FILE_NAME).write_text(
+        stale + '{"seq": 99, "meta": {"na', encoding="utf-8"
+    )
+
+    data, seq = persist_chat._read_chat_data(ctx.id)
+    messages = json.loads(data["agents"][0]["history"])["current"]["messages"]
+    assert [m["content"] for m in messages] == [
+        m.content for m in agent.history.current.messages
+    ]
+    assert [m["content"] for m in messages].count("kept once") == 1
+    assert seq == persist_chat._get_journal(ctx.id).seq
+
+
+def test_compaction_encodes_a_detached_copy_off_the_caller(chat, monkeypatch):
+    ctx, folder = chat
+    agent = ctx.agent0
+    persist_chat.save_tmp_chat(ctx)
+    agent.history.add_message(False, "journaled")
+    persist_chat.save_tmp_chat(ctx)
+    before = (folder / persist_chat.CHAT_FILE_NAME).read_text()
+
+    submitted = []
+    monkeypatch.setattr(
+        persist_chat._compaction_executor,
+        "submit",
+        lambda fn, *args: submitted.append((fn, args)),
+    )
+    monkeypatch.setattr(persist_chat, "JOURNAL_COMPACT_MIN_BYTES", 0)
+    persist_chat._get_journal(ctx.id).snapshot_bytes = 0
+    agent.history.add_message(False, "compacted")
+    persist_chat.save_tmp_chat(ctx)
+
+    # nothing was encoded or written on the caller
+    [(fn, args)] = submitted
+    assert (folder / persist_chat.CHAT_FILE_NAME).read_text() == before
+    agent.history.add_message(False, "after compaction")
+    fn(*args)
+
+    snapshot = json.loads((folder / persist_chat.CHAT_FILE_NAME).read_text())
+    messages = json.loads(snapshot["agents"][0]["history"])["current"]["messages"]
+    assert [m["content"] for m in messages][-2:] == ["journaled", "compacted"]
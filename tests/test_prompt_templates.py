@@ -0,0 +1,84 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import cache, files
+
+PLUGIN = """
+import os
+from helpers.files import VariablesPlugin
+
+os.environ["A0_TEST_PROMPT_PLUGIN_LOADS"] = str(
+    int(os.environ.get("A0_TEST_PROMPT_PLUGIN_LOADS", "0")) + 1
+)
+
+
+class Greeting(VariablesPlugin):
+    def get_variables(self, file, backup_dirs=None, **kwargs):
+        return {"greeting": "hello " + kwargs.get("name", "")}
+"""
+
+
+@pytest.fixture
+def prompt_dirs(tmp_path, monkeypatch):
+    monkeypatch.setenv("A0_TEST_PROMPT_PLUGIN_LOADS", "0")
+    files.clear_prompt_cache()
+    cache.reset_stats("*(prompts)")
+    custom, default = tmp_path / "custom", tmp_path / "default"
+    custom.mkdir()
+    default.mkdir()
+    yield [str(custom), str(default)]
+    files.clear_prompt_cache()
+
+
+def test_template_is_parsed_once(prompt_dirs):
+    custom, default = map(Path, prompt_dirs)
+    (default / "main.md").write_text(
+        "{{greeting}}{{if admin}} as admin{{endif}}\n{{ include 'part.md' }}"
+    )
+    (default / "main.py").write_text(PLUGIN)
+    (custom / "part.md").write_text("custom {{name}}, {{include original}}")
+    (default / "part.md").write_text("default {{name}}")
+
+    render = lambda **kwargs: files.read_prompt_file("main.md", prompt_dirs, **kwargs)
+    assert render(name="a", admin=True) == "hello a as admin\ncustom a, default a"
+    assert render(name="b", admin=False) == "hello b\ncustom b, default b"
+
+    # three files read, the plugin module loaded once
+    stats = cache.get_stats(files.PROMPT_TEMPLATES_CACHE_AREA)
+    assert stats[files.PROMPT_TEMPLATES_CACHE_AREA]["misses"] == 3
+    assert os.environ["A0_TEST_PROMPT_PLUGIN_LOADS"] == "1"
+
+
+def test_changed_files_are_read_again(prompt_dirs):
+    custom, default = map(Path, prompt_dirs)
+    path = default / "main.md"
+    path.write_text("{{if x}}old{{endif}}")
+    assert files.read_prompt_file("main.md", prompt_dirs, x=True) == "old"
+
+    path.write_text("{{if x}}new{{endif}}")
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+    assert files.read_prompt_file("main.md", prompt_dirs, x=True) == "new"
+
+    # an override in a higher priority directory is found after the watchdog clears the cache
+    (custom / "main.md").write_text("custom")
+    assert files.read_prompt_file("main.md", prompt_dirs, x=False) == ""
+    files.clear_prompt_cache()
+    assert files.read_prompt_file("main.md", prompt_dirs, x=False) == "custom"
+
+    (custom / "main.md").unlink()
+    assert files.read_prompt_file("main.md", prompt_dirs, x=False) == ""
+
+
+def test_evaluate_text_conditions():
+    text = "a{{if x}}b{{if y}}c{{endif}}{{endif}}d{{if broken(}}e{{endif}}{{if x}}f{{endif}}"
+    assert files.evaluate_text_conditions(text, x=True, y=False) == (
+        "abd{{if broken(}}e{{endif}}{{if x}}f{{endif}}"
+    )
+    assert files.evaluate_text_conditions("{{if x}}open", x=True) == "{{if x}}open"
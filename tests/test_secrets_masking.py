@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers.secrets import SecretsManager, SecretsMatcher, StreamingSecretsFilter
+
+
+SECRETS = {"LONG": "abcdef", "SHORT": "bcd", "TOKEN": "hunter2pass", "PASS": "pass"}
+
+
+def _stream(text: str, step: int) -> str:
+    stream_filter = StreamingSecretsFilter(SECRETS)
+    out = [
+        stream_filter.process_chunk(text[index : index + step])
+        for index in range(0, len(text), step)
+    ]
+    return "".join(out) + stream_filter.finalize()
+
+
+def test_matcher_prefers_longest_value_at_each_position() -> None:
+    matcher = SecretsMatcher(SECRETS)
+
+    assert matcher.mask("x abcdef bcd hunter2pass pass") == (
+        "x §§secret(LONG) §§secret(SHORT) §§secret(TOKEN) §§secret(PASS)"
+    )
+    assert matcher.mask("bcd", placeholder="<{key}>") == "<SHORT>"
+
+
+def test_matcher_tracks_longest_live_prefix() -> None:
+    matcher = SecretsMatcher(SECRETS)
+
+    state = matcher.advance(0, "xx hunt")
+    assert matcher.depth(state) == 4
+    state = matcher.advance(state, "er2pa")
+    assert matcher.depth(state) == 9
+    assert matcher.depth(matcher.advance(state, "!")) == 0
+
+
+@pytest.mark.parametrize("step", [1, 2, 3, 5, 100])
+def test_streaming_filter_matches_full_masking(step) -> None:
+    text = "token hunter2pass, abcdef and bcd; pass done"
+
+    assert _stream(text, step) == SecretsMatcher(SECRETS).mask(text)
+
+
+def test_streaming_filter_holds_and_masks_unresolved_partial() -> None:
+    stream_filter = StreamingSecretsFilter(SECRETS)
+
+    assert stream_filter.process_chunk("ok hunter") == "ok "
+    assert stream_filter.finalize() == "***"
+
+
+def test_manager_reuses_matcher_until_secrets_change(monkeypatch) -> None:
+    manager = SecretsManager("does/not/exist.env")
+    current = {"KEY": "secret-value"}
+    monkeypatch.setattr(manager, "load_secrets", lambda: current)
+
+    first = manager.get_matcher()
+    assert manager.get_matcher() is first
+    assert manager.mask_values("use secret-value") == "use §§secret(KEY)"
+
+    current = {"KEY": "other-value"}
+    assert manager.get_matcher() is not first
+    assert manager.mask_values("use other-value") == "use §§secret(KEY)"
@@ -101,3 +101,56 @@ async def test_state_monitor_namespace_identity_prevents_cross_namespace_state_p
 
     assert captured
     assert all(ns == ns_a for ns, _ in captured)
+
+
+def test_state_monitor_push_delta_sends_only_changed_entries_until_resync():
+    from helpers.state_monitor import ConnectionProjection, StateMonitor, _snapshot_delta
+    from helpers.state_snapshot import StateRequestV1
+
+    def snapshot(contexts, tasks=()):
+        return {"contexts": list(contexts), "tasks": list(tasks), "logs": []}
+
+    a1 = {"id": "a", "log_version": 1}
+    a2 = {"id": "a", "log_version": 2}
+    b = {"id": "b", "log_version": 0}
+    t = {"id": "t", "state": "idle"}
+
+    projection = ConnectionProjection(namespace="/ws", sid="sid-1")
+    first, delta = _snapshot_delta(snapshot([a1, b], [t]), projection)
+    assert delta is None
+    assert first["contexts"] == [a1, b]
+
+    second, delta = _snapshot_delta(snapshot([a2, b], [t]), projection)
+    assert second["contexts"] == [a2]
+    assert second["tasks"] == []
+    assert delta == {"contexts_removed": [], "tasks_removed": []}
+
+    third, delta = _snapshot_delta(snapshot([a2]), projection)
+    assert third["contexts"] == []
+    assert delta == {"contexts_removed": ["b"], "tasks_removed": ["t"]}
+
+    # a new state_request (resync) makes the next push carry full lists again
+    monitor = StateMonitor()
+    monitor._projections[("/ws", "sid-1")] = projection
+    monitor.update_projection(
+        "/ws",
+        "sid-1",
+        request=StateRequestV1(context=None, log_from=0, notifications_from=0, timezone="UTC"),
+        seq_base=1,
+    )
+    full, delta = _snapshot_delta(snapshot([a2]), projection)
+    assert delta is None
+    assert full["contexts"] == [a2]
+
+
+def test_context_lists_memo_expires_with_generation():
+    from helpers.state_snapshot import ContextListsMemo
+
+    memo = ContextListsMemo()
+    memo.put("UTC", memo.generation, [{"id": "a"}], [])
+
+    assert memo.get("UTC") == ([{"id": "a"}], [])
+    assert memo.get("Europe/Berlin") is None
+
+    memo.generation += 1
+    assert memo.get("UTC") is None
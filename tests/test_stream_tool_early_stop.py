@@ -94,3 +94,85 @@ async def test_unified_call_stops_after_canonical_root_snapshot(monkeypatch):
     assert stream.index == 1
     assert len(seen) == 1
     assert seen[0][1] == '{"tool_name":"response","tool_args":{"text":"hello"}} trailing text'
+
+
+@pytest.mark.asyncio
+async def test_unified_call_coalesces_deltas_into_windows(monkeypatch):
+    text = '{"tool_name":"response","tool_args":{"text":"' + "word " * 40 + '"'
+    deltas = [text[i : i + 3] for i in range(0, len(text), 3)]
+    stream = _AsyncChunkStream([_chunk(delta) for delta in deltas])
+
+    async def fake_acompletion(*args, **kwargs):
+        return stream
+
+    async def fake_rate_limiter(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(models, "acompletion", fake_acompletion)
+    monkeypatch.setattr(models, "apply_rate_limiter", fake_rate_limiter)
+
+    wrapper = models.LiteLLMChatWrapper(
+        model="test-model",
+        provider="openai",
+        model_config=None,
+        a0_stream_flush_ms=60_000,
+        a0_stream_flush_chars=64,
+    )
+
+    seen: list[tuple[str, str]] = []
+
+    async def response_callback(chunk: str, full: str):
+        seen.append((chunk, full))
+        return None
+
+    response, _reasoning = await wrapper.unified_call(
+        messages=[],
+        response_callback=response_callback,
+    )
+
+    assert response == text
+    assert 1 < len(seen) < len(deltas)
+    assert seen[0][0] == seen[0][1]
+    assert "".join(chunk for chunk, _full in seen) == text
+    assert seen[-1][1] == text
+
+
+@pytest.mark.asyncio
+async def test_unified_call_flushes_window_on_json_closure(monkeypatch):
+    stream = _AsyncChunkStream(
+        [
+            _chunk('{"tool_name":"response",'),
+            _chunk('"tool_args":{"text":'),
+            _chunk('"hi"}'),
+            _chunk("}"),
+            _chunk(" unreachable"),
+        ]
+    )
+
+    async def fake_acompletion(*args, **kwargs):
+        return stream
+
+    async def fake_rate_limiter(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(models, "acompletion", fake_acompletion)
+    monkeypatch.setattr(models, "apply_rate_limiter", fake_rate_limiter)
+
+    wrapper = models.LiteLLMChatWrapper(
+        model="test-model",
+        provider="openai",
+        model_config=None,
+        a0_stream_flush_ms=60_000,
+        a0_stream_flush_chars=10_000,
+    )
+
+    async def response_callback(chunk: str, full: str):
+        return extract_tools.extract_json_root_string(full)
+
+    response, _reasoning = await wrapper.unified_call(
+        messages=[],
+        response_callback=response_callback,
+    )
+
+    assert response == '{"tool_name":"response","tool_args":{"text":"hi"}}'
+    assert stream.index == 4
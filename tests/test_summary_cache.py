@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import history, summary_cache
+
+
+class _Agent:
+    def __init__(self):
+        self.calls = 0
+
+    def read_prompt(self, file, **kwargs):
+        return f"{file}:{kwargs.get('content', '')}"
+
+    async def call_utility_model(self, system, message):
+        self.calls += 1
+        return f"summary {self.calls}"
+
+
+@pytest.fixture
+def cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(summary_cache, "SUMMARY_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(summary_cache, "_index", None)
+    monkeypatch.setattr(history, "_summary_model_id", lambda agent: "test/model")
+    return tmp_path
+
+
+def _topic(agent: _Agent, *texts: str) -> history.Topic:
+    hist = history.History(agent=agent)
+    for text in texts:
+        hist.add_message(False, text, tokens=1)
+    return hist.current
+
+
+@pytest.mark.asyncio
+async def test_same_records_are_summarized_once_across_histories(cache_dir):
+    agent = _Agent()
+    first = await _topic(agent, "a", "b").summarize()
+    # a branched chat holds copies of the same messages
+    branched = await _topic(_Agent(), "a", "b").summarize()
+    other = await _topic(agent, "a", "c").summarize()
+
+    assert branched == first == "summary 1"
+    assert other == "summary 2"
+    assert agent.calls == 2
+
+    for _ in range(2):
+        bulk = history.Bulk(history=history.History(agent=agent))
+        bulk.records.append(_topic(agent, "x"))
+        assert await bulk.summarize() == "summary 3"
+    assert agent.calls == 3
+
+
+def test_cache_is_bounded_and_keeps_recently_used(cache_dir, monkeypatch):
+    monkeypatch.setattr(summary_cache, "MAX_ENTRIES", 4)
+    monkeypatch.setattr(summary_cache, "PRUNE_TO_RATIO", 0.5)
+    keys = [summary_cache.make_key("m", "s", str(i)) for i in range(4)]
+    for i, key in enumerate(keys):
+        summary_cache.add(key, f"summary {i}")
+        summary_cache._index[key] = float(i)
+    assert summary_cache.get(keys[0]) == "summary 0"  # touched, now most recent
+
+    summary_cache.add(summary_cache.make_key("m", "s", "new"), "summary new")
+
+    assert summary_cache.get(keys[0]) == "summary 0"
+    assert summary_cache.get(keys[1]) is None
+    assert summary_cache.get(keys[2]) is None
+    assert summary_cache.get(keys[3]) is None
+    assert len(summary_cache._index) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_produces_once_and_skips_empty_results(cache_dir):
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        return "" if len(calls) == 1 else "summary"
+
+    key = summary_cache.make_key("m", "s", "chunk")
+    assert await summary_cache.get_or_create(key, produce) == ""  # not cached
+    assert await summary_cache.get_or_create(key, produce) == "summary"
+    assert await summary_cache.get_or_create(key, produce) == "summary"
+    assert len(calls) == 2
@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from plugins._code_execution.helpers.terminal_output import (
+    HEX_ESCAPE,
+    TerminalOutput,
+    clean_string,
+)
+
+
+RAW = (
+    "\r\r\n> \r\n> ls -la\r\n"
+    "\x1b[01;34mdir\x1b[0m\r\n"
+    "progress 10%\rprogress 50%\rprogress 100%\r\n"
+    "null\x00byte \\x1b escaped\n"
+    "last line\r\n"
+    "root@host:~# "
+)
+
+
+def test_incremental_feed_matches_cleaning_the_whole_output():
+    expected = HEX_ESCAPE.sub("", clean_string(RAW))
+    for chunk_size in (1, 3, 7, len(RAW)):
+        output = TerminalOutput()
+        for i in range(0, len(RAW), chunk_size):
+            output.feed(RAW[i : i + chunk_size])
+        assert output.text() == expected
+        assert output.last_lines(2) == expected.splitlines()[-2:]
+
+
+def test_output_keeps_head_and_tail_within_bound():
+    output = TerminalOutput(max_chars=1000)
+    for i in range(1000):
+        output.feed(f"line {i:04d}\n")
+
+    text = output.text("[truncated]")
+    assert len(text) < 1100
+    assert text.startswith("line 0000\n")
+    assert "[truncated]" in text
+    assert text.endswith("line 0999\n")
+    assert output.dropped > 0
+    assert output.last_lines(2) == text.splitlines()[-2:]
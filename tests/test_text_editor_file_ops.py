@@ -0,0 +1,105 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from plugins._text_editor.helpers import file_ops
+
+
+@pytest.fixture(autouse=True)
+def small_index_blocks(monkeypatch):
+    monkeypatch.setattr(file_ops, "_INDEX_BLOCK", 64)
+    monkeypatch.setattr(file_ops, "_indexes", file_ops.OrderedDict())
+    # token budgets are not under test, keep the tokenizer out of it
+    monkeypatch.setattr(file_ops.tokens, "count_tokens", lambda text: len(text) // 4)
+
+
+def _patched(lines: list[str], edits: list[dict]) -> list[str]:
+    result: list[str] = []
+    for line_no in range(1, len(lines) + 2):
+        for edit in edits:
+            if edit["insert"] and edit["from"] == line_no:
+                result.extend(edit["content"].splitlines(keepends=True))
+            if not edit["insert"] and edit["from"] == line_no:
+                result.extend(edit["content"].splitlines(keepends=True))
+        if line_no > len(lines):
+            break
+        if not any(
+            not e["insert"] and e["from"] <= line_no <= e["to"] for e in edits
+        ):
+            result.append(lines[line_no - 1])
+    return result
+
+
+def test_read_file_returns_window_of_large_file(tmp_path):
+    path = tmp_path / "big.log"
+    lines = [f"line {i} {'x' * (i % 17)}\r\n" for i in range(1, 5001)]
+    path.write_bytes("".join(lines).encode() + b"tail without newline")
+
+    result = file_ops.read_file(str(path), line_from=4990, line_to=5005)
+    assert result["error"] == ""
+    assert result["total_lines"] == 5001
+    content = result["content"].splitlines()
+    assert content[0] == f"4990 {lines[4989].rstrip()}"
+    assert content[-1] == "5001 tail without newline"
+    assert len(content) == 12
+
+    assert file_ops.read_file(str(path), line_from=6000)["content"] == ""
+
+
+def test_patch_streams_edits_and_keeps_index_usable(tmp_path):
+    rng = random.Random(7)
+    path = tmp_path / "data.txt"
+    lines = [f"row {i} {'é' * rng.randint(0, 20)}\n" for i in range(1, 801)]
+    path.write_text("".join(lines), encoding="utf-8")
+    file_ops.read_file(str(path))
+
+    for _ in range(20):
+        starts = sorted(rng.sample(range(1, len(lines) + 2), 4))
+        edits = []
+        for start in starts:
+            if rng.random() < 0.5 or start > len(lines):
+                edits.append({"from": start, "content": f"new {start}\n"})
+            else:
+                edits.append({
+                    "from": start,
+                    "to": start + rng.randint(0, 1),
+                    "content": "".join(
+                        f"repl {start}.{n}\n" for n in range(rng.randint(0, 3))
+                    ),
+                })
+        parsed, err = file_ops.validate_edits(edits)
+        if err:
+            continue
+
+        expected = _patched(lines, parsed)
+        total = file_ops.apply_patch(str(path), parsed)
+        lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+        assert lines == expected
+        assert total == len(expected)
+
+        # index carried over from the patch matches a fresh one
+        line_from = rng.randint(1, total)
+        result = file_ops.read_file(str(path), line_from=line_from, line_to=line_from + 30)
+        file_ops._indexes.clear()
+        assert file_ops.read_file(str(path), line_from=line_from, line_to=line_from + 30) == result
+        assert result["total_lines"] == total
+
+
+def test_patch_after_last_line_without_newline_reads_like_fresh_index(tmp_path):
+    path = tmp_path / "open_end.txt"
+    path.write_text("a\nb\nc", encoding="utf-8")
+    file_ops.read_file(str(path))
+
+    assert file_ops.patch_file(str(path), [{"from": 4, "content": "d\n"}])["error"] == ""
+    assert path.read_text(encoding="utf-8") == "a\nb\ncd\n"
+
+    result = file_ops.read_file(str(path))
+    file_ops._indexes.clear()
+    assert file_ops.read_file(str(path)) == result
+    assert result["total_lines"] == 3
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pytest
+
+from helpers import tokens
+
+
+@pytest.fixture
+def calls(monkeypatch) -> list[str]:
+    seen: list[str] = []
+
+    def fake_count_tokens(text: str, encoding_name="cl100k_base") -> int:
+        seen.append(text)
+        return len(text.split())
+
+    monkeypatch.setattr(tokens, "count_tokens", fake_count_tokens)
+    return seen
+
+
+def test_ledger_only_tokenizes_changed_segments(calls: list[str]) -> None:
+    ledger = tokens.TokenLedger()
+    ledger.count("system.0", "You are a helpful agent.")
+    ledger.count("system.1", "Tools are listed below.")
+    assert len(calls) == 2
+
+    ledger.count("system.0", "You are a helpful agent.")
+    ledger.count("system.1", "Tools have changed.")
+    assert calls[2:] == ["Tools have changed."]
+
+
+def test_ledger_total_is_sum_of_retained_segments(calls: list[str]) -> None:
+    ledger = tokens.TokenLedger()
+    first = ledger.count("system.0", "hello world")
+    ledger.set("history", 40)
+    ledger.set("stale", 1000)
+    ledger.retain(["system.0", "history"])
+
+    assert ledger.total() == first + 40
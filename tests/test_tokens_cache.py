@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import tokens
+
+
+class _FakeEncoding:
+    def __init__(self):
+        self.encoded: list[str] = []
+        self.batches: list[list[str]] = []
+
+    def encode(self, text: str, disallowed_special=()):
+        self.encoded.append(text)
+        return text.split()
+
+    def encode_batch(self, texts: list[str], num_threads=1, disallowed_special=()):
+        self.batches.append(list(texts))
+        return [text.split() for text in texts]
+
+
+@pytest.fixture
+def encoding(monkeypatch) -> _FakeEncoding:
+    fake = _FakeEncoding()
+    monkeypatch.setattr(tokens, "get_encoding", lambda encoding_name="cl100k_base": fake)
+    tokens.clear_cache()
+    yield fake
+    tokens.clear_cache()
+
+
+def test_count_tokens_reuses_cached_count(encoding: _FakeEncoding) -> None:
+    text = "word " * 50
+
+    assert tokens.count_tokens(text) == 50
+    assert tokens.count_tokens(text) == 50
+    assert len(encoding.encoded) == 1
+
+
+def test_count_tokens_many_batches_only_misses(encoding: _FakeEncoding) -> None:
+    cached = "cached text " * 10
+    fresh = "fresh text " * 20
+    tokens.count_tokens(cached)
+
+    assert tokens.count_tokens_many([cached, fresh, "", fresh]) == [20, 40, 0, 40]
+    assert encoding.batches == [[fresh]]
+
+    assert tokens.count_tokens_many([fresh]) == [40]
+    assert len(encoding.batches) == 1
+
+
+def test_cache_is_bounded(encoding: _FakeEncoding, monkeypatch) -> None:
+    monkeypatch.setattr(tokens, "CACHE_SIZE", 2)
+    texts = [f"{i} " + "padding " * 10 for i in range(3)]
+    for text in texts:
+        tokens.count_tokens(text)
+
+    tokens.count_tokens(texts[0])
+    assert encoding.encoded.count(texts[0]) == 2
+
+
+def test_estimate_tokens_does_not_encode(encoding: _FakeEncoding) -> None:
+    assert tokens.estimate_tokens("") == 0
+    assert tokens.estimate_tokens("abc") == 1
+    assert tokens.estimate_tokens("x" * 400) == 110
+    assert encoding.encoded == []
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import cache, extract_tools
+from helpers import tool as tool_helper
+from helpers.extension import TOOLS_CACHE_AREA
+
+TOOL_SOURCE = """
+from helpers.tool import Tool, Response
+
+
+class Dummy(Tool):
+    async def execute(self, **kwargs):
+        return Response(message="ok", break_loop=False)
+"""
+
+
+def _agent(profile: str = "default"):
+    return SimpleNamespace(
+        config=SimpleNamespace(profile=profile),
+        context=SimpleNamespace(get_data=lambda key: None),
+    )
+
+
+def test_tool_file_is_imported_once_until_cache_clears(tmp_path, monkeypatch) -> None:
+    tool_file = tmp_path / "dummy.py"
+    tool_file.write_text(TOOL_SOURCE)
+    monkeypatch.setattr(
+        tool_helper.subagents, "get_paths", lambda agent, *subpaths: [str(tool_file)]
+    )
+
+    loads: list[str] = []
+    original = extract_tools.load_classes_from_file
+
+    def counting(path, base_class, one_per_file=True):
+        loads.append(path)
+        return original(path, base_class, one_per_file)
+
+    monkeypatch.setattr(tool_helper.extract_tools, "load_classes_from_file", counting)
+    cache.clear(TOOLS_CACHE_AREA)
+
+    agent = _agent()
+    first = tool_helper.get_tool_class(agent, "dummy")  # type: ignore[arg-type]
+    second = tool_helper.get_tool_class(agent, "dummy")  # type: ignore[arg-type]
+
+    assert first is not None and first.__name__ == "Dummy"
+    assert second is first
+    assert len(loads) == 1
+
+    cache.clear(TOOLS_CACHE_AREA)
+    assert tool_helper.get_tool_class(agent, "dummy") is not first  # type: ignore[arg-type]
+    assert len(loads) == 2
+
+
+def test_missing_tool_resolves_to_none(monkeypatch) -> None:
+    monkeypatch.setattr(tool_helper.subagents, "get_paths", lambda agent, *subpaths: [])
+    cache.clear(TOOLS_CACHE_AREA)
+
+    assert tool_helper.get_tool_class(_agent(), "nope") is None  # type: ignore[arg-type]
+    assert tool_helper.get_tool_class(_agent(), "nope") is None  # type: ignore[arg-type]
@@ -39,6 +39,25 @@ function debug(...args) {
   console.debug(...args);
 }
 
+// Context/task entries received through state pushes, by id. Delta pushes only carry
+// changed entries and removed ids; full lists are rebuilt from these.
+const pushedEntries = { contexts: new Map(), tasks: new Map() };
+
+function expandPushLists(snapshot, delta) {
+  for (const key of ["contexts", "tasks"]) {
+    const entries = pushedEntries[key];
+    if (!delta) {
+      entries.clear();
+    } else {
+      for (const id of delta[`${key}_removed`] || []) entries.delete(id);
+    }
+    for (const entry of Array.isArray(snapshot[key]) ? snapshot[key] : []) {
+      if (entry && entry.id) entries.set(entry.id, entry);
+    }
+    snapshot[key] = [...entries.values()];
+  }
+}
+
 function isRestartToastActive() {
   return (
     Array.isArray(notificationStore.toastStack) &&
@@ -493,6 +512,7 @@ const model = {
     }
 
     if (data.snapshot && typeof data.snapshot === "object") {
+      expandPushLists(data.snapshot, data.delta && typeof data.delta === "object" ? data.delta : null);
       await applySnapshot(data.snapshot, {
         onLogGuidReset: async () => {
           debug("[syncStore] log_guid reset -> resync (forceFull)");